@@ -21,19 +21,26 @@
         b'$GPRMC,151948.00,A,5031.8614,N,00005.2524,E,83.0,315.1,201122,0.5,E*6A\r\n'
         b'$GPGGA,151948.00,5031.8614,N,00005.2524,E,1,05,0.0,914.4,M,0.0,M,0.0,0000*77\r\n'
         
-    Function ck_uart() tries to read a full line through uart.readline()
-    The data received is a bytearray. This bytearray is converted into a text buffer (rx_buffer_s).
-    In the case the received data results in a None for 100 times, the function nodata() will be called
-    which displays "nodata". If more than 1000 times there is no data, the function ck_uart() will exit
-    with a value of 0.
+    Function ck_uart() reads the uart through an NMEAFramer (nmea_framer.py). The framer fills a
+    preallocated ring buffer with uart.readinto() and returns complete '$...\r\n' sentences.
+    While the uart is empty it is polled with uart.any() every RX_WAIT_MS, so a sentence is handled
+    within a few ms after its last byte arrived. After NODATA_MS without a sentence the function nodata()
+    will be called which displays "nodata". After RX_EXIT_MS without a sentence, the function ck_uart()
+    will exit with a value of 0.
+    The uart rx buffer is sized (rxbuf_size()) to hold the bytes that arrive at BAUD in the longest
+    time the uart is not read (RX_BLOCK_MS, with use_asyncio RX_BLOCK_ASYNC_MS). The framer counts
+    the overruns of the rx buffer and the truncated sentences; meter (link_meter.py) reports the
+    bytes/s and sentences/s of the link (button C) and link_tick() warns when the receiver falls behind.
     
-    The received GPRMC GPS datagram will be split into twelve data items, saved as a GPRMC_lst list.
-    The received GPGGA GPS datagram will be split into fifteen data items, saved as a GPGGA_lst list.
+    The received GPRMC and GPGGA GPS datagrams are parsed byte by byte (nmea_parse.py) into a numeric
+    record (rx_rec) of fixed-point integers: latitude, longitude, groundspeed, track, variation and altitude.
     The groundspeed data is used to discern if the airplane is moving or not. 
     When the groundspeed is zero, the text 'ac parked' is displayed. When the groundspeed is between
-    0.2 and 30 KTS the text 'taxying' is displayed. Above a groundspeed of 30 KTS the flown track,
+    1 and 30 KTS the text 'taxying' is displayed. Above a groundspeed of 30 KTS the flown track,
     the airplane's position, the groundspeed or the altitude will be displayed, depending the choice
-    the user made, using the A or B button.
+    the user made, using the A or B button. The groundspeed of every fix is smoothed and the phase
+    only changes beyond a hysteresis band and after a minimum dwell time (phase_filter.py), so noise
+    around a threshold does not flip the screens.
 
     Update 2022-07-23.
     Updated the micropython firmware to v1.19
@@ -41,7 +48,9 @@
     Some mods in ck_uart and added gc module.
 
     NOTE: if you get errors or garbled / delayed reception of gps messages: Check the baudrate in FSUIPC GPSout
-    and here in this script both are set for 4800 baud.
+    and here in this script (BAUD) both are set for 4800 baud. With auto_baud the script finds the
+    baudrate of GPSout itself at the start (find_baud()): each rate of BAUD_RATES is probed and the one
+    that gives the most sentences with a valid checksum is used. Faster rates allow more fixes per second.
     
     Clock synchronizes time on start.
         
@@ -76,8 +85,31 @@ from galactic import GalacticUnicorn
 from machine import RTC, UART, Pin, reset
 from picographics import PicoGraphics, DISPLAY_GALACTIC_UNICORN 
 from pimoroni_i2c import PimoroniI2C  # builtin in Pimoroni's micropython
+try:
+    import uasyncio as asyncio
+except ImportError:
+    asyncio = None
+try:
+    import _thread
+except ImportError:  # a firmware without threads
+    _thread = None
 
 from GU_Workout_mod_ini import *
+from glyph_cache import GlyphCache
+from pen_cache import PenCache
+from dead_reckon import DeadReckoner
+from ring_log import RingLog
+from stage_stats import StageStats
+from gc_sched import GCScheduler
+from nmea_framer import NMEAFramer, rxbuf_size
+from link_meter import LinkMeter
+from auto_baud import BAUD_RATES, detect_baud
+from phase_filter import PhaseFilter, PH_NONE, PH_STOPPED, PH_TAXYING, PH_FLYING
+from nmea_pair import FixPairer
+from fix_mailbox import FixMailbox
+from nmea_parse import TIME, LAT, GS, CRS, VAR, ALT, VALID, NR_FIELDS, RMC_OK, GGA_OK, FIX_OK, \
+    F_TIME, F_LAT, F_LON, F_GS, F_CRS, F_VAR, F_ALT, KEY_RMC, KEY_GGA, \
+    new_record, line_key, dispatch, m_to_ft, crs_mag
 
 try:
     from secrets import WIFI_PASSWORD, WIFI_SSID, TZ_OFFSET, NTP_SERVER
@@ -90,14 +122,45 @@ except ImportError:
 # General debug flag             |
 my_debug = False  # Debug flag   |
 # -------------------------------+
+# Log levels (the values of ring_log.py). Calls guarded by 'if LOG_LEVEL <= ...:' below LOG_LEVEL
+# are removed by the compiler. Messages go to the ring buffer 'log' (dumped by button D) and,
+# from LOG_WARN up (every level if my_debug), to the REPL too
+LOG_DEBUG = const(0)
+LOG_INFO = const(1)
+LOG_WARN = const(2)
+LOG_LEVEL = const(LOG_INFO)
+log = RingLog(level=LOG_LEVEL, echo=LOG_DEBUG if my_debug else LOG_WARN)
+# Stages of the pipeline timed in stages (min/avg/max us). Button C shows and dumps them
+STG_RX_WAIT = const(0)  # waiting for a complete fix: ck_uart() (loop()), the time between two fixes (rx_task())
+STG_FRAME = const(1)    # framer.fill() and next_sentence(), per sentence
+STG_PARSE = const(2)    # rx_sentence(): parsing a sentence into rx_rec
+STG_STATUS = const(3)   # ac_status()
+STG_RENDER = const(4)   # drawing a step of a screen (see show() and screen_step()), gu.update() included
+STG_UPDATE = const(5)   # gu.update()
+STG_AGE = const(6)      # not a stage: the age of a fix when its screen starts (mailbox.age())
+stages = StageStats(("rx wait", "frame", "parse", "status", "render", "update", "age"))
 # Other important flags          |
 # -------------------------------+
 use_sound = False
+use_asyncio = True  # Receive, render and handle the buttons in uasyncio tasks. See run_tasks()
+if asyncio is None:
+    use_asyncio = False
+smooth_ribbon = True  # Animate the heading ribbon between fixes (with use_asyncio). See HdgRibbon.draw_smooth()
+use_core1 = False  # With use_asyncio: receive and parse on core 1 (_thread), core 0 only renders. See rx_worker()
+if _thread is None:
+    use_core1 = False
+auto_baud = False  # Find the baudrate of FSUIPC7 GPSout at the start (see find_baud()). Else BAUD is used
+high_rate = False  # GPSout sends 10 fixes per second at HR_BAUD (uasyncio only). See set_high_rate()
 
 # create galactic object and graphics surface for drawing
 gu = GalacticUnicorn()
 gr = PicoGraphics(display=DISPLAY_GALACTIC_UNICORN)
 
+def gu_update():  # copy the framebuffer to the display (timed: STG_UPDATE)
+    t = stages.start()
+    gu.update(gr)
+    stages.stop(STG_UPDATE, t)
+
 button_a_pressed = False 
 button_b_pressed = False
 button_c_pressed = False
@@ -131,6 +194,16 @@ func_rev_dict = {
 curr_func = 2  # default function = disp_crs()
 old_func = curr_func
 
+# The fields of the gps record (see nmea_parse.py) a display function subscribes to.
+# Only these (and BASE_FIELDS) are parsed from the received sentences
+BASE_FIELDS = const(F_TIME | F_GS)  # TIME: pairing of GPRMC and GPGGA (see pair), GS: ac_status()
+FUNC_FIELDS = {
+    "pos_func": F_LAT | F_LON | F_CRS,  # CRS: dead reckoning
+    "gs_func": 0,
+    "crs_func": F_CRS | F_VAR | F_LAT,  # LAT: mag_or_tru()
+    "alt_func": F_ALT
+}
+
 brill = 100 # Using brill to make default brilliance less strong
 
 gc.enable() # Enable autmatic garbage collection
@@ -160,8 +233,17 @@ except Exception as e:
 # 
 # via a TTL-to-USB converter connected to desktop PC Paul1 (COM9)
 #
+BAUD = const(4800)               # the baudrate of FSUIPC7 GPSout (4800 ... 115200, see BAUD_RATES)
+RX_BLOCK_MS = const(5000)        # the longest time loop() does not read the uart: disp_pos() holds 4 s, + 25 %.
+                                 # Not covered: the "RX msgs" banner (the bytes are discarded after it) and the
+                                 # stats scroll of button C
+RX_BLOCK_ASYNC_MS = const(500)   # the same for the uasyncio tasks: a scroll_text() or a gc.collect()
+HR_BAUD = const(38400)           # the baudrate of the 10 Hz mode (high_rate)
+HR_PAIR_WAIT_MS = const(50)      # high_rate: a GPRMC waits this long for its GPGGA. At 38400 baud a GPGGA takes 20 ms
+baud = BAUD  # the baudrate of the uart. Changed by set_baud()
+rxbuf = rxbuf_size(baud, RX_BLOCK_ASYNC_MS if use_asyncio else RX_BLOCK_MS)
 try:
-    uart = UART(1, 4800)
+    uart = UART(1, baud, rxbuf=rxbuf)
 
     # wait a minimum amount of time before trying to read the device
     sleep(0.25)
@@ -169,6 +251,15 @@ except ValueError:  # e.g.: "bad TX pin"
     uart = None
     pass  # for the sake of debugging the rest of this script, let go!
 
+# Streaming sentence framer. Reads the uart into a preallocated ring buffer and counts the overruns
+# of the uart rx buffer. meter measures the throughput of the link (see link_tick())
+framer = NMEAFramer(uart, rxbuf=rxbuf) if uart is not None else None
+meter = LinkMeter(framer, baud) if framer is not None else None
+# Pairs the GPRMC and GPGGA sentences of the same epoch (time field). A GPRMC without its GPGGA
+# after PAIR_WAIT_MS is a fix with the last altitude (see rx_timeout())
+PAIR_WAIT_MS = const(500)
+pair = FixPairer(PAIR_WAIT_MS)
+
 # Global definitions
 # +--------------------------------------------+
 max_lp_cnt = 14  # <<<=========== LOOP COUNT   |
@@ -192,20 +283,18 @@ previousMillis = 0  # unsigned long
 loop_time = 0
 # Message serial nr
 msg_nr = 0
-nRMC = None
-nGGA = None
-GPRMC_cnt = 0
-GPRMC_lst = []
-GPGGA_lst = []
-le_GPRMC_lst = 0
-le_GPGGA_lst = 0
-nr_msg_items = 0
-
-ac_no_data = 0
-ac_stopped = 1
-ac_taxying = 2
-ac_flying = 3
+rx_rec = new_record()  # numeric record filled by the handlers of nmea_parse.dispatch() in rx_sentence()
+rx_want = BASE_FIELDS | FUNC_FIELDS[func_dict[curr_func]]  # the fields to parse. Set by sel_func()
+rx_fields = rx_want  # the fields parsed into the current pair of rx_rec
+my_fields = 0        # the fields parsed into the fix in my_msgs
+
+ac_no_data = PH_NONE
+ac_stopped = PH_STOPPED
+ac_taxying = PH_TAXYING
+ac_flying = PH_FLYING
 ac_stat = ac_stopped
+ac_phase = PhaseFilter()  # the phase from the smoothed groundspeed of every fix (see add_fix(), ac_status())
+ac_stat_names = ("no data", "parked", "taxying", "flying")  # index: ac_stat
 
 # next four defs copied from:
 # I:\pico\paul_projects\pico\circuitpython\msfs2020_gps_rx_picolipo\2021-09-03_16h49_ver
@@ -218,9 +307,27 @@ max_text_len = 25
 # Buffers
 rx_buffer_len = 256 # was: 160 en daarvoor: 2**5  = 2<<5 = 64. Also used: 120
 rx_buffer = bytearray(rx_buffer_len * b'\x00')
-rx_buffer_s = ''
-msg_lst = [] # Create an empty message list. Will later be filled with the GPRMC message parts splitted
-s_telapsed = "Time elapsed between uart rx and GU matrix presentation: "
+s_telapsed = "Time elapsed between uart rx and GU matrix presentation: {} ms"
+s_link = "link: {} bytes/s, {} sentences/s x 10, load {} %, uart overruns: {}, truncated: {}, max backlog {} of {} bytes at {} baud"
+
+# uasyncio runtime (use_asyncio)
+FRAME_MS = const(33)         # renderer frame period: 30 frames per second
+RX_WAIT_MS = const(1)        # uart.any() poll period of ck_uart() and of rx_task() while a GPRMC waits for its GPGGA
+RX_EXIT_MS = const(300000)   # ck_uart() returns 0 after this time without a sentence
+BTN_POLL_MS = const(20)      # button queue poll period
+BTN_DEBOUNCE_MS = const(200) # a repeated press of the same button within this time is ignored
+NODATA_MS = const(30000)     # show "no data" after this time without a sentence
+fix_seq = 0       # incremented by mail_task() for every fix written to my_msgs
+wake = asyncio.Event() if asyncio is not None else None  # render_task() runs: set every FRAME_MS, for a fix and a button press
+stats_req = False # button C: render_task() shows the stage stats
+# rx_task() or rx_worker() (core 1) -> mailbox -> fix_flag -> mail_task(); ck_uart() -> mailbox -> loop()
+mailbox = FixMailbox(NR_FIELDS)  # the latest fix. Older fixes that were not taken yet are coalesced
+fix_rec = new_record()           # the fix taken from the mailbox by mail_task() or loop()
+fix_flag = asyncio.ThreadSafeFlag() if asyncio is not None else None  # set by rx_put() for every fix
+rx_stop = False   # rx_worker() ends
+core1_on = False  # rx_worker() runs
+rx_nr_bytes = 0   # nr of bytes of the current GPRMC + GPGGA pair in rx_buffer
+DR_FRAME_MS = const(250)     # redraw period of the dead reckoned position and altitude (disp_pos(), disp_alt())
 
 # Pre-definition to prevent ... isn't defined
 #def scroll_text(msg):
@@ -258,9 +365,10 @@ rtc = machine.RTC()
 year, month, day, wd, hour, minute, second, _ = rtc.datetime()
 last_second = second
 
-# set up some pens to use later
-WHITE = gr.create_pen(255, 255, 255)
-BLACK = gr.create_pen(0, 0, 0)
+# set up some pens to use later. Other colours: pens.pen(r, g, b), created once per colour
+pens = PenCache(gr)
+WHITE = pens.pen(255, 255, 255)
+BLACK = pens.pen(0, 0, 0)
 
 btn_none = 0
 btn_a = 1
@@ -275,13 +383,50 @@ btn_dict = {
     btn_d: "button d"
     }
 
+"""
+ButtonQueue(size)
+        Fixed size FIFO of button codes (btn_a ... btn_d). put() is called by the IRQ handlers:
+        it does not allocate and drops a press when the queue is full or when it is a bounce
+        (the same button within BTN_DEBOUNCE_MS). get() is called by btn_task().
+"""
+class ButtonQueue:
+
+    def __init__(self, size=8):
+        self._q = bytearray(size)
+        self._head = 0
+        self._tail = 0
+        self._n = 0
+        self._last = btn_none
+        self._t_last = 0
+
+    def put(self, code):
+        t = time.ticks_ms()
+        if code == self._last and time.ticks_diff(t, self._t_last) < BTN_DEBOUNCE_MS:
+            return False
+        self._last = code
+        self._t_last = t
+        if self._n >= len(self._q):
+            return False
+        self._q[self._head] = code
+        self._head = (self._head + 1) % len(self._q)
+        self._n += 1
+        return True
+
+    def get(self):  # the oldest button code, btn_none if the queue is empty
+        if self._n == 0:
+            return btn_none
+        code = self._q[self._tail]
+        self._tail = (self._tail + 1) % len(self._q)
+        self._n -= 1
+        return code
+
+btn_q = ButtonQueue()
+
 # state constants
 STATE_PRE_SCROLL = 0
 STATE_SCROLLING = 1
 STATE_POST_SCROLL = 2
 
-shift = 0
-state = STATE_PRE_SCROLL
 
 # set the font
 gr.set_font("bitmap8")
@@ -290,136 +435,116 @@ gr.set_font("bitmap8")
 msg_width = gr.measure_text(MESSAGE, 1)
 
 
-ID = const(0)
-LAT = const(1)
-LATDIR = const(2)
-LON = const(3)
-LONDIR = const(4)
-GS = const(5)
-CRS = const(6)
-DATE = const(7)
-VAR = const(8)
-VARDIR = const(9)
-ALT = const(10)
-
+# Index constants of the numeric gps record (LAT, LON, GS, CRS, VAR, ALT, ...) are defined in nmea_parse.py
 class gps_msgs:
 
     def __init__(self):
-        self.gps = ["",  "",  "",  "",  "", "", "", "", "", "", ""]
-
-    def write(self, s):
-        tp = isinstance(s,list)
-        if tp == True:
-            self.gps[ID] = s[ID] # ID
-            self.gps[LAT] = s[LAT] # Lat
-            self.gps[LATDIR] = s[LATDIR] # LadID N/S
-            self.gps[LON] = s[LON] # Lon
-            self.gps[LONDIR] = s[LONDIR] # LonID E/W
-            self.gps[GS] = s[GS] # GS
-            self.gps[CRS] = s[CRS] # CRS
-            self.gps[DATE] = s[DATE] # Var
-            self.gps[VAR] = s[VAR] # Var
-            self.gps[VARDIR] = s[VARDIR] # VarDir
-            self.gps[ALT] = s[ALT] # Alt
-
-    def read(self, n):
-        tp = isinstance(n, type(None))
-        if tp == True:
-            n = ID
-        if n >= ID and n <= ALT:
+        self.gps = new_record()
+
+    def write(self, rec):  # copy a parsed record. No new objects are created
+        for i in range(NR_FIELDS):
+            self.gps[i] = rec[i]
+
+    def read(self, n=None):
+        if n is not None and n >= 0 and n < NR_FIELDS:
             return self.gps[n]
         else:
             return self.gps
 
     def clean(self):
-        self.gps[ID] = ""
-        self.gps[LAT] = ""
-        self.gps[LATDIR] = ""
-        self.gps[LON] = ""
-        self.gps[LONDIR] = ""
-        self.gps[GS] = ""
-        self.gps[CRS] = ""
-        self.gps[DATE] = ""
-        self.gps[VAR] = ""
-        self.gps[VARDIR] = ""
-        self.gps[ALT] = ""
+        for i in range(NR_FIELDS):
+            self.gps[i] = 0
 
 my_msgs = gps_msgs()
 if my_debug:
     print(f"global: type(my_msgs)= {type(my_msgs)}")
+dr = DeadReckoner()  # the last fix of my_msgs, extrapolated to the time it is shown
 
 gc.collect()
+gcs = GCScheduler()  # collects in the idle windows: gcs.idle() in loop() and rx_task()
 
 last_time = time.ticks_ms()
 
+# Lit-pixel runs of the FONT glyphs and of the strings drawn by prnt_st(), rendered on first use
+glyphs = GlyphCache(FONT, FONT_WIDTH, FONT_HEIGHT)
+glyphs.string("Reset...")  # ready before handle_rst() needs it
+
 def character(asc, xt, yt, r, g, b):  # Single character sz is size: 1 or 2
-    colour = gr.create_pen(r, g, b)
+    colour = pens.pen(r, g, b)
     gr.set_pen(colour)
-    code = asc * 5    # 5 bytes per character
-    for ii in range(5):
-        line = FONT[code + ii]
-        for yy in range(8):
-            if (line >> yy) & 0x1:
-                gr.pixel(ii+xt, yy+yt) 
+    glyphs.blit(gr, glyphs.glyph(asc), xt, yt)
                                     
-def prnt_st(asci, xx, yy, r, g, b):  # Text string
-    move = 6
-    for letter in(asci):
-        asci = ord(letter)
-        character(asci, xx, yy, r, g, b)
-        xx = xx + move
+def prnt_st(asci, xx, yy, r, g, b):  # Text string. Characters 6 pixels apart
+    colour = pens.pen(r, g, b)
+    gr.set_pen(colour)
+    glyphs.text(gr, asci, xx, yy)
         
 def handle_rst(pin):
     if pin == button_rst:
         print("Going to reset...")
-        gr.set_pen(gr.create_pen(0, 0, 0))
+        gr.set_pen(pens.pen(0, 0, 0))
         gr.clear()
         prnt_st("Reset...", 6, 2, brill, 0, 0) # Text examples
-        gu.update(gr)
+        gu_update()
+        shown.invalidate()
         time.sleep(2)
         machine.reset()
         
+def sel_func(step):  # select the next (step 1) or previous (step -1) display function
+    global curr_func, rx_want
+    le = len(func_dict)
+    curr_func += step
+    if curr_func >= le:
+        curr_func = 0
+    if curr_func < 0:
+        curr_func = le-1
+    rx_want = BASE_FIELDS | FUNC_FIELDS[func_dict[curr_func]]
+    if LOG_LEVEL <= LOG_INFO:
+        log.info("sel_func(): ", "new curr_func = {} ('{}')", curr_func, func_dict[curr_func])
+
 def handle_a(pin):
-    global curr_func, button_a_pressed
+    global button_a_pressed
+    if use_asyncio:
+        btn_q.put(btn_a)  # handled by btn_task()
+        return
     if button_a_pressed:
         #button_a_pressed = False
         return # prevent handle bounce
     else:
         button_a_pressed = True
-    le = len(func_dict)
-    curr_func += 1
-    if curr_func >= le:
-        curr_func = 0
-    print(f"handle_a(): new curr_func = {curr_func} (\'{func_dict[curr_func]}\')")
+    sel_func(1)
 
 def handle_b(pin):
-    global curr_func, button_b_pressed
+    global button_b_pressed
+    if use_asyncio:
+        btn_q.put(btn_b)
+        return
     if button_b_pressed:
         #button_b_pressed = False
         return # prevent handle bounce
     else:
         button_b_pressed = True
-    le = len(func_dict)
-    curr_func -= 1
-    if curr_func < 0:
-        curr_func = le-1
-    print(f"handle_b(): new curr_func = {curr_func} (\'{func_dict[curr_func]}\')")
+    sel_func(-1)
 
 def handle_c(pin):
     global button_c_pressed
+    if use_asyncio:
+        btn_q.put(btn_c)
+        return
     if button_c_pressed:
         return # prevent handle bounce
     else:
-        button_c_pressed = True
-    pass
+        button_c_pressed = True  # loop() shows the stage stats
 
 def handle_d(pin):
     global button_d_pressed
+    if use_asyncio:
+        btn_q.put(btn_d)
+        return
     if button_d_pressed:
         return # prevent handle bounce
     else:
-        button_d_pressed = True
-    pass
+        button_d_pressed = True  # loop() dumps the log
 
 def clr_buttons():
     global button_a_pressed, button_b_pressed, button_c_pressed, button_d_pressed
@@ -470,7 +595,7 @@ if use_sound:
             vol = min(vol + 10, max_vol)
             #channels[0].frequency(vol)
             text = "Vol Up"+' '+str(vol)
-            gr.set_pen(gr.create_pen(0, 0, 0))
+            gr.set_pen(pens.pen(0, 0, 0))
             gr.clear()
             outline_text(text)
 
@@ -481,7 +606,7 @@ if use_sound:
             vol = max(vol - 10, min_vol)
             #channels[0].frequency(vol)
             text = "Vol Dn"+' '+str(vol)
-            gr.set_pen(gr.create_pen(0, 0, 0))
+            gr.set_pen(pens.pen(0, 0, 0))
             gr.clear()
             outline_text(text, cnt=0)
 
@@ -522,62 +647,153 @@ if use_sound:
         tone_a = 0
         tone_b = 0
 #---------------------------------------------------------------------------
-def scroll_text(msg, do_scroll):
-    global state, PADDING, BACKGROUND_COLOUR, shift
-    # set the font
-    TAG="scroll_text(): "
-    gr.set_font("bitmap6")  #"bitmap8")
+"""
+RenderState
+        Remembers what the display shows: a screen id (SCR_TEXT, SCR_CRS) and the value drawn
+        by that screen (the text, the rounded heading). changed() is asked before a screen draws:
+        if the same screen would draw the same value, both the drawing and gu.update() are skipped.
+        Code that updates the display in another way calls invalidate() (or force() for a frame
+        that always has to be drawn, e.g. a scroll step).
+        Counters (attributes): drawn, skipped
+"""
+SCR_NONE = const(0)
+SCR_TEXT = const(1)   # a static text of the scroller
+SCR_CRS = const(2)    # the heading ribbon
+SCR_RIBBON = const(3) # the animated heading ribbon
 
-    # calculate the message width so scrolling can happen
-    msg_width = gr.measure_text(msg, 1)
+class RenderState:
 
-    last_time = time.ticks_ms()
+    def __init__(self):
+        self.scr = SCR_NONE
+        self.value = None
+        self.drawn = 0
+        self.skipped = 0
+
+    def changed(self, scr, value):  # True: draw it. False: the display shows it already
+        if scr == self.scr and value == self.value:
+            self.skipped += 1
+            return False
+        self.scr = scr
+        self.value = value
+        self.drawn += 1
+        return True
 
-    cnt = 0
-    
-    print(TAG+f"going to scroll text: \'{msg}\'")
-    while True:
-        time_ms = time.ticks_ms()
-
-        if gu.is_pressed(gu.SWITCH_BRIGHTNESS_UP):
-            gu.adjust_brightness(+0.01)
-
-        if gu.is_pressed(gu.SWITCH_BRIGHTNESS_DOWN):
-            gu.adjust_brightness(-0.01)
-
-        if do_scroll:
-            if state == STATE_PRE_SCROLL and time_ms - last_time > HOLD_TIME * 1000:
-                if msg_width + PADDING * 2 >= width:
-                    state = STATE_SCROLLING
-                last_time = time_ms
-
-            if state == STATE_SCROLLING and time_ms - last_time > STEP_TIME * 1000:
-                shift += 1
-                if shift >= (msg_width + PADDING * 2) - width - 1:
-                    state = STATE_POST_SCROLL
-                last_time = time_ms
-
-            if state == STATE_POST_SCROLL and time_ms - last_time > HOLD_TIME * 1000:
-                state = STATE_PRE_SCROLL
-                shift = 0
-                last_time = time_ms
-        else:
-            PADDING = 2
-            
-        gr.set_pen(gr.create_pen(int(BACKGROUND_COLOUR[0]), int(BACKGROUND_COLOUR[1]), int(BACKGROUND_COLOUR[2])))
-        gr.clear()
+    def force(self):
+        self.invalidate()
+        self.drawn += 1
+
+    def invalidate(self):
+        self.scr = SCR_NONE
+        self.value = None
 
-        #outline_text(msg, x=PADDING - shift, y=2)
-        outline_text(msg, x=PADDING - shift, y=2, cnt=cnt)
+    def stats(self):  # (drawn, skipped)
+        return self.drawn, self.skipped
+
+shown = RenderState()
+
+"""
+Scroller
+        Frame driven text scroller. start() sets a new message (the object is reused for every
+        message): it measures the text once and draws the first frame. tick() is called once per
+        frame by a scheduler (render_task() or scroll_text()): it advances the scroll position by
+        the number of STEP_TIME steps elapsed since the previous tick (ticks_ms) and redraws only
+        when the position changed. Nothing blocks: reception continues between the ticks.
+        States: STATE_PRE_SCROLL (HOLD_TIME) -> STATE_SCROLLING -> STATE_POST_SCROLL (HOLD_TIME).
+        A static text (do_scroll False), or one that fits the display, is done after the first frame.
+        Both are drawn the same and recorded in shown: they are not drawn again when the display
+        shows them already (see RenderState).
+"""
+class Scroller:
 
+    def __init__(self):
+        self.msg = ''
+        self.msg_width = 0
+        self.do_scroll = False
+        self.active = False
+        self.state = STATE_PRE_SCROLL
+        self.shift = 0
+        self.padding = PADDING
+        self._t_last = 0
+        self._bg = pens.pen(*BACKGROUND_COLOUR)
+
+    def start(self, msg, do_scroll):
+        TAG="Scroller.start(): "
+        if not do_scroll and not shown.changed(SCR_TEXT, msg):  # before the measuring: dr_hold() asks every frame
+            self.active = False
+            return
+        # set the font
+        gr.set_font("bitmap6")  #"bitmap8")
+        # calculate the message width so scrolling can happen
+        msg_width = gr.measure_text(msg, 1)
+        if do_scroll and msg_width + PADDING * 2 < width:  # a text that fits is a static one
+            do_scroll = False
+            if not shown.changed(SCR_TEXT, msg):
+                self.active = False
+                return
+        if LOG_LEVEL <= LOG_DEBUG:
+            log.debug(TAG, "going to scroll text: '{}'", msg)
+        self.msg = msg
+        self.msg_width = msg_width
+        self.padding = PADDING if do_scroll else 2
+        self.do_scroll = do_scroll
+        self.state = STATE_PRE_SCROLL
+        self.shift = 0
+        self._t_last = time.ticks_ms()
+        self.active = self.do_scroll
+        if self.active:
+            shown.force()
+        self.draw()
+
+    def draw(self):
+        gr.set_pen(self._bg)
+        gr.clear()
+        gr.set_pen(WHITE)
+        gr.text(self.msg, self.padding - self.shift, 2, -1, 1)
         # update the display
-        gu.update(gr)
+        gu_update()
 
-        # pause for a moment (important or the USB serial device will fail)
-        time.sleep(0.001)
-        cnt += 1
-        if cnt >= msg_width:
-            break
+    """
+    tick(void) -> bool
+            Advance the scroller to the current time
+            Return: True while the message is scrolling, False when it is done
+    """
+    def tick(self):
+        if not self.active:
+            return False
+        t = time.ticks_ms()
+        elapsed = time.ticks_diff(t, self._t_last)
+        if self.state == STATE_PRE_SCROLL:
+            if elapsed > HOLD_TIME * 1000:
+                self.state = STATE_SCROLLING
+                self._t_last = t
+        elif self.state == STATE_SCROLLING:
+            steps = int(elapsed // (STEP_TIME * 1000))
+            if steps > 0:
+                last = (self.msg_width + self.padding * 2) - width - 1
+                self.shift = min(self.shift + steps, last)
+                if self.shift >= last:
+                    self.state = STATE_POST_SCROLL
+                self._t_last = time.ticks_add(self._t_last, int(steps * STEP_TIME * 1000))
+                shown.force()
+                self.draw()
+        elif elapsed > HOLD_TIME * 1000:  # STATE_POST_SCROLL
+            self.state = STATE_PRE_SCROLL
+            self.active = False
+        return self.active
+
+scroller = Scroller()
+
+"""
+scroll_text(msg, do_scroll) -> void
+        Show msg with the scroller. A scrolling message is ticked here until it is done,
+        for the callers outside render_task() (intro(), main(), loop()).
+        Parameters: msg: the text. do_scroll: scroll a text that does not fit the display
+        Return: None
+"""
+def scroll_text(msg, do_scroll):
+    scroller.start(msg, do_scroll)
+    while scroller.tick():
+        time.sleep(STEP_TIME)
 
 #@micropython.native  # noqa: F821
 def from_hsv(h, s, v):
@@ -616,13 +832,13 @@ def gradient_background(start_hue, start_sat, start_val, end_hue, end_sat, end_v
         sat = ((end_sat - start_sat) * (x / half_width)) + start_sat
         val = ((end_val - start_val) * (x / half_width)) + start_val
         colour = from_hsv(hue, sat, val)
-        gr.set_pen(gr.create_pen(int(colour[0]), int(colour[1]), int(colour[2])))
+        gr.set_pen(pens.pen(*colour))
         for y in range(0, height):
             gr.pixel(x, y)
             gr.pixel(width - x - 1, y)
 
     colour = from_hsv(end_hue, end_sat, end_val)
-    gr.set_pen(gr.create_pen(int(colour[0]), int(colour[1]), int(colour[2])))
+    gr.set_pen(pens.pen(*colour))
     for y in range(0, height):
         gr.pixel(half_width, y)
 
@@ -632,8 +848,8 @@ def outline_text(text, x, y, alt_clr=(255,255,255), cnt=0):
 
     if x < 0:
         x = -x  # make it positive
-    if not my_debug and cnt == 0:
-        print(f"outline_text(): text = \'{text}\', x,y = {x},{y}")
+    if LOG_LEVEL <= LOG_DEBUG and cnt == 0:
+        log.debug("outline_text(): ", "text = '{}', x,y = {},{}", text, x, y)
     #gr.set_pen(gr.create_pen(alt_clr[0], alt_clr[1], alt_clr[2]))
     gr.set_pen(WHITE)
     gr.text(text, x, y, -1, 1)
@@ -690,7 +906,8 @@ def sync_time(show):
 
         if show:
             redraw_display_if_reqd()
-            gu.update(gr)
+            gu_update()
+            shown.invalidate()
 
     if max_wait > 0:
         print(TAG+"Connected")
@@ -769,6 +986,22 @@ def redraw_display_if_reqd():
 
 gu.set_brightness(0.2)  # was: (0.5)
 
+# Animated heading ribbon (smooth_ribbon)
+RIBBON_PX = const(9)            # pixels per degree. A label per 2 degrees: 18 pixels apart
+RIBBON_LABEL_HALF = const(8)    # half the width of a '000' label
+RIBBON_FRAME_MS = const(33)     # 30 frames per second
+TURN_MAX_DT_MS = const(3000)    # fixes further apart give no turn rate estimate
+SMOOTH_EXTRAP_MS = const(1500)  # max extrapolation of the heading with the turn rate
+SMOOTH_MAX_MS = const(3000)     # stop animating when no fix arrived for this time
+SMOOTH_DIV = const(4)           # each frame the shown heading moves 1/SMOOTH_DIV of the way to the target
+
+def wrap_cd(d):  # a heading difference in 1/100 degrees into the range -18000 ... 17999
+    while d >= 18000:
+        d -= 36000
+    while d < -18000:
+        d += 36000
+    return d
+
 class HdgRibbon():
     def __init__(self):
         global width, height
@@ -795,115 +1028,176 @@ class HdgRibbon():
         # self.h_pts =   [  0,  12,  22,  32,  42,  52,  64]   # for the HUB75 LED matrix panels
         self.h_pts =   [  2,  10,  18,  26,  34,  42,  50]   # for the Galactic Unicorn LED matrix panel
         self.hdg_pts = [-30, -20, -10,   0,  10,  20,  30]
+        self._static = self._static_layer()
+        self._pen_side = pens.pen(0, 100, 100)  # outer heading values
+        self._pen_mid = pens.pen(100, 0, 0)     # base line, ticks and the current heading
+        self._h_lst = ["", "", ""]
+        self._hdg_fmt = None  # the heading the strings in _h_lst are formatted for
+        self._labels = [None] * 180  # labels of the even headings, see label()
+        self._fix_cd = 0      # heading of the last fix, 1/100 degrees
+        self._fix_ms = None   # ticks_ms of the last fix
+        self._rate = 0        # turn rate, 1/100 degrees per second
+        self._disp_cd = None  # heading shown by draw_smooth(), 1/100 degrees
         sleep(1)
         
         
-    def ribbon_base(self):
-        TAG = "ribbon.ribbon_base(): "
-        r = 0   # int(OUTLINE_COLOUR[0])
-        g = 100 # int(OUTLINE_COLOUR[1])
-        b = 100 # int(OUTLINE_COLOUR[2])
-        r1 = 100
-        g1 = 0
-        b1 = 0
-        gr.set_pen(gr.create_pen(0, 0, 0))
+    """
+    The ribbon has two layers:
+        static:  the red base line (bottom row) and the tick marks at h_pts (the row above it).
+                 Precomputed once as (x, y, length) runs, drawn with one pixel_span() per run.
+        digits:  the heading -2 (left), the heading (middle, red) and the heading +2 (right),
+                 in rows 0 ... height-3. Redrawn only when the rounded heading changes.
+    draw() redraws only the digit layer when the display shows the ribbon already.
+    """
+    def _static_layer(self):
+        runs = bytearray()
+        for x in self.h_pts:
+            runs.extend((x, self.height-2, 1))
+        runs.extend((0, self.height-1, self.width))
+        return bytes(runs)
+
+    def blit_static(self):
+        runs = self._static
+        gr.set_pen(self._pen_mid)
+        i = 0
+        while i < len(runs):
+            gr.pixel_span(runs[i], runs[i+1], runs[i+2])
+            i += 3
+
+    def rounded(self):  # the heading shown in the middle of the ribbon: 0 ... 359
+        return int(round(self.fs_heading)) % 360
+
+    def draw_digits(self):
+        hdg = self.rounded()
+        if hdg != self._hdg_fmt:  # format the three values only when the heading changed
+            self._hdg_fmt = hdg
+            self._h_lst[0] = "{:03d}".format((hdg - 2) % 360)  # Previous heading value
+            self._h_lst[1] = "{:03d}".format(hdg)              # Current heading value
+            self._h_lst[2] = "{:03d}".format((hdg + 2) % 360)  # Next heading value
+        gr.set_font("bitmap6")
+        gr.set_pen(self._pen_side)
+        gr.text(self._h_lst[0], 1, 0, -1, 1)
+        gr.text(self._h_lst[2], 36, 0, -1, 1)
+        gr.set_pen(self._pen_mid)
+        gr.text(self._h_lst[1], 19, 2, -1, 1)
+
+    def ribbon_base(self):  # full redraw: both layers
+        gr.set_pen(BLACK)
         gr.clear()
-        #------------------------------------------
-        # Draw the base line
-        #------------------------------------------
-        gr.set_pen(gr.create_pen(r1, g1, b1))
-        # print(TAG+f"outline colours: {r1},{g1},{b1}")
-        for i in range(len(self.h_pts)):
-            x = self.h_pts[i]
-            y1 = self.height-2
-            y2 = self.height-1
-            # print(TAG+f"x,y1,y2 = {x},{y1},{y2}")
-            gr.pixel(self.h_pts[i], self.height-2)
-        for i in range(width):
-            gr.pixel(i, self.height-1)
-        #-------------------------------------------
-        # Calculate
-        #-------------------------------------------
-        #gr.set_pen(gr.create_pen(r, g, b))
-        h = self.fs_heading
-        h_lst = []
-        hi_lst = []
-        w = 0
-        for _ in range(3):
-            if _ == 0:
-                h_dev = -2  # Previous heading value
-            elif _ == 1:
-                h_dev = 0  # Current heading value
-            elif _ == 2:
-                h_dev = 2  # Next heading value
-            h_lst.append( "{:03d}".format(int(round(float(h + h_dev)))) )   # hdg-1   hdg   hdg+1
-            hi_lst.append( h + h_dev)
-        s_width = gr.measure_text(h_lst[1], 1) // 2 # calculate the width of the middle item
-        if my_debug:
-            print(TAG+f"s_width = {s_width}")
-        #-------------------------------------------
-        # Draw the heading values
-        #-------------------------------------------
-        bg = (0, 0, 0)
-        for _ in range(1, 6, 2):
-            # print(TAG+f"_ = {_}")
-            if _ == 1:
-                idx = 0
-                y = 0
-                fg = (r, g, b)
-                """
-                print(TAG+f"h_lst[idx][:1] = \'{h_lst[idx][:1]}\'")
-                if h_lst[idx][:1] == "0":
-                    x_comp = -3
-                else:
-                    x_comp = 0
-                """
-                x = 1
-            elif _ == 3:
-                idx = 1
-                y = 2
-                fg = (r1, g1, b1)
-                """
-                if h_lst[idx][:1]  == "0":
-                    x_comp = 0
-                else:
-                    x_comp = 1
-                """
-                x = 19
-            elif _ == 5:
-                idx = 2
-                y = 0
-                fg = (r, g, b)
-                """
-                if h_lst[idx][:1]  == "0":
-                    x_comp = 2
-                else:
-                    x_comp = 2
-                """
-                x = 36
-            gc.collect()
-            gr.set_pen(gr.create_pen(fg[0], fg[1], fg[2]))
-            #outline_text(h_lst[idx], self.h_pts[_] - s_width + x_comp, y, fg, cnt=0)
-            #outline_text(h_lst[idx], x, y, fg, cnt=0)
-            gr.text(h_lst[idx], x, y, -1, 1)
+        self.blit_static()
+        self.draw_digits()
+        gu_update()
 
-        gu.update(gr)
+    def ribbon_digits(self):  # redraw the digit layer only. The static layer is in the framebuffer
+        gr.set_pen(BLACK)
+        gr.rectangle(0, 0, self.width, self.height-2)
+        self.draw_digits()
+        gu_update()
+
+    """
+    draw(void) -> bool
+            Show the ribbon for fs_heading. Nothing is drawn if the display shows that heading
+            already (see RenderState), only the digits if it shows the ribbon with another heading.
+            Return: True if the display has been updated
+    """
+    def draw(self):
+        on_display = shown.scr == SCR_CRS
+        if not shown.changed(SCR_CRS, self.rounded()):
+            return False
+        if on_display:
+            self.ribbon_digits()
+        else:
+            self.ribbon_base()
+        return True
 
     # Wrapper function  - called from main()
     def draw_number(self, x, y, number, fg=None, bg=None):
         scroll_text(number, False)
 
     def set_heading_fm_sim(self, hdg):  # called by disp_crs()
-        global my_debug
-        if my_debug:
-            print("set_heading_fm_sim(): heading set to: ", hdg)
+        if LOG_LEVEL <= LOG_DEBUG:
+            log.debug("set_heading_fm_sim(): ", "heading set to: {}", hdg)
         self.fs_heading = hdg
+        # Turn rate estimate for draw_smooth(): the heading change since the previous fix
+        t = time.ticks_ms()
+        cd = int(round(hdg * 100)) % 36000
+        if self._fix_ms is not None:
+            dt = time.ticks_diff(t, self._fix_ms)
+            if 0 < dt <= TURN_MAX_DT_MS:
+                self._rate = wrap_cd(cd - self._fix_cd) * 1000 // dt
+            else:  # a first fix after a pause: no estimate
+                self._rate = 0
+        if self._disp_cd is None:
+            self._disp_cd = cd
+        self._fix_cd = cd
+        self._fix_ms = t
+
+    def fix_age(self):  # ms since the last set_heading_fm_sim()
+        if self._fix_ms is None:
+            return SMOOTH_MAX_MS
+        return time.ticks_diff(time.ticks_ms(), self._fix_ms)
+
+    def label(self, deg):  # the '000' ... '358' label of an even heading. Formatted once
+        i = deg >> 1
+        s = self._labels[i]
+        if s is None:
+            s = self._labels[i] = "{:03d}".format(deg)
+        return s
+
+    """
+    draw_smooth(void) -> bool
+            Animated ribbon. The heading shown moves every frame towards the heading of the
+            last fix extrapolated with the turn rate (for max SMOOTH_EXTRAP_MS), so the scale
+            slides pixel by pixel instead of jumping once per fix.
+            The scale: RIBBON_PX pixels per degree, a tick per degree, a label per 2 degrees.
+            The label nearest to the centre is red (y 2), the others blue-green (y 0).
+            Headings are handled in 1/100 degrees, wrapped at 0/360. No strings are formatted
+            per frame: labels come from self._labels.
+            Return: True if the display has been updated (the scale moved at least one pixel)
+    """
+    def draw_smooth(self):
+        dt = self.fix_age()
+        if dt > SMOOTH_EXTRAP_MS:
+            dt = SMOOTH_EXTRAP_MS
+        target = self._fix_cd + self._rate * dt // 1000
+        d = wrap_cd(target - self._disp_cd)
+        if -SMOOTH_DIV < d < SMOOTH_DIV:
+            self._disp_cd = (self._disp_cd + d) % 36000
+        else:
+            self._disp_cd = (self._disp_cd + d // SMOOTH_DIV) % 36000
+        hdg_px = self._disp_cd * RIBBON_PX // 100  # position of the heading on the scale
+        if not shown.changed(SCR_RIBBON, hdg_px):
+            return False
+        w = self.width
+        cx = w // 2
+        gr.set_pen(BLACK)
+        gr.clear()
+        gr.set_font("bitmap6")
+        gr.set_pen(self._pen_mid)
+        gr.pixel_span(0, self.height-1, w)  # base line
+        deg = (hdg_px - cx) // RIBBON_PX  # the degree at (or left of) x = 0
+        x = deg * RIBBON_PX - hdg_px + cx
+        while x < w + RIBBON_LABEL_HALF:
+            if 0 <= x < w:
+                gr.pixel(x, self.height-2)  # tick
+            if deg & 1 == 0:
+                if -RIBBON_PX <= x - cx <= RIBBON_PX:
+                    gr.text(self.label(deg % 360), x - RIBBON_LABEL_HALF, 2, -1, 1)
+                else:
+                    gr.set_pen(self._pen_side)
+                    gr.text(self.label(deg % 360), x - RIBBON_LABEL_HALF, 0, -1, 1)
+                    gr.set_pen(self._pen_mid)
+            deg += 1
+            x += RIBBON_PX
+        gu_update()
+        return True
 
 
 # --------------------------------------------------  +
-# Prototypes of the 13 functions in this script file: |
+# Prototypes of the functions in this script file:    |
 # --------------------------------------------------  +
 """
+    def gu_update() # (void)
     def ck_uart(): # (nr_bytes)
     def disp_crs(): # ()
     def empty_buffer():  # (void)
@@ -912,11 +1206,36 @@ class HdgRibbon():
     def ck_gs(): # (float)
     def ac_is_stopped(void) # (bool)
     def ac_is_taxying(show_speed) # (bool)
-    def disp_crs() # (void)
-    def disp_pos() # (void)
-    def disp_gs() # (void)
-    def disp_alt() # (void)
+    def disp_crs() # (screen)
+    def dr_hold(fmt, hold) # (screen)
+    def pos_text(v, hemi) # (str)
+    def lat_text() # (str)
+    def lon_text() # (str)
+    def alt_text() # (str)
+    def disp_pos() # (screen)
+    def disp_gs() # (screen)
+    def disp_alt() # (screen)
+    def fix_has_fields() # (bool)
     def loop(): # (void)
+    def link_tick() # (void)
+    def set_baud(b) # (void)
+    def find_baud(first) # (int)
+    def set_high_rate() # (void)
+    def rx_sentence(n) # (bool)
+    def rx_timeout() # (bool)
+    def add_fix(rec, fields, t_ms) # (bool)
+    def rx_put() # (void)
+    async def rx_task() # (void)
+    def rx_worker() # (void)
+    def start_core1() # (void)
+    def stop_core1() # (void)
+    async def mail_task() # (void)
+    async def btn_task() # (void)
+    async def frame_task() # (void)
+    def stats_text() # (str)
+    def dump_stats() # (void)
+    def stats_screen() # (screen)
+    async def render_task(screen) # (void)
     def main():
 """
 
@@ -928,16 +1247,10 @@ def reset():
 def ck_gs():
     global v_gs, my_msgs
     TAG= "ck_gs(): "
-    t_gs = my_msgs.read(GS)
-    le = len(t_gs)
-    if my_debug:
-        print(TAG,"value of gs = {}, len(gs) = {}".format(t_gs, le), end='\n')
-    if le == 0: # check for t_gs == "". This happened sometimes!
-        v_gs = 0
-    else:
-        v_gs = round(int(float(t_gs)))
-    if not my_debug:
-        print(TAG,"value of v_gs = {}".format(v_gs), end='\n')
+    t_gs = my_msgs.read(GS)  # knots x 10. An empty field has been parsed as 0
+    v_gs = t_gs // 10
+    if LOG_LEVEL <= LOG_DEBUG:
+        log.debug(TAG, "value of gs = {}, v_gs = {}", t_gs, v_gs)
     return v_gs
 
 def nodata():
@@ -946,28 +1259,27 @@ def nodata():
     s = "no data"
     if ac_stat != ac_no_data:
         ac_stat = ac_no_data
+    ac_phase.reset()  # the next fix starts the phase over: its smoothed speed and dwell are not of this flight
     scroll_text(s, False)
-    print(TAG+s)
+    log.warn(TAG, s)
     
+"""
+ac_status() -> void
+        Set ac_stat to the phase of the airplane (stopped, taxying or flying). The phase is not taken
+        from the groundspeed of this fix alone: ac_phase (phase_filter.py) smooths the groundspeed of every
+        fix (see add_fix()) and changes the phase with hysteresis around 0.5 - 1 and 28 - 32 kts, and
+        only after the previous phase lasted PHASE_DWELL_MS. So the screen only changes on real transitions
+"""
 def ac_status():
     global ac_stat, v_gs
     TAG= "ac_status(): "
-    stats_dict = {
-        ac_no_data: "no data",
-        ac_stopped: "parked",
-        ac_taxying: "taxying",
-        ac_flying: "flying"
-    }
+    t = stages.start()
     v_gs = ck_gs()
-    if v_gs < 0.2:
-        ac_stat = ac_stopped
-    elif v_gs >= 0.2 and v_gs <= 30:  # keep margin. Sometimes while parked the gs can be 0.1
-        ac_stat = ac_taxying
-    elif v_gs > 30:
-        ac_stat = ac_flying
-    if not my_debug:
-        if ac_stat >= ac_no_data and ac_stat <= ac_flying:
-            print(TAG+f"airplane is {stats_dict[ac_stat]}")
+    if ac_phase.phase != PH_NONE:
+        ac_stat = ac_phase.phase
+    stages.stop(STG_STATUS, t)
+    if LOG_LEVEL <= LOG_INFO:
+        log.info(TAG, "airplane is {}", ac_stat_names[ac_stat])
    
 """
  Function copied from: I:\pico\paul_projects\pico\circuitpython\msfs2020_gps_rx_picolipo\2021-09-03_16h49_ver
@@ -981,7 +1293,8 @@ def ac_is_stopped():
     lelapsed = True
     if ac_stat == ac_stopped:
         scroll_text("ac parked", False)
-        print(s, end = '\n') # Alway print to REPL (it does almost immediately)
+        if LOG_LEVEL <= LOG_INFO:
+            log.info(TAG, s)
 
 
 def ac_is_taxying(show_speed=False):
@@ -994,12 +1307,13 @@ def ac_is_taxying(show_speed=False):
         else:
             s = 'Speed {} kts'.format(v_gs)    
         scroll_text(s, False)
-        print(TAG+s)
+        if LOG_LEVEL <= LOG_INFO:
+            log.info(TAG, s)
 
 
 def loop():
     global startup, led, lp_cnt, ID_s, lstop, previousMillis, led_interval, biLdIsOn, gs_old, \
-    biLdIsOn, msg_nr, rx_buffer, msg_lst, nr_msg_items, width, old_func
+    biLdIsOn, msg_nr, rx_buffer, width, old_func, button_c_pressed, button_d_pressed
 
 
     TAG = "loop(): "
@@ -1040,32 +1354,46 @@ def loop():
             lp_cnt += 1  # increase the loop counter
             ID_s = ''  # Clear the ID string
             # lcd.clear()  # clean the LCD
-            gr.clear()
-            print("\nStart of loop {}".format(lp_cnt), end="\n")
+            if LOG_LEVEL <= LOG_DEBUG:
+                log.debug(TAG, "start of loop {}", lp_cnt)
+            if button_c_pressed:  # handle_c()
+                button_c_pressed = False
+                dump_stats()
+                scroll_text(stats_text(), True)
+            if button_d_pressed:  # handle_d()
+                button_d_pressed = False
+                log.dump()
             if startup == -1 and not msg_shown:
                 msg_shown = True
                 scroll_text("RX msgs...", False) #, x=1 - shift, y=2)
                 sleep(sleep_for)
-                gr.set_pen(gr.create_pen(0, 0, 0))
+                gr.set_pen(pens.pen(0, 0, 0))
                 gr.clear()
-                gu.update(gr)
+                gu_update()
+                shown.invalidate()
+                framer.discard()  # the bytes received since the uart was opened are stale
             wait_cnt = 0
             # +--------------- RECEPTION ----------------------------------------+
+            t = stages.start()
             chrs_rcvd = ck_uart()  # read a complete GPS GPRMC datagram sentence |
+            stages.stop(STG_RX_WAIT, t)
             # +------------------------------------------------------------------+
-            sleep(0.02) # just a little pause to avoid entry of zeros  # <==================== DELAY =======================================<
             if chrs_rcvd == -1:
                 raise KeyboardInterrupt
             if chrs_rcvd > 0:
-                if not my_debug:
-                    print(TAG+f"Msg nr: {msg_nr}, ID: {ID_s}, nr characters rcvd from ck_uart() is: {chrs_rcvd}")
+                if LOG_LEVEL <= LOG_DEBUG:
+                    log.debug(TAG, "Msg nr: {}, ID: {}, nr characters rcvd from ck_uart() is: {}", msg_nr, ID_s, chrs_rcvd)
                     #print(TAG+"GPS data character received: ")
-                    print(f"{rx_buffer.decode('utf-8')}")
+                    log.debug(TAG, "{}", bytes(rx_buffer[:chrs_rcvd]))  # a copy: rx_buffer is reused
                     #  print the rx_buffer less the \r\n at the end
                     #print(TAG+"Msg nr: {}, ID: {}, characters rcvd from ck_uart() is: {}, contents: \n\"{}\"".format(msg_nr,
                     #    ID_s, chrs_rcvd, rx_buffer[:-2]), file=sys.stderr)
-                lResult = add_data()
-                print(TAG+"add_data() result = {}".format(lResult))
+                fields = mailbox.take(fix_rec)  # the latest fix
+                lResult = fields >= 0 and add_fix(fix_rec, fields, mailbox.fix_ms)
+                if lResult:
+                    stages.add(STG_AGE, mailbox.age(time.ticks_ms()) * 1000)
+                if LOG_LEVEL <= LOG_DEBUG:
+                    log.debug(TAG, "new fix: {}", lResult)
                 if lResult:
                     ac_status() # Get the airplane's status: no_data, stopped, taxying or flying
                     msg_rx_ok += 1
@@ -1074,27 +1402,24 @@ def loop():
                     elif ac_stat == ac_taxying:
                         ac_is_taxying(False)
                         #startup = 0
-                    elif ac_stat == ac_flying:
-                        if startup == -1:
-                            gr.clear()
-                        time.sleep(0.1)  # give a break to handle interrupts
+                    elif ac_stat == ac_flying and fix_has_fields():
                         #led_toggle()  # we toggle elsewhere (when receiving msg in ck_uart() )
                         if func_dict[curr_func] == "crs_func":
-                            if not disp_crs():
+                            if not show(disp_crs()):
                                 return False
                         if func_dict[curr_func] == "pos_func":
-                            if not disp_pos():
+                            if not show(disp_pos()):
                                 return False
                         if func_dict[curr_func] == "gs_func":
-                            if not disp_gs():
+                            if not show(disp_gs()):
                                 return False
                         if func_dict[curr_func] == "alt_func":
-                            if not disp_alt():
+                            if not show(disp_alt()):
                                 return False
                         if old_func != curr_func:
                             old_func = curr_func
                             clr_buttons()
-                        gc.collect()
+                        gcs.idle()  # the next sentence pair arrives in about a second
 
                         startup = 0
                     else:
@@ -1102,7 +1427,7 @@ def loop():
                 else:
                     split_err = True
                 if split_err == True:
-                    print(TAG+"Error: spliting rx_buffer contents has failed. Exitting...", end="\n")
+                    log.warn(TAG, "Error: spliting rx_buffer contents has failed")
                     split_err = False
                 # Do cleanup and resets
                 chrs_rcvd = 0
@@ -1121,8 +1446,11 @@ def loop():
                         startup = 0  # switch off flag. Showing this text only once.
                 if (currentMillis - previousMillis) >= led_interval:
                     previousMillis = currentMillis
-                print("End of loop {}".format(lp_cnt), end="\n")
-                print("........................", end="\n")
+                if LOG_LEVEL <= LOG_DEBUG:
+                    log.debug(TAG, "sentences accepted: {}, rejected (checksum): {}, truncated: {}", *framer.stats())
+                    log.debug(TAG, "frames drawn: {}, skipped (unchanged): {}", *shown.stats())
+                    log.debug(TAG, "pen cache hits: {}, misses: {}", *pens.stats())
+                    log.debug(TAG, "end of loop {}", lp_cnt)
                 if msg_nr >= max_lp_cnt:
                     msg_nr = 0
                     lp_cnt = 0
@@ -1136,7 +1464,8 @@ def loop():
         except KeyboardInterrupt:
             return False
         except MemoryError:
-            gc.collect()
+            gcs.emergency()
+            log.warn(TAG, "MemoryError. Free heap after collection: {}", gc.mem_free())
     # end-of while True
 
     sleep(0.5)  # <======================================= DELAY ==============================<
@@ -1145,251 +1474,219 @@ def loop():
 
 """
 ck_uart(void) -> nr_bytes
-        This function attempt to read the uart. It filters isolated \x00 byte characters
+        This function reads the uart through the NMEA framer (see nmea_framer.py).
+        The framer reassembles complete '$...\\r\\n' sentences in a preallocated ring buffer,
+        so isolated \\x00 characters, partial lines and sentences with a wrong '*hh' checksum
+        are filtered (and counted, see framer.stats()) there.
+        A GPRMC sentence and the GPGGA sentence of the same epoch are collected and parsed into rx_rec
+        (see rx_sentence()). Both sentences are copied into rx_buffer. A GPRMC whose GPGGA is late
+        is returned alone after PAIR_WAIT_MS (see rx_timeout()).
+        The fix is put in the mailbox. The complete sentences that are in the framer and the uart
+        already (received while a screen was shown) are handled too before it returns: a newer fix
+        replaces the older one in the mailbox, so loop() always shows the latest fix.
         Parameters: None
         Return: nr_bytes
 """
 def ck_uart():
-    global rx_buffer, msg_nr, loop_time, nRMC, nGGA, GPRMC_lst, GPGGA_lst, le_GPRMC_lst, le_GPGGA_lst
+    global rx_buffer, msg_nr
     TAG = 'ck_uart(): '
-    nr_bytes = i = 0
-    delay_ms = 0.3
-    nGPRMC = -1
-    nGPGGA = -1
-    GPRMC_msg = None
-    GPGGA_msg = None
-    GPRMC_lst = []
-    GPGGA_lst = []
-    le_GPRMC_lst = 0
-    le_GPGGA_lst = 0
-    GPRMC_done = False
-    GPGGA_done = False
-    i = 0
+    nr_bytes = 0
+    t_rx = t_nodata = time.ticks_ms()  # the last sentence, the last nodata()
     while True:
         try:
-            gc.collect()
-            rx_buffer = bytearray(rx_buffer_len * b'\x00')
-            #nr_bytes = uart.readinto(rx_buffer)
-            rx_buffer = uart.readline()
-            if rx_buffer is not None:
-                nr_bytes = len(rx_buffer)
-            else:
-                i += 1
-                if i > 1000:
-                    return 0  # Exit
-                if i > 0 and i % 100 == 0:
-                    nodata()
-                time.sleep(delay_ms)
-                continue
-            if nr_bytes is not None:
-                if my_debug:
-                    print(TAG+"(just after uart.readinto(rx_buffer) nr of bytes= ", nr_bytes)
-            #for i in range(5):
-            #    time.sleep(delay_ms)
-            loop_time = time.ticks_ms()  # time.time_ns()
-            if nr_bytes is None:
-                if my_debug:
-                    print(TAG+"nr_bytes is None")
-                time.sleep(delay_ms)
-                continue
-            if not nr_bytes:
-                if my_debug:
-                    print(TAG+"nr_bytes=", nr_bytes)
-                time.sleep(delay_ms)
-                continue
-            if nr_bytes > 1:
-                try:
-                    rx_buffer_s = rx_buffer.decode('utf-8')
-                except UnicodeError:  # Happens mostly if serial connection is broken
-                    print(TAG+"Check serial wiring")
-                    time.sleep(delay_ms)
-                    continue
-                gc.collect()
-                if not GPRMC_done:
-                    nGPRMC = rx_buffer_s.find("$GPRMC")
-                    if nGPRMC >= 0:
-                        n = rx_buffer_s.find("$GPGGA")
-                        if n >= 0:
-                            GPRMC_msg = rx_buffer_s[:nGPGGA]
-                        else:
-                            GPRMC_msg = rx_buffer_s
-                    else:
-                        time.sleep(delay_ms)
-                        continue
-
-                    GPRMC_lst =  GPRMC_msg.split(",")
-                    le_GPRMC_lst = len(GPRMC_lst)
-                    if my_debug:
-                        print(TAG+f"type(GPRMC_msg)= {type(GPRMC_msg)}")
-                        print(TAG+f"GPGRMC msg = {GPRMC_msg}")
-                    if le_GPRMC_lst >= 12:  # A complete GPRMC msg is usually 78 characters
-                        if my_debug:
-                            print(TAG+f"GPRMC_msg is complete: {GPRMC_msg}. len(GPRMC_lst)= {le_GPRMC_lst}")
-                        GPRMC_done = True
-                    else:
-                        time.sleep(delay_ms)
-                        continue   
-                if not GPGGA_done:
-                    nGPGGA = rx_buffer_s.find("$GPGGA")
-                    if nGPGGA >= 0:
-                        # check if $GPRMC occurs near the end of the GPGGA message:
-                        n = rx_buffer_s.find("$GPRMC")
-                        if n > 0:
-                            GPGGA_msg = rx_buffer_s[nGPGGA:n]
-                        else:
-                            GPGGA_msg = rx_buffer_s[nGPGGA:]
-                        n = GPGGA_msg.find('\r\n')
-                        if n < 0:
-                            GPGGA_msg += '\r\n'
-                        GPGGA_lst = GPGGA_msg.split(",")
-                        le_GPGGA_lst = len(GPGGA_lst)
-                        if le_GPGGA_lst >= 15:  # A complete GPGGA msg is usually 78 characters
-                            if my_debug:
-                                print(TAG+f"GPGGA_msg is complete: {GPGGA_msg}. len(GPGGA_lst)= {le_GPGGA_lst}")
-                            GPGGA_done = True
-                        else:
-                            time.sleep(delay_ms)
-                            continue
-                    else:
-                        time.sleep(delay_ms)
-                        continue              
-                        
-                if GPRMC_done and GPGGA_done:
-                    rx_buffer_s = GPRMC_msg + GPGGA_msg
-                    nr_bytes = len(rx_buffer_s)
-                    rx_buffer = rx_buffer_s.encode('utf-8')
-                    if my_debug:
-                        print(TAG+"GPRMC_msg + GPGGA_msg = {rx_buffer}")
+            t = stages.start()
+            nr_rcvd = framer.fill()
+            link_tick()
+            n = framer.next_sentence()
+            if n == 0:
+                if rx_timeout():  # the GPGGA is late: an RMC-only fix
+                    mailbox.put(rx_rec, rx_fields, loop_time)
+                    nr_bytes = rx_nr_bytes
+                if nr_bytes:  # a fix is in the mailbox and no complete sentence is left
                     break
-
-                if not my_debug:
-                    print(TAG+"nr of bytes= ", nr_bytes)
-                if nr_bytes < 120: # was 146 Try to cut short checking. A full/OK msg has 153 characters
-                    time.sleep(delay_ms)
-                    continue
-                print(TAG+"rcvd data: {}".format(rx_buffer),end="\n")
-                # Check for '*' in tail. If present, the message is very probably complete.
-                tail_part = -20
-                tp = rx_buffer[tail_part:].decode('utf-8')
-                print(TAG+f"rx_buffer[{tail_part}:]= \'{tp}\'")
-                n1 = tp.find('*') # find '*' in tail 10 characters. If not found, loop
-                #n1 = rx_buffer.find('*')
-                print(TAG+f"n1 = {n1}")
-                if n1 < 0: # no '*' in tail
-                    time.sleep(delay_ms)
-                    continue
-                else:
-                    if nGPRMC < 0:
-                        n2 = rx_buffer_s.find('$GPRMC')
-                    else:
-                        n2 = nGPRMC
-                    # print(TAG+f"n2 = {n2}")
-                    if n2 < 0:
-                        time.sleep(delay_ms)
-                        continue
-                    else:
-                        nRMC = n2
-                    if nGPGGA < 0:
-                        n3 = rx_buffer_s.find('$GPGGA')
-                    else:
-                        n3 = nGPGGA
-                    # print(TAG+f"n3 = {n3}")
-                    if n3 < 0:
-                        time.sleep(delay_ms)
-                        continue
-                    else:
-                        nGGA = n3
-                    n4 = int(nr_bytes*0.75) # get 3/4 of length of characters received
-                    # print(TAG+f"n4 = {n4}")
-                    if not my_debug:
-                        #print(TAG+"n1 = {}, n2 = {}, n3= {}, n4 ={}".format(n1, n2, n3, n4))
-                        print(TAG+"* at {}, $GPRMC at {}, $GPGGA at {}, n4 ={}".format(n1+tail_part+1, n2, n3, n4))
-                    if n2 > n4: # check if $GPRMC occurs at more than 3/4 of the characters received
-                        time.sleep(delay_ms)
-                        continue
-                    else:
-                        # print(TAG+"returning with {} nr of bytes".format(nr_bytes))
-                        #return nr_bytes
-                        break
-            elif nr_bytes == 1:
-                if rx_buffer[0] == b'\x00':
-                    time.sleep(delay_ms)
-                    i += 1
-                    if i % 1000 == 0:
-                        print("Waiting for uart line to become ready")
-            else:
-                empty_buffer()
-                time.sleep(delay_ms)
+                if nr_rcvd == 0:  # the uart is empty
+                    t_now = time.ticks_ms()
+                    if time.ticks_diff(t_now, t_rx) >= RX_EXIT_MS:
+                        return 0  # Exit
+                    if time.ticks_diff(t_now, t_nodata) >= NODATA_MS:
+                        nodata()
+                        t_nodata = t_now
+                    while not uart.any() and time.ticks_diff(time.ticks_ms(), t_nodata) < NODATA_MS:
+                        if pair.waiting() and rx_timeout():
+                            mailbox.put(rx_rec, rx_fields, loop_time)
+                            return rx_nr_bytes
+                        link_tick()  # a silent link drops to 0 bytes/s
+                        time.sleep_ms(RX_WAIT_MS)  # poll: wakes at most RX_WAIT_MS after a byte arrived
                 continue
+            stages.stop(STG_FRAME, t)
+            t_rx = t_nodata = time.ticks_ms()
+            if LOG_LEVEL <= LOG_DEBUG:
+                log.debug(TAG, "sentence received: {}", bytes(framer.line_mv[:n]))
+            if rx_sentence(n) and rx_rec[VALID] & RMC_OK:
+                mailbox.put(rx_rec, rx_fields, loop_time)  # replaces an older fix of this call
+                nr_bytes = rx_nr_bytes
+                if LOG_LEVEL <= LOG_DEBUG:
+                    log.debug(TAG, "GPRMC_msg + GPGGA_msg = {}", bytes(rx_buffer[:nr_bytes]))
         except KeyboardInterrupt:
             nr_bytes = -1
+            break
     return nr_bytes
 
 
 """
-add_data(void) -> lResult
-        This function collects and writes the received gps data to the my_msgs object.
-        It truncates the variation longitudinal indicator letter in the last item
-        (a combination of magnetic variation longitudinal indicator and a 2-character checksum).
-        It moves the check_sum characters into a 12th element to this list and
-        Parameters: None
-        Return: le2 (i.e.: len(msg_lst)). If it fails to split, a value False will be returned
+link_tick() -> void
+        Measure the throughput of the link every LINK_WINDOW_MS (see meter). A window in which
+        the uart rx buffer overran or sentences were truncated is logged as a warning: the
+        receiver falls behind (rxbuf too small for the time the uart is not read)
+        Called by ck_uart() (also while it waits for bytes), frame_task() and rx_worker(), so the
+        rates drop to 0 when the link is silent
+"""
+def link_tick():
+    if meter.tick(time.ticks_ms()) and meter.behind():
+        log.warn("link_tick(): ", "receiver falls behind: {} overruns, {} truncated sentences in {} B/s",
+                 meter.overruns, meter.truncated, meter.bytes_s)
+
 
 """
-def add_data():
-    global my_msgs, GPRMC_lst, GPGGA_lst, le_GPRMC_lst, le_GPGGA_lst
-    TAG = "add_data(): "
-    lResult = True
-    lGPRMC_go = lGPGGA_go = False
-
-    if le_GPRMC_lst == 12 and le_GPGGA_lst == 15:
-        if not my_debug:
-            print(TAG+f"We're using GPS data from rcvd GPRMC and GPGGA msgs.\nNr GPRMC items= {le_GPRMC_lst}. Nr of GPGGA items= {le_GPGGA_lst}")
-        rmc_lst = [
-            GPRMC_lst[0],   # id
-            GPRMC_lst[3],   # lat
-            GPRMC_lst[4],   # latdir
-            GPRMC_lst[5],   # lon
-            GPRMC_lst[6],   # londir
-            GPRMC_lst[7],   # gs
-            GPRMC_lst[8],   # track true
-            GPRMC_lst[9],   # date
-            GPRMC_lst[10],  # var
-            GPRMC_lst[11]   # vardir
-        ]
-        if le_GPRMC_lst == 12:
-            lGPRMC_go = True
-            GPRMC_lst[11] = GPRMC_lst[11][:1]  # extract 'E' or 'W' from (e.g.:) 'E*72'
-            
-        if le_GPGGA_lst == 15:
-            if my_debug:
-                print(TAG+f"type(GPGGA_lst[9])= {type(GPGGA_lst[9])}, value= {GPGGA_lst[9]}")
-            t_alt = float(GPGGA_lst[9])
-            if my_debug:
-                print(TAG+f"t_alt = {t_alt}, type(t_alt)= {type(t_alt)}")
-            p = isinstance(t_alt,float)
-            if p == True:
-                #                 alt
-                t_alt = round(int(t_alt) * 3.2808)  # convert meters into feet
-            else:
-                t_alt = 0
-            lGPGGA_go = True
-            
-        if lGPGGA_go == True:
-            rmc_lst.append(str(t_alt))
-        else:
-            rmc_lst.append("0")
-        
-        my_msgs.write(rmc_lst)
-    
+set_baud(b) -> void
+        Set the uart to b baud, with an rx buffer sized for it (see rxbuf_size()), and tell the
+        framer and the meter
+"""
+def set_baud(b):
+    global baud, rxbuf
+    baud = b
+    rxbuf = rxbuf_size(b, RX_BLOCK_ASYNC_MS if use_asyncio else RX_BLOCK_MS)
+    uart.init(baudrate=b, rxbuf=rxbuf)
+    framer.rxbuf = rxbuf
+    meter.baud = b
 
-        if my_debug:
-            print(TAG+"cross-check: my_msgs class data contents: {}".format(my_msgs.read(ALT)), end="\n")
-    
-    if lGPRMC_go == False and lGPGGA_go == False:
-        lResult = False
+"""
+find_baud(first) -> baud
+        Find the baudrate GPSout sends at (auto_baud): first and then the other BAUD_RATES are probed
+        by detect_baud() (auto_baud.py), which scores them by the nr of sentences with a valid
+        checksum. The best rate is set with set_baud() and shown. Called by main()
+        Parameters: first: the expected baudrate (BAUD, HR_BAUD with high_rate)
+        Return: the baudrate, first if no rate gave NMEA sentences
+"""
+def find_baud(first):
+    TAG = "find_baud(): "
+    scroll_text("BAUD ?", False)
+    rates = [first]
+    for b in BAUD_RATES:
+        if b != first:
+            rates.append(b)
+    b, score = detect_baud(uart, framer, rates)
+    if LOG_LEVEL <= LOG_INFO:
+        log.info(TAG, "{} baud, score {}", b, score)
+    if score <= 0:
+        log.warn(TAG, "no NMEA sentences at any baudrate. Using {}", first)
+        b = first
+    set_baud(b)
+    scroll_text("{}".format(b), False)
+    time.sleep(2)
+    return b
 
-    return lResult
+"""
+set_high_rate() -> void
+        The 10 Hz mode (high_rate): GPSout sends 10 GPRMC + GPGGA pairs per second, about 1500 bytes/s.
+        4800 baud carries 480 bytes/s, so the uart is set to HR_BAUD (40 % load at 38400 baud).
+        A fix has 100 ms: the pipeline must not block that long, which only the uasyncio tasks
+        guarantee (loop() shows a screen for seconds), so use_asyncio is set. Every fix is taken from
+        the mailbox by mail_task() (dead reckoning gets all of them); the renderer shows the latest.
+        A GPRMC waits HR_PAIR_WAIT_MS for its GPGGA, so a late GPGGA gives an RMC-only fix before
+        the next epoch. Called by main()
+"""
+def set_high_rate():
+    global use_asyncio
+    TAG = "set_high_rate(): "
+    if asyncio is None:
+        log.warn(TAG, "the 10 Hz mode needs uasyncio")
+        return
+    use_asyncio = True
+    set_baud(HR_BAUD)
+    pair.wait_ms = HR_PAIR_WAIT_MS
+
+
+"""
+rx_sentence(n) -> bool
+        This function handles the sentence of n bytes the framer returned (framer.line).
+        The sentence is parsed into rx_rec by the handler nmea_parse.dispatch() finds for it
+        (GP/GN RMC, GGA, VTG or GLL). Only the fields the current display function
+        subscribes to (rx_want, see FUNC_FIELDS) are converted.
+        The GPRMC and GPGGA sentences are paired by their time field (see pair): a GPGGA of the epoch
+        of the waiting GPRMC completes the fix (or a GPRMC of the epoch of a GPGGA that came first).
+        Both are copied into rx_buffer (rx_nr_bytes bytes).
+        While a GPRMC waits for its GPGGA in rx_rec, other sentences (VTG, GLL) are skipped:
+        they would overwrite fields of the pending fix with those of another epoch.
+        Called by ck_uart(), rx_task() and rx_worker()
+        Parameters: n: the length of the sentence in framer.line
+        Return: True if a GPRMC + GPGGA pair is complete
+"""
+def rx_sentence(n):
+    global rx_nr_bytes, loop_time, rx_fields
+    t = stages.start()
+    line = framer.line
+    complete = False
+    if pair.waiting():
+        key = line_key(line, n)
+        if key != KEY_RMC and key != KEY_GGA:  # not into the pending fix
+            stages.stop(STG_PARSE, t)
+            return complete
+    loop_time = time.ticks_ms()
+    key = dispatch(line, n, rx_rec, rx_want)
+    if key == KEY_RMC:  # A complete GPRMC msg has 11 data fields
+        rx_fields = rx_want
+        rx_nr_bytes = framer.copy_line(rx_buffer, 0)
+        complete = pair.rmc(rx_rec, loop_time)
+    elif key == KEY_GGA and pair.gga(rx_rec):  # A complete GPGGA msg has 14 data fields
+        rx_fields &= rx_want  # rx_want may have changed since the GPRMC sentence
+        rx_nr_bytes = framer.copy_line(rx_buffer, rx_nr_bytes)
+        complete = True
+    stages.stop(STG_PARSE, t)
+    return complete
+
+"""
+rx_timeout() -> bool
+        Emit the waiting GPRMC sentence as a fix of its own when its GPGGA sentence has not arrived
+        within PAIR_WAIT_MS (see pair.poll()). The altitude is the one of the last GPGGA sentence.
+        Called by ck_uart() and by rx_task() while a GPRMC waits
+        Return: True if rx_rec holds an RMC-only fix
+"""
+def rx_timeout():
+    global loop_time, rx_fields
+    if not pair.poll(rx_rec, time.ticks_ms()):
+        return False
+    loop_time = time.ticks_ms()
+    if not pair.alt_ok:
+        rx_fields &= ~F_ALT
+    if LOG_LEVEL <= LOG_INFO:
+        log.info("rx_timeout(): ", "no GPGGA for {}: RMC-only fix", rx_rec[TIME])
+    return True
+
+
+"""
+add_fix(rec, fields, t_ms) -> bool
+        This function writes the fix rec (taken from the mailbox) to the my_msgs object, to dr and to ac_phase.
+        fields: the F_* bits of the fields parsed into rec, t_ms: the ticks_ms it arrived.
+        The altitude of an RMC-only fix (GGA_OK not set) is cached: it gives no vertical rate (see dr)
+        A GPRMC with status 'V' (void, FIX_OK not set) has empty fields: it is not written, the
+        screens keep the last valid fix
+        Return: True if the fix has been written
+"""
+def add_fix(rec, fields, t_ms):
+    global my_msgs, my_fields
+    TAG = "add_fix(): "
+    if not rec[VALID] & FIX_OK:
+        if LOG_LEVEL <= LOG_DEBUG:
+            log.debug(TAG, "void fix {} ignored", rec[TIME])
+        return False
+    my_msgs.write(rec)
+    my_fields = fields
+    ac_phase.update(rec[GS], t_ms)
+    dr.update(rec, t_ms, fields if rec[VALID] & GGA_OK else fields & ~F_ALT)
+    if LOG_LEVEL <= LOG_DEBUG:
+        log.debug(TAG, "cross-check: my_msgs class data contents: {}", my_msgs.read(ALT))
+    return True
 
 # funct time_elapsed
 # param t1 in nanosecond (derived from time.ticks_ms())
@@ -1424,45 +1721,63 @@ def led_toggle():
 
 """
 empty_buffer(void) -> void
-        This function clears the rx_buffer
+        This function clears the rx_buffer (in place, no new buffer is allocated)
         Parameters: None
         Return: None
 """
 def empty_buffer():
-    global rx_buffer
-    rx_buffer = bytearray(rx_buffer_len * b'\x00')
+    for i in range(rx_buffer_len):
+        rx_buffer[i] = 0
+
+
+"""
+Screens
+        The disp_*() functions are screens: generators that draw the data of my_msgs and
+        yield the time (in ms) the result has to stay on the display before they continue.
+        In this way the same screen is shown by loop() (blocking, see show()) and by
+        render_task() (which keeps receiving and handling buttons meanwhile, see screen_step()).
+"""
+def show(screen):  # run a screen to its end, sleeping the times it yields
+    t = stages.start()
+    for ms in screen:
+        stages.stop(STG_RENDER, t)
+        time.sleep(ms / 1000)
+        t = stages.start()
+    return True
+
+def screen_step(screen):  # draw the next part of a screen. Return: the ms to wait, -1 at its end
+    t = stages.start()
+    try:
+        return next(screen)
+    except StopIteration:
+        return -1
+    finally:
+        stages.stop(STG_RENDER, t)
 
 
 """
-disp_var(void) -> void
+disp_var(void) -> screen
         This function displays the variation
         Parameters: None
         Return: None
 """    
 def disp_var():
     TAG = "disp_var(): "
-    var_val = float(my_msgs.read(VAR))  # floating point value
-    print(TAG+f"var_val: {var_val}", end='\n')
-    var_dir = my_msgs.read(VARDIR)
-    tmg_true = get_mag()
-    gr.clear()
-    if var_dir == "E":
+    var_val = my_msgs.read(VAR)  # degrees x 10. East is positive
+    if LOG_LEVEL <= LOG_DEBUG:
+        log.debug(TAG, "var_val: {}", var_val)
+    if var_val >= 0:  # East
         s1 = "-"
-    elif var_dir == "W":
+    else:
         s1 = '+'
-    s2 = "var {:s}{:2d}".format(s1, var_val)
+    var_val = abs(var_val)
+    s2 = "var {:s}{:d}.{:d}".format(s1, var_val // 10, var_val % 10)
     scroll_text(s2, False)
-    time.sleep(3)
+    yield 3000
 
-def get_mag():
-    var_val = float(my_msgs.read(VAR))  # floating point value
-    var_dir = my_msgs.read(VARDIR)
-    tmg_true = float(my_msgs.read(CRS))
-    if var_dir == "E":   # Correct for variation
-        trk_mag = tmg_true - var_val  # NOTE !!! this is the opposite calculation than from magnetic +- variation to true heading
-    elif var_dir == "W":
-        trk_mag = tmg_true + var_val  # idem
-    return trk_mag
+def get_mag():  # track magnetic, degrees x 10
+    # NOTE !!! this is the opposite calculation than from magnetic +- variation to true heading
+    return crs_mag(my_msgs.read())
 
 """
 mag_or_tru(void) -> boolean
@@ -1483,16 +1798,15 @@ mag_or_tru(void) -> boolean
 """
 def mag_or_tru():
     global lMagnetic, lTrackDirChgd
-    lat = float(my_msgs.read(LAT))
-    latdir = my_msgs.read(LATDIR)
+    lat = my_msgs.read(LAT)  # ddmm.mmmm x 10000. Negative is South
     lMag = True
         
     # Note: based on the above mentioned document:
-    if latdir == "N":
-        if lat >= 60.0:
+    if lat >= 0:
+        if lat >= 60000000:  # 60 degrees North
             lMag = False  # True
-    elif latdir == "S":
-        if lat >= 40.0:
+    else:
+        if lat <= -40000000:  # 40 degrees South
             lMag = False # True
     if lMag != lMagnetic:
         lMagnetic = lMag
@@ -1500,128 +1814,396 @@ def mag_or_tru():
     return lMag
 
 def disp_crs():
-    global GPRMC_cnt, loop_time, biLdIsOn, lTrackDirChgd
+    global loop_time, biLdIsOn, lTrackDirChgd
+    TAG = "disp_crs(): "
  
-    try:
-        TAG = "disp_crs(): "
- 
-        lDispMagOrTru = mag_or_tru()
+    lDispMagOrTru = mag_or_tru()
     
-        #var_val = float(msg_lst[9])  # floating point value
-        var_val = float(my_msgs.read(VAR))  # floating point value
-        print(TAG+f"var_val: {var_val}", end='\n')
-        #var_dir = msg_lst[10]
-        var_dir = my_msgs.read(VARDIR)
-        trk_mag =  float(0.0)  # floating point value
-        tmg_true = float(0.0)  # track made good true (floating point value)
-        s_tmg_true = ""
-        # $GPRMC message parts detail indexes:
-        tmg =  CRS # index to msg_lst. type float  (e.g.: 338.1)     < used
+    var_val = my_msgs.read(VAR)  # degrees x 10. East is positive
 
-        if my_debug:
-            print(TAG+"GPRMC_cnt: {}".format(GPRMC_cnt), end="\n")
+    if LOG_LEVEL <= LOG_DEBUG:
+        log.debug(TAG, "record: {}", tuple(my_msgs.read()))  # a copy of the whole record
 
-        if my_debug:
-            msg_lst = my_msgs.read(ALT+1)  # force to receive a list
-            print(TAG, end='')
-            le = len(msg_lst)
-            if le > 0:
-                for _ in range(len(msg_lst)):
-                    print("{}, ".format(msg_lst[_]), end='')
-                print()
-            else:
-                print(TAG+"msg_lst is empty!")
+    tmg_true = my_msgs.read(CRS)  # track made good true, degrees x 10 (e.g.: 3381)
+    trk_mag = get_mag()  # Correct for variation. Degrees x 10
 
-        tmg_true = float(my_msgs.read(CRS))
+    if LOG_LEVEL <= LOG_INFO:
+        log.info(TAG, "track made good true: {}, var {}, track magnetic: {} (degrees x 10)", tmg_true, var_val, trk_mag)
+        log.info(TAG, s_telapsed, time_elapsed(loop_time, time.ticks_ms()))
 
-        #ribbon.hub_clear()
-        if var_dir == "E":   # Correct for variation
-            trk_mag = tmg_true - var_val  # NOTE !!! this is the opposite calculation than from magnetic +- variation to true heading
-        elif var_dir == "W":
-            trk_mag = tmg_true + var_val  # idem
-        if trk_mag >= 360.0:
-            trk_mag -= 360.0
-        
-        print(TAG+"track made good true: {}, var {} {}, track magnetcic: {}".format(tmg_true, var_val, var_dir, trk_mag), end='\n')
-        tmg_true = round(tmg_true, 1)
-        s_tmg_true = str(tmg_true)
-        trk_mag = round(trk_mag, 1)
-        s_trk_mag = str(trk_mag)
-        if lDispMagOrTru:
-            s = "TRACK " + s_trk_mag + " degs (M)"
-        else:
-            s = "TRACK " + s_tmg_true + " degs (T)"
-        #if my_debug:
-        print(TAG+s)
-        print(TAG+s_telapsed+"{:5.2f} in mSecs".format(time_elapsed(loop_time, time.ticks_ms())), end="\n")
+    if lDispMagOrTru:
+        ribbon.set_heading_fm_sim(trk_mag / 10)
+    else:
+        ribbon.set_heading_fm_sim(tmg_true / 10)
 
+    if startup == -1 or lTrackDirChgd:
+        lTrackDirChgd = False # reset flag
         if lDispMagOrTru:
-            ribbon.set_heading_fm_sim(trk_mag)
+            scroll_text("TRK MAG", False)
         else:
-            ribbon.set_heading_fm_sim(tmg_true)
-
-        gr.clear()
-        if startup == -1 or lTrackDirChgd:
-            lTrackDirChgd = False # reset flag
-            if lDispMagOrTru:
-                scroll_text("TRK MAG", False)
-            else:
-                scroll_text("TRK TRUE", False)
-            time.sleep(2)
-            gr.clear
-        gr.set_pen(gr.create_pen(int(BACKGROUND_COLOUR[0]), int(BACKGROUND_COLOUR[1]), int(BACKGROUND_COLOUR[2])))
-        ribbon.ribbon_base()
+            scroll_text("TRK TRUE", False)
+        yield 2000
+    if use_asyncio and smooth_ribbon:  # animate until the next fix arrives
+        seq = fix_seq
+        while seq == fix_seq and ribbon.fix_age() < SMOOTH_MAX_MS:
+            ribbon.draw_smooth()
+            yield RIBBON_FRAME_MS
+    else:
+        ribbon.draw()  # only if the rounded heading changed
 
-        if biLdIsOn:
-            led_toggle()
+    if biLdIsOn:
+        led_toggle()
 
-    except KeyboardInterrupt:
-        return False
-    return True
+"""
+dr_hold(fmt, hold) -> screen
+        Show fmt() for hold ms, redrawn every DR_FRAME_MS, so a dead reckoned value (see dr)
+        follows the aircraft between two fixes. An unchanged text is not drawn again (see shown)
+"""
+def dr_hold(fmt, hold):
+    for _ in range(hold // DR_FRAME_MS):
+        scroll_text(fmt(), False)
+        yield DR_FRAME_MS
+
+def pos_text(v, hemi):  # ddmm.mmmm x 10000 -> 'ddmm.mm' + hemi, 8 characters: what fits the display
+    a = abs(v)
+    deg = a // 1000000
+    m = a % 1000000 // 100  # minutes x 100: 0.01' is 18 m, so the dead reckoned steps show
+    if deg < 100:
+        return "{:02d}{:02d}.{:02d}{:s}".format(deg, m // 100, m % 100, hemi)
+    return "{:d}{:02d}.{:d}{:s}".format(deg, m // 100, m % 100 // 10, hemi)  # 'dddmm.m'
+
+def lat_text():  # the dead reckoned latitude
+    lat = dr.position(time.ticks_ms())[0]  # ddmm.mmmm x 10000. Negative is South
+    return pos_text(lat, "S" if lat < 0 else "N")
+
+def lon_text():  # the dead reckoned longitude
+    lon = dr.position(time.ticks_ms())[1]  # dddmm.mmmm x 10000. Negative is West
+    return pos_text(lon, "W" if lon < 0 else "E")
+
+def alt_text():  # the dead reckoned altitude
+    return "A {:d} FT".format(m_to_ft(dr.altitude(time.ticks_ms())))  # meters x 10
 
 def disp_pos():
     TAG="disp_pos(): "
-    lat = float(my_msgs.read(LAT))
-    latdir = my_msgs.read(LATDIR)
-    lon = float(my_msgs.read(LON))
-    londir = my_msgs.read(LONDIR)
-    s1 = "{:05.2f} {:s}".format(lat/100, latdir)
-    s2 = "{:05.2f} {:s}".format(lon/100, londir)
-    gr.clear()
-    gr.set_pen(WHITE)
-    print(TAG+"Pos= {s1}/{s2}")
-    scroll_text(s1, False)
-    print(TAG+s_telapsed+"{:5.2f} in mSecs".format(time_elapsed(loop_time, time.ticks_ms())), end="\n")
-    time.sleep(2)
-    gr.clear()
-    print(TAG+s2)
-    scroll_text(s2, False)
-    time.sleep(2)
-    return True
+    if LOG_LEVEL <= LOG_INFO:
+        log.info(TAG, "Pos= {}/{}", lat_text(), lon_text())
+        log.info(TAG, s_telapsed, time_elapsed(loop_time, time.ticks_ms()))
+    yield from dr_hold(lat_text, 2000)
+    yield from dr_hold(lon_text, 2000)
 
 def disp_gs():
     TAG= "disp_gs(): "
     t_gs = "GS {:d} KT".format(int(ck_gs()))
-    gr.clear()
-    gr.set_pen(WHITE)
     #outline_text("Disp GS", 4, 2, cnt=0)
-    print(TAG, t_gs)
     scroll_text(t_gs, False)
-    print(TAG+s_telapsed+"{:5.2f} in mSecs".format(time_elapsed(loop_time, time.ticks_ms())), end="\n")
-    time.sleep(3)
-    return True
+    if LOG_LEVEL <= LOG_INFO:
+        log.info(TAG, t_gs)
+        log.info(TAG, s_telapsed, time_elapsed(loop_time, time.ticks_ms()))
+    yield 3000
 
 def disp_alt():
     TAG="disp_alt(): "
-    t_alt = "A {:s} FT".format(my_msgs.read(ALT)) # ALT is an integer
-    gr.clear()
-    gr.set_pen(WHITE)
     #outline_text("Disp ALT", 4, 2, cnt=0)
-    print(TAG+f"ALT= ", t_alt)
-    scroll_text(t_alt, False)
-    print(TAG+s_telapsed+"{:5.2f} in mSecs".format(time_elapsed(loop_time, time.ticks_ms())), end="\n")
-    time.sleep(3)
-    return True
+    if LOG_LEVEL <= LOG_INFO:
+        log.info(TAG, "ALT= {} VS= {} fpm", alt_text(), m_to_ft(dr.vs() * 60))
+        log.info(TAG, s_telapsed, time_elapsed(loop_time, time.ticks_ms()))
+    yield from dr_hold(alt_text, 3000)
+
+def fix_has_fields():  # False: the fix in my_msgs was parsed for another display function. Wait for the next
+    return FUNC_FIELDS[func_dict[curr_func]] & ~my_fields == 0
+
+disp_funcs = {
+    "pos_func": disp_pos,
+    "gs_func": disp_gs,
+    "crs_func": disp_crs,
+    "alt_func": disp_alt
+}
+
+# +-----------------------------------------------------------------------+
+# | uasyncio runtime (use_asyncio). The tasks share the data:             |
+# | rx_task()     -> rx_rec -> mailbox (rx_worker() on core 1: use_core1) |
+# | mail_task()   <- mailbox -> add_fix() -> my_msgs, fix_seq             |
+# | btn_task()    <- btn_q <- handle_a() ... handle_d()                   |
+# | render_task() -> the screen of curr_func for the latest fix           |
+# +-----------------------------------------------------------------------+
+
+def rx_put():  # rx_task(), rx_worker(): put the fix in rx_rec in the mailbox for mail_task()
+    mailbox.put(rx_rec, rx_fields, loop_time)  # loop_time: the ticks_ms the (last) sentence arrived
+    fix_flag.set()
+    if LOG_LEVEL <= LOG_DEBUG:
+        log.debug("rx_put(): ", "fix: {}", bytes(rx_buffer[:rx_nr_bytes]))
+
+"""
+rx_task(void) -> void
+        Receiver task. Waits on a uasyncio StreamReader of the uart, which polls the uart in the
+        scheduler: the task wakes as soon as bytes arrive. They are read into the framer and every
+        complete sentence is handled with rx_sentence(). A complete GPRMC + GPGGA pair is put in
+        the mailbox (see rx_put()), from which mail_task() takes it. It never waits for a whole pair,
+        so no bytes pile up in the uart while a screen is shown.
+"""
+async def rx_task():
+    TAG = "rx_task(): "
+    reader = asyncio.StreamReader(uart)
+    into = hasattr(reader, "readinto")  # MicroPython v1.20+. Else wait with read(0) and let fill() read
+    while True:
+        if pair.waiting():
+            await asyncio.sleep_ms(RX_WAIT_MS)  # poll: the GPGGA may be late (see rx_timeout())
+        elif into:
+            n = await reader.readinto(framer.stage_mv)
+            if n:
+                framer.push(n)
+        else:
+            await reader.read(0)
+        try:
+            t = stages.start()
+            framer.fill()
+            n = framer.next_sentence()
+            while n > 0:
+                stages.stop(STG_FRAME, t)
+                if rx_sentence(n) and rx_rec[VALID] & RMC_OK:
+                    rx_put()
+                t = stages.start()
+                n = framer.next_sentence()
+            if rx_timeout():  # the GPGGA is late: an RMC-only fix
+                rx_put()
+        except MemoryError:
+            gcs.emergency()
+            log.warn(TAG, "MemoryError. Free heap after collection: {}", gc.mem_free())
+
+"""
+rx_worker(void) -> void
+        Receiver on core 1 (use_core1, started by start_core1()). Drains the uart into the framer
+        and parses the sentences with rx_sentence(), as rx_task() does, without uasyncio: it polls
+        the uart every RX_WAIT_MS. Every complete fix is put in the mailbox (see rx_put()), so
+        mail_task() takes it on core 0. rx_rec, rx_fields and the framer are only used by this core.
+        The log, the stage stats and the meter are used by both cores: start_core1() guards them
+        with the lock of the mailbox. Ends when rx_stop is set.
+"""
+def rx_worker():
+    global core1_on
+    TAG = "rx_worker(): "
+    try:
+        while not rx_stop:
+            try:
+                t = stages.start()
+                framer.fill()
+                link_tick()
+                n = framer.next_sentence()
+                while n > 0:
+                    stages.stop(STG_FRAME, t)
+                    if rx_sentence(n) and rx_rec[VALID] & RMC_OK:
+                        rx_put()
+                    t = stages.start()
+                    n = framer.next_sentence()
+                if rx_timeout():  # the GPGGA is late: an RMC-only fix
+                    rx_put()
+            except MemoryError:
+                log.warn(TAG, "MemoryError")
+            if not uart.any():
+                time.sleep_ms(RX_WAIT_MS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        core1_on = False
+
+def start_core1():  # start rx_worker() on core 1. The objects both cores use take the lock of the mailbox
+    global rx_stop, core1_on
+    log.lock = stages.lock = meter.lock = mailbox.lock
+    rx_stop = False
+    core1_on = True
+    _thread.start_new_thread(rx_worker, ())
+
+def stop_core1():  # ask rx_worker() to end and wait until it has. Core 0 alone needs no lock
+    global rx_stop
+    rx_stop = True
+    while core1_on:
+        pass
+    log.lock = stages.lock = meter.lock = None
+
+"""
+mail_task(void) -> void
+        Fix task. Waits for fix_flag (set by rx_task() or, with use_core1, by rx_worker() on core 1),
+        takes the latest fix from the mailbox (a fix that has been overwritten meanwhile is coalesced),
+        writes it to my_msgs with add_fix(), counts it in fix_seq and wakes render_task().
+        The time after a fix is the idle window of the garbage collection (gcs.idle()). It starts
+        after render_task() has drawn the first frame of the fix.
+"""
+async def mail_task():
+    global fix_seq
+    TAG = "mail_task(): "
+    t_fix = stages.start()
+    while True:
+        await fix_flag.wait()
+        fields = mailbox.take(fix_rec)
+        if fields < 0 or not add_fix(fix_rec, fields, mailbox.fix_ms):
+            continue
+        fix_seq += 1
+        stages.stop(STG_RX_WAIT, t_fix)
+        t_fix = stages.start()
+        wake.set()
+        await asyncio.sleep_ms(0)  # render_task() starts the fix screen first
+        try:
+            gcs.idle()
+        except MemoryError:
+            gcs.emergency()
+            log.warn(TAG, "MemoryError. Free heap after collection: {}", gc.mem_free())
+
+"""
+btn_task(void) -> void
+        Button task. Takes the presses the IRQ handlers put in btn_q:
+        button A and B select the next/previous display function (see sel_func()),
+        button C shows the stage stats (see stats_screen()), button D dumps the log
+"""
+async def btn_task():
+    global stats_req
+    TAG = "btn_task(): "
+    while True:
+        code = btn_q.get()
+        while code != btn_none:
+            if LOG_LEVEL <= LOG_DEBUG:
+                log.debug(TAG, "{} pressed", btn_dict[code])
+            if code == btn_a:
+                sel_func(1)
+            elif code == btn_b:
+                sel_func(-1)
+            elif code == btn_c:
+                stats_req = True  # for render_task()
+            elif code == btn_d:
+                log.dump()
+            code = btn_q.get()
+            wake.set()
+        await asyncio.sleep_ms(BTN_POLL_MS)
+
+async def frame_task():  # wakes render_task() every FRAME_MS. Ticks the meter, also while the link is silent
+    while True:
+        await asyncio.sleep_ms(FRAME_MS)
+        if not use_core1:  # rx_worker() ticks it on core 1
+            link_tick()
+        wake.set()
+
+def stats_text():  # the text of the stats page
+    bytes_s, _, load = meter.stats()[:3]
+    return stages.text() + "  GC {} IN {} MS  LINK {} B/S {} %".format(
+        gcs.collections + gcs.emergencies, gcs.total_us // 1000, bytes_s, load)
+
+def dump_stats():  # button C: print the stage, gc, pairing, mailbox, phase and link stats over serial
+    stages.dump()
+    print("gc: collections: {}, emergency: {}, total {} ms, max {} us, alloc rate {} bytes/s, threshold {}".format(*gcs.stats()))
+    print("fixes: paired: {}, rmc only: {}, gga of another epoch: {}, rmc dropped: {}".format(*pair.stats()))
+    print("mailbox: fixes: {}, coalesced: {}".format(*mailbox.stats()))
+    print("phase: {}, changes: {}, held (dwell): {}, smoothed gs {} kts x 10".format(
+        ac_stat_names[ac_phase.phase], ac_phase.changes, ac_phase.held, ac_phase.speed()))
+    print(s_link.format(*meter.stats(), rxbuf, baud))
+
+def stats_screen():  # button C: dump the stats over serial (see dump_stats()) and scroll the stats page
+    dump_stats()
+    scroller.start(stats_text(), True)
+    while scroller.tick():
+        yield 0  # next frame
+
+def fix_screen():  # the screen for the latest fix. None: a status text has been shown
+    global startup
+    ac_status() # Get the airplane's status: no_data, stopped, taxying or flying
+    if ac_stat == ac_stopped:
+        ac_is_stopped()
+    elif ac_stat == ac_taxying:
+        ac_is_taxying(False)
+    elif ac_stat == ac_flying and fix_has_fields():
+        return disp_funcs[func_dict[curr_func]]()
+    return None
+
+def rx_banner(msg=None):  # the opening screens of render_task(). msg: a banner to scroll first
+    if msg:
+        scroller.start(msg, True)
+        while scroller.tick():
+            yield 0  # next frame
+        yield 3000
+    scroll_text("RX msgs...", False)
+    yield 5000
+    gr.set_pen(pens.pen(0, 0, 0))
+    gr.clear()
+    gu_update()
+    shown.invalidate()
+
+"""
+render_task(void) -> void
+        Renderer task. Runs when woken (see wake): every FRAME_MS, for a new fix and for a button press,
+        starting with screen. When the current screen is at its end and a newer fix has arrived, it starts
+        the screen of curr_func (or the aircraft status) for that fix at once. A screen that is animating
+        or redrawing a dead reckoned value (it waits DR_FRAME_MS or less) takes a new fix at once too.
+        The times a screen yields are waited for frame by frame instead of with sleep().
+        A change of curr_func (button A or B) ends the current screen at once.
+"""
+async def render_task(screen):
+    global startup, old_func, loop_time, stats_req
+    TAG = "render_task(): "
+    due = time.ticks_ms()
+    seq = fix_seq
+    first = False  # True: the first step of a fix screen is pending
+    ms = 0         # the last wait of the screen
+    kick = seq     # the last fix an animating screen has been stepped for
+    while True:
+        await wake.wait()
+        wake.clear()
+        t = time.ticks_ms()
+        if old_func != curr_func:
+            old_func = curr_func
+            if screen is not None:
+                screen.close()
+                screen = None
+            seq = -1  # show the current fix with the new function
+        if stats_req:
+            stats_req = False
+            if screen is not None:
+                screen.close()
+            screen = stats_screen()
+            due = t
+        if screen is None and seq != fix_seq:
+            seq = fix_seq
+            stages.add(STG_AGE, mailbox.age(t) * 1000)
+            screen = fix_screen()
+            due = t
+            first = True
+        elif screen is not None and kick != fix_seq:
+            kick = fix_seq
+            if 0 <= ms <= DR_FRAME_MS:
+                due = t  # an animation: step it with the new fix now
+        if screen is not None and time.ticks_diff(t, due) >= 0:
+            try:
+                ms = screen_step(screen)
+            except MemoryError:  # the screen has ended
+                gcs.emergency()
+                log.warn(TAG, "MemoryError. Free heap after collection: {}", gc.mem_free())
+                ms = -1
+            if first:
+                first = False
+                startup = 0
+            if ms < 0:
+                screen = None
+                if seq != fix_seq:
+                    wake.set()  # start the screen of the newer fix now
+            else:
+                due = time.ticks_add(t, ms)
+        if screen is None and time.ticks_diff(t, loop_time) >= NODATA_MS:
+            nodata()
+            loop_time = t
+
+async def run_tasks(banner=None):
+    global loop_time
+    loop_time = time.ticks_ms()
+    framer.discard()  # the bytes received since the uart was opened are stale
+    if use_core1:
+        start_core1()
+    else:
+        asyncio.create_task(rx_task())
+    asyncio.create_task(mail_task())
+    asyncio.create_task(btn_task())
+    asyncio.create_task(frame_task())
+    try:
+        await render_task(rx_banner(banner))
+    finally:
+        if use_core1:
+            stop_core1()
 
 """
 intro(lIntroShown, lSyncTime) -> void
@@ -1663,7 +2245,7 @@ main(void) -> void
         Return: None
 """
 def main(Slow):
-    global my_debug, height, biLdIsOn, set_rgb, led, state, ribbon
+    global my_debug, height, biLdIsOn, set_rgb, led, ribbon
     TAG = "main(): "
     lStart = True
     lUpdate = False
@@ -1687,27 +2269,38 @@ def main(Slow):
     if not intro_shown:
         intro_shown = intro(intro_shown, True) 
 
+    if high_rate and uart is not None:
+        set_high_rate()
+    if auto_baud and uart is not None:
+        find_baud(baud)
+
     #sync_time(False)  # get NTP time
     
-    if Slow:
-        MESSAGE = "              MSFS 2020 GPRMC AND GPGGA GPS MESSAGES RX FOR PIMORONI\'S GALACTIC UNICORN                           "
+    MESSAGE = "              MSFS 2020 GPRMC AND GPGGA GPS MESSAGES RX FOR PIMORONI\'S GALACTIC UNICORN                           "
+    if Slow and not use_asyncio:  # else the banner is scrolled by render_task()
         scroll_text(MESSAGE, True)
         time.sleep(3)
-        gr.set_pen(gr.create_pen(0, 0, 0))
+        gr.set_pen(pens.pen(0, 0, 0))
         gr.clear()
-        gu.update(gr)
+        gu_update()
+        shown.invalidate()
     
     stop = False
     
+    if use_asyncio:
+        if my_debug:
+            print("main(): starting the uasyncio tasks")
+        try:
+            asyncio.run(run_tasks(MESSAGE if Slow else None))
+        except KeyboardInterrupt:
+            stop = True
     if my_debug:
         print("main(): entering main loop")
-    while True:
+    while not stop:
         try:
             # ----------------------------------------------+
             # Settings for Galactic Unicorn
             t = time.ticks_ms()
-            
-            gr.clear()
     
             # ----------FROM SCROLLING-TEXT SCRIPT FOR GALACTIC UNICORN ------------------------------------+
             time_now = time.ticks_ms()
@@ -1716,7 +2309,6 @@ def main(Slow):
             if lStart or lUpdate:
                 lStart = False
                 lUpdate = False
-                gr.clear()
 
             time.sleep(0.001)
             time_last = time_now
@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Baudrate detection of the GPSout link.
+
+    FSUIPC7 GPSout sends at 4800 ... 115200 baud. detect_baud() sets the uart to each candidate
+    rate in turn (uart.init()), reads it through the NMEAFramer (nmea_framer.py) for probe_ms and
+    scores the rate by its yield of sentences with a valid checksum: at a wrong rate the bytes are
+    framing garbage, in which a '*hh' checksum practically never matches.
+        score = valid sentences - sentences with a checksum mismatch
+    The rate with the highest score wins. A rate that gives AUTO_BAUD_SURE valid sentences without
+    a mismatch is taken at once, so when the first candidate (e.g. the configured rate) is right
+    the probe ends after the first epoch. The uart is left at the winning rate, or at the first
+    candidate if no rate gave a valid sentence (e.g. the simulator is not running).
+    The counters of the framer (sentences, overruns, bytes, backlog_max) are restored: the garbage
+    and the overruns of the wrong rates are not counted.
+
+    Usage:
+        baud, score = detect_baud(uart, framer, (9600,) + BAUD_RATES)
+        if score <= 0:
+            ...  # no NMEA sentences at any rate
+"""
+import time
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+BAUD_RATES = (4800, 9600, 19200, 38400, 57600, 115200)  # the rates of FSUIPC7 GPSout
+PROBE_MS = const(2500)     # per rate. More than an epoch at 1 Hz: a GPRMC + GPGGA pair
+PROBE_POLL_MS = const(10)  # uart poll period while probing
+AUTO_BAUD_SURE = const(2)  # valid sentences (without a mismatch) that end the probe at once
+
+
+def _probe(uart, framer, baud, probe_ms):  # (valid, mismatched) sentences received at baud in probe_ms
+    uart.init(baudrate=baud)
+    framer.discard()  # the bytes of the previous rate
+    accepted = framer.accepted
+    rejected = framer.rejected
+    t = time.ticks_ms()
+    while time.ticks_diff(time.ticks_ms(), t) < probe_ms:
+        framer.fill()
+        while framer.next_sentence():
+            pass
+        if framer.accepted - accepted >= AUTO_BAUD_SURE and framer.rejected == rejected:
+            break
+        time.sleep_ms(PROBE_POLL_MS)
+    return framer.accepted - accepted, framer.rejected - rejected
+
+
+"""
+detect_baud(uart, framer, rates, probe_ms) -> (baud, score)
+        Probe the rates in their order and leave the uart at the best one
+        Return: the rate and its score (valid - mismatched sentences). score <= 0: no rate gave
+                NMEA sentences, the uart is at rates[0]
+"""
+def detect_baud(uart, framer, rates=BAUD_RATES, probe_ms=PROBE_MS):
+    counts = framer.stats()
+    overruns, nbytes, backlog_max = framer.overruns, framer.nbytes, framer.backlog_max
+    best = rates[0]
+    best_score = 0
+    for baud in rates:
+        valid, mismatched = _probe(uart, framer, baud, probe_ms)
+        score = valid - mismatched
+        if score > best_score:
+            best = baud
+            best_score = score
+        if valid >= AUTO_BAUD_SURE and mismatched == 0:
+            break
+    if best != baud:
+        uart.init(baudrate=best)
+    framer.discard()
+    framer.accepted, framer.rejected, framer.truncated = counts
+    framer.overruns, framer.nbytes, framer.backlog_max = overruns, nbytes, backlog_max
+    return best, best_score
@@ -0,0 +1,121 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Dead reckoning of the position and the altitude between two fixes.
+
+    GPSout sends one GPRMC + GPGGA pair per second; by the time a screen shows it, a fix is
+    up to a second (or more) old. The DeadReckoner keeps the last fix (a record of nmea_parse.py)
+    with the ticks_ms it was received and extrapolates, at render time:
+        position: along the track made good true, with the groundspeed
+        altitude: with the vertical rate of the recent fixes (smoothed)
+    The extrapolation is limited to DR_MAX_MS after the fix, so a lost link freezes the values.
+
+    Position values use the record format: ddmm.mmmm x 10000 (negative = S / W).
+    Internally they are converted to minutes x 10000; one minute of latitude is one nautical mile.
+
+    Usage:
+        dr = DeadReckoner()
+        dr.update(rec, time.ticks_ms())       # for every fix
+        lat, lon = dr.position(time.ticks_ms())
+        alt = dr.altitude(time.ticks_ms())    # meters x 10
+"""
+import math
+import time
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+from nmea_parse import LAT, LON, GS, CRS, ALT, F_ALT, F_ALL
+
+DR_MAX_MS = const(3000)     # max extrapolation time after a fix
+VS_MAX_DT_MS = const(5000)  # fixes further apart give no vertical rate estimate
+MIN_E4_PER_DEG = const(600000)
+
+
+def to_minutes(v):  # ddmm.mmmm x 10000 -> minutes x 10000 (signed)
+    a = abs(v)
+    m = (a // 1000000) * MIN_E4_PER_DEG + a % 1000000
+    return -m if v < 0 else m
+
+
+def from_minutes(m):  # minutes x 10000 -> ddmm.mmmm x 10000 (signed)
+    a = abs(m)
+    v = (a // MIN_E4_PER_DEG) * 1000000 + a % MIN_E4_PER_DEG
+    return -v if m < 0 else v
+
+
+class DeadReckoner:
+
+    def __init__(self):
+        self.valid = False
+        self._t = 0       # ticks_ms of the last fix
+        self._lat = 0     # minutes x 10000
+        self._lon = 0     # minutes x 10000
+        self._gs = 0      # knots x 10
+        self._crs = 0     # degrees x 10, true
+        self._alt = 0     # meters x 10
+        self._vs = 0      # vertical rate, meters x 10 per second
+        self._fields = 0  # the fields (F_* bits of nmea_parse.py) parsed into the last fix
+
+    """
+    update(rec, t_ms, fields) -> void
+            Take a new fix, of which the fields (F_* bits) have been parsed. The vertical rate is
+            estimated from the altitude change since the previous fix and smoothed (3/4 old, 1/4 new)
+    """
+    def update(self, rec, t_ms, fields=F_ALL):
+        alt = rec[ALT]
+        if not fields & self._fields & F_ALT:  # no altitude in this or the previous fix
+            self._vs = 0
+        elif self.valid:
+            dt = time.ticks_diff(t_ms, self._t)
+            if 0 < dt <= VS_MAX_DT_MS:
+                self._vs = (self._vs * 3 + (alt - self._alt) * 1000 // dt) // 4
+            else:
+                self._vs = 0
+        self._t = t_ms
+        self._lat = to_minutes(rec[LAT])
+        self._lon = to_minutes(rec[LON])
+        self._gs = rec[GS]
+        self._crs = rec[CRS]
+        self._alt = alt
+        self._fields = fields
+        self.valid = True
+
+    def _dt(self, t_ms):  # ms since the fix, limited to 0 ... DR_MAX_MS
+        dt = time.ticks_diff(t_ms, self._t)
+        if dt < 0:
+            return 0
+        return DR_MAX_MS if dt > DR_MAX_MS else dt
+
+    """
+    position(t_ms) -> (lat, lon)
+            The position extrapolated to t_ms, in the record format (ddmm.mmmm x 10000)
+    """
+    def position(self, t_ms):
+        lat = self._lat
+        lon = self._lon
+        dt = self._dt(t_ms)
+        if dt and self._gs:
+            dist = self._gs * dt / 3600  # nautical miles (= minutes of latitude) x 10000
+            crs = math.radians(self._crs / 10)
+            lat += int(dist * math.cos(crs))
+            cos_lat = math.cos(math.radians(lat / MIN_E4_PER_DEG))
+            if cos_lat > 0.01:  # not at a pole
+                lon += int(dist * math.sin(crs) / cos_lat)
+            if lon > 180 * MIN_E4_PER_DEG:
+                lon -= 360 * MIN_E4_PER_DEG
+            elif lon < -180 * MIN_E4_PER_DEG:
+                lon += 360 * MIN_E4_PER_DEG
+        return from_minutes(lat), from_minutes(lon)
+
+    def altitude(self, t_ms):  # the altitude extrapolated to t_ms, meters x 10
+        return self._alt + self._vs * self._dt(t_ms) // 1000
+
+    def vs(self):  # vertical rate, meters x 10 per second
+        return self._vs
@@ -0,0 +1,97 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Single-slot, latest-wins mailbox for the fixes passed from the receiver to the display side
+    (e.g. from the receiver on core 1 to the renderer on core 0).
+
+    It holds the latest fix only (a record of nmea_parse.py, the F_* bits of its parsed fields and
+    the ticks_ms it arrived): put() overwrites it, take() copies it out if it is newer than the one
+    taken before. A fix that is overwritten before it has been taken is counted in coalesced: the
+    display side always gets the freshest fix and never works through a backlog of old ones.
+    The copies are made under a _thread lock, so a record is never read while the other core writes
+    it. Both copy into preallocated records: put() and take() allocate nothing.
+    Without _thread (a port without threads) the lock is left out.
+    The lock is public (lock): the main script lends it to the log, stats and meter objects both
+    cores use while the receiver runs on core 1.
+
+    Usage:
+        box = FixMailbox(NR_FIELDS)
+        box.put(rx_rec, rx_fields, t_ms)  # core 1
+        fields = box.take(fix_rec)        # core 0. -1: no new fix
+        box.fix_ms                        # the ticks_ms the taken fix arrived
+        box.age(time.ticks_ms())          # its age in ms
+"""
+import time
+from array import array
+try:
+    import _thread
+except ImportError:  # a port without threads
+    _thread = None
+
+
+class FixMailbox:
+
+    def __init__(self, size):
+        self.lock = _thread.allocate_lock() if _thread is not None else None
+        self._rec = array('i', [0] * size)
+        self._size = size
+        self._fields = 0
+        self._t_ms = 0
+        self.seq = 0        # nr of fixes put
+        self.coalesced = 0  # nr of fixes overwritten before they were taken
+        self.fix_ms = 0     # ticks_ms the fix taken last arrived
+        self._taken = 0     # seq of the fix taken last
+
+    """
+    put(rec, fields, t_ms) -> void
+            Store a copy of rec (fields: its F_* bits, t_ms: the ticks_ms it arrived) as the latest fix
+    """
+    def put(self, rec, fields, t_ms):
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            box = self._rec
+            for i in range(self._size):
+                box[i] = rec[i]
+            self._fields = fields
+            self._t_ms = t_ms
+            if self.seq != self._taken:
+                self.coalesced += 1
+            self.seq += 1
+        finally:
+            if lock:
+                lock.release()
+
+    """
+    take(rec) -> fields
+            Copy the latest fix into rec if it has not been taken yet
+            Return: the F_* bits of its fields, -1 if there is no new fix (rec is unchanged)
+    """
+    def take(self, rec):
+        if self.seq == self._taken:
+            return -1
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            box = self._rec
+            for i in range(self._size):
+                rec[i] = box[i]
+            fields = self._fields
+            self.fix_ms = self._t_ms
+            self._taken = self.seq
+        finally:
+            if lock:
+                lock.release()
+        return fields
+
+    def age(self, t_ms):  # ms since the fix taken last arrived
+        return time.ticks_diff(t_ms, self.fix_ms)
+
+    def stats(self):  # (fixes put, fixes coalesced)
+        return self.seq, self.coalesced
@@ -0,0 +1,123 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Adaptive garbage collection scheduler.
+
+    A gc.collect() of the RP2040 heap takes milliseconds. Instead of collecting at fixed places,
+    idle() is called where the script has time to spare (e.g. after a sentence pair has been
+    handled and before the next one arrives). It collects only when enough has been allocated
+    since the previous collection, or when the free heap is low.
+    The allocation rate (bytes/s, gc.mem_alloc()) is measured over windows of RATE_WINDOW_MS.
+    From it:
+        collect_at:     bytes allocated before idle() collects: rate x GC_IDLE_MS
+        gc.threshold(): bytes allocated before MicroPython collects by itself: rate x GC_AUTO_MS,
+                        so that an automatic collection (at any moment) only happens when
+                        idle() has not been called for a long time
+    emergency() is the path for a MemoryError: collect at once and count it.
+    Counters (attributes):
+        collections:  collections by idle()
+        emergencies:  collections by emergency()
+        total_us:     time spent in these collections
+        max_us:       the longest collection
+
+    Usage:
+        gcs = GCScheduler()
+        gcs.idle()       # in an idle window
+        try:
+            ...
+        except MemoryError:
+            gcs.emergency()
+"""
+import gc
+import time
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+RATE_WINDOW_MS = const(2000)    # allocation rate measurement window
+GC_IDLE_MS = const(2000)        # idle() collects after about this much time of allocations
+GC_AUTO_MS = const(6000)        # automatic collection after about this much time of allocations
+GC_MIN_COLLECT = const(4096)    # bytes. Lower limit of collect_at
+GC_MIN_THRESHOLD = const(8192)  # bytes. Lower limit of the gc.threshold()
+GC_LOW_FREE = const(16384)      # bytes. Less free heap: idle() always collects
+
+
+class GCScheduler:
+
+    def __init__(self):
+        self.collections = 0
+        self.emergencies = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.rate = 0           # allocation rate, bytes/s (smoothed)
+        self.collect_at = GC_MIN_COLLECT
+        self.threshold = 0      # the value set with gc.threshold(), 0: not set yet
+        self._t_rate = time.ticks_ms()
+        self._alloc_rate = gc.mem_alloc()  # mem_alloc() at the start of the rate window
+        self._alloc_gc = self._alloc_rate  # mem_alloc() after the last collection
+
+    def _collect(self):
+        t = time.ticks_us()
+        gc.collect()
+        us = time.ticks_diff(time.ticks_us(), t)
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+        self._alloc_gc = gc.mem_alloc()
+        return us
+
+    def _measure(self, alloc):  # update the allocation rate, collect_at and the gc threshold
+        t = time.ticks_ms()
+        dt = time.ticks_diff(t, self._t_rate)
+        if dt < RATE_WINDOW_MS:
+            return
+        delta = alloc - self._alloc_rate
+        if delta >= 0:  # else MicroPython collected by itself in this window: no measurement
+            r = delta * 1000 // dt
+            self.rate = r if self.rate == 0 else (self.rate * 3 + r) // 4
+        self._t_rate = t
+        self._alloc_rate = alloc
+        c = self.rate * GC_IDLE_MS // 1000
+        self.collect_at = c if c > GC_MIN_COLLECT else GC_MIN_COLLECT
+        th = self.rate * GC_AUTO_MS // 1000
+        if th < GC_MIN_THRESHOLD:
+            th = GC_MIN_THRESHOLD
+        limit = gc.mem_free() // 2
+        if th > limit:
+            th = limit if limit > GC_MIN_THRESHOLD else GC_MIN_THRESHOLD
+        if abs(th - self.threshold) > self.threshold // 8:  # changed more than 12 %
+            self.threshold = th
+            gc.threshold(th)
+
+    """
+    idle() -> bool
+            Call in an idle window. Collect if collect_at bytes have been allocated since the
+            previous collection or if the free heap is below GC_LOW_FREE
+            Return: True if a collection has been done
+    """
+    def idle(self):
+        alloc = gc.mem_alloc()
+        if alloc < self._alloc_gc:  # collected elsewhere (e.g. automatically)
+            self._alloc_gc = alloc
+        self._measure(alloc)
+        if alloc - self._alloc_gc < self.collect_at and gc.mem_free() >= GC_LOW_FREE:
+            return False
+        self._collect()
+        self.collections += 1
+        self._alloc_rate -= alloc - self._alloc_gc  # the rate window continues after the collection
+        return True
+
+    def emergency(self):  # after a MemoryError
+        self._collect()
+        self.emergencies += 1
+        self._t_rate = time.ticks_ms()  # restart the rate window
+        self._alloc_rate = self._alloc_gc
+
+    def stats(self):  # (collections, emergencies, total ms, max us, rate bytes/s, threshold bytes)
+        return self.collections, self.emergencies, self.total_us // 1000, self.max_us, self.rate, self.threshold
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Pre-rendered glyph cache for the 5x8 column font (FONT in GU_Workout_mod_ini.py).
+
+    The font stores a glyph as 5 column bytes (bit 0 is the top row). Drawing it pixel by pixel
+    costs 40 bit tests and a gr.pixel() call per lit pixel. The cache converts a glyph, on first
+    use, into a list of horizontal runs of lit pixels: (x, y, length) byte triples, drawn with
+    one gr.pixel_span() call per run.
+    Strings that are drawn repeatedly (e.g. "Reset...") are rendered as a whole: runs of
+    adjacent glyphs are merged, so a string costs one call per run of its rows. The string
+    cache is bounded: when it holds max_strings strings it is emptied.
+    Counters (attributes):
+        hits:   string() calls answered from the cache
+        misses: string() calls that rendered the string
+
+    Usage:
+        glyphs = GlyphCache(FONT, FONT_WIDTH, FONT_HEIGHT)
+        gr.set_pen(pen)
+        glyphs.text(gr, "Reset...", 6, 2)
+"""
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+ADVANCE = const(6)       # glyph width + 1 column spacing
+MAX_STRINGS = const(16)  # max nr of cached strings
+
+
+class GlyphCache:
+
+    def __init__(self, font, width=5, height=8, advance=ADVANCE, max_strings=MAX_STRINGS):
+        self._font = font
+        self._width = width
+        self._height = height
+        self._advance = advance
+        self._max_strings = max_strings
+        self._glyphs = [None] * (len(font) // width)
+        self._strings = {}
+        self.hits = 0
+        self.misses = 0
+
+    """
+    _render(s) -> runs
+            Render the characters of s, advance columns apart, into (x, y, length) runs
+    """
+    def _render(self, s):
+        font = self._font
+        fw = self._width
+        adv = self._advance
+        nr_glyphs = len(self._glyphs)
+        runs = bytearray()
+        for y in range(self._height):
+            bit = 1 << y
+            x = 0
+            start = -1
+            for ch in s:
+                code = ord(ch)
+                base = (code if code < nr_glyphs else 0) * fw
+                for i in range(adv):
+                    if i < fw and font[base + i] & bit:
+                        if start < 0:
+                            start = x
+                    elif start >= 0:
+                        runs.extend((start, y, x - start))
+                        start = -1
+                    x += 1
+            if start >= 0:
+                runs.extend((start, y, x - start))
+        return bytes(runs)
+
+    def glyph(self, code):  # the runs of one glyph
+        g = self._glyphs[code]
+        if g is None:
+            g = self._glyphs[code] = self._render(chr(code))
+        return g
+
+    def string(self, s):  # the runs of a whole string
+        runs = self._strings.get(s)
+        if runs is not None:
+            self.hits += 1
+            return runs
+        self.misses += 1
+        if len(self._strings) >= self._max_strings:
+            self._strings.clear()
+        runs = self._strings[s] = self._render(s)
+        return runs
+
+    def blit(self, gr, runs, x, y):  # draw runs at x, y with the current pen
+        i = 0
+        le = len(runs)
+        while i < le:
+            gr.pixel_span(x + runs[i], y + runs[i + 1], runs[i + 2])
+            i += 3
+
+    def text(self, gr, s, x, y):
+        self.blit(gr, self.string(s), x, y)
+
+    def stats(self):  # (hits, misses)
+        return self.hits, self.misses
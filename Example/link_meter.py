@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Throughput meter of the GPSout serial link.
+
+    tick() is called where the receiver has read the uart (after framer.fill()). Every
+    LINK_WINDOW_MS it measures, from the counters of the NMEAFramer (nmea_framer.py):
+        bytes_s:      bytes received per second
+        sentences_s:  sentences with a valid checksum per second, x 10
+        load:         bytes_s in % of what the link carries at baud (8N1: baud / 10 bytes/s)
+        overruns:     uart rx buffer overruns in the window (bytes have been lost)
+        truncated:    incomplete sentences in the window
+    A receiver that falls behind the link shows as overruns and truncated sentences (see behind())
+    and as a framer.backlog_max close to the rx buffer size of the uart.
+    Nothing is allocated: the counters are small ints.
+    While tick() runs on another core than the reader of the rates, set lock to a _thread lock:
+    tick() and stats() then run under it.
+
+    Usage:
+        meter = LinkMeter(framer, 4800)
+        framer.fill()
+        if meter.tick(time.ticks_ms()) and meter.behind():
+            ...
+"""
+import time
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+from nmea_framer import BYTE_BITS, NBYTES_MASK
+
+LINK_WINDOW_MS = const(2000)  # measurement window
+
+
+class LinkMeter:
+
+    def __init__(self, framer, baud):
+        self._framer = framer
+        self.baud = baud
+        self.bytes_s = 0
+        self.sentences_s = 0  # x 10
+        self.load = 0         # %
+        self.overruns = 0     # in the last window
+        self.truncated = 0    # in the last window
+        self._t = time.ticks_ms()
+        self._nbytes = framer.nbytes
+        self._accepted = framer.accepted
+        self._overruns = framer.overruns
+        self._truncated = framer.truncated
+        self.lock = None      # a _thread lock while tick() runs on another core
+
+    """
+    tick(t_ms) -> bool
+            Measure the link if LINK_WINDOW_MS have passed since the last measurement
+            Return: True if a new measurement has been made
+    """
+    def tick(self, t_ms):
+        dt = time.ticks_diff(t_ms, self._t)
+        if dt < LINK_WINDOW_MS:
+            return False
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            fr = self._framer
+            self.bytes_s = ((fr.nbytes - self._nbytes) & NBYTES_MASK) * 1000 // dt
+            self.sentences_s = (fr.accepted - self._accepted) * 10000 // dt
+            self.load = self.bytes_s * BYTE_BITS * 100 // self.baud
+            self.overruns = fr.overruns - self._overruns
+            self.truncated = fr.truncated - self._truncated
+            self._t = t_ms
+            self._nbytes = fr.nbytes
+            self._accepted = fr.accepted
+            self._overruns = fr.overruns
+            self._truncated = fr.truncated
+        finally:
+            if lock:
+                lock.release()
+        return True
+
+    def behind(self):  # the last window lost bytes: the receiver does not keep up with the link
+        return self.overruns > 0 or self.truncated > 0
+
+    def stats(self):  # (bytes/s, sentences/s x 10, load %, total overruns, total truncated, max uart backlog)
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            fr = self._framer
+            r = self.bytes_s, self.sentences_s, self.load, fr.overruns, fr.truncated, fr.backlog_max
+        finally:
+            if lock:
+                lock.release()
+        return r
@@ -0,0 +1,268 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Streaming NMEA-0183 sentence framer for the GPSout UART link.
+
+    The framer owns one preallocated ring buffer. Received bytes are pulled from the UART
+    with readinto() into a small preallocated staging buffer (through a memoryview) and
+    copied into the ring. The staging buffer can also be filled by the caller (e.g. by an
+    awaited uasyncio StreamReader.readinto(framer.stage_mv)) and handed over with push(n). next_sentence() consumes the ring byte by byte and assembles a
+    '$' ... '\\n' frame into the preallocated line buffer.
+    Nothing is allocated per byte or per sentence: after next_sentence() returned n > 0,
+    the complete sentence (including '\\r\\n') is in framer.line[:n].
+
+    While assembling, the XOR checksum of the characters between '$' and '*' is calculated
+    and compared with the '*hh' tail. Only sentences with a correct checksum are returned.
+    Counters (attributes):
+        accepted:  sentences with a valid checksum
+        rejected:  sentences with a checksum mismatch (e.g. line noise)
+        truncated: incomplete sentences: no '*hh' tail, a new '$' before the '\\n', too long
+        overruns:  fill() found the uart rx buffer full (bytes have been lost), or the ring
+                   overflowed. Only checked when the rxbuf size is given
+        nbytes:    bytes received (wraps at 2**30)
+        backlog_max: the most bytes found waiting in the uart (uart.any()) by fill()
+    rxbuf_size() gives the rx buffer a UART needs to hold the bytes of block_ms at a baudrate, so
+    nothing is lost while the script does not read it (e.g. while a screen is shown).
+
+    Example of a framed sentence:
+        b'$GPRMC,151948.00,A,5031.8614,N,00005.2524,E,83.0,315.1,201122,0.5,E*6A\\r\\n'
+
+    Usage:
+        uart = UART(1, 4800, rxbuf=rxbuf_size(4800, 5000))
+        framer = NMEAFramer(uart, rxbuf=rxbuf_size(4800, 5000))
+        framer.fill()
+        n = framer.next_sentence()
+        while n > 0:
+            ... use framer.line[:n] ...
+            n = framer.next_sentence()
+"""
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+RING_SIZE = const(256)   # Must be a power of 2. Holds about three RMC/GGA sentences
+STAGE_SIZE = const(64)   # Max nr of bytes moved per uart.readinto() call
+LINE_SIZE = const(96)    # An NMEA sentence is max 82 characters incl. '$' and '\r\n'
+RXBUF_MIN = const(256)   # the default rx buffer of the RP2040 UART
+RXBUF_MAX = const(16384)
+BYTE_BITS = const(10)    # 8N1: a start bit, 8 data bits and a stop bit per byte
+NBYTES_MASK = const(0x3FFFFFFF)
+
+CHR_DOLLAR = const(0x24)  # '$'
+CHR_STAR = const(0x2A)    # '*'
+CHR_LF = const(0x0A)      # '\n'
+CHR_0 = const(0x30)
+CHR_9 = const(0x39)
+CHR_UA = const(0x41)      # 'A'
+CHR_UF = const(0x46)      # 'F'
+CHR_LA = const(0x61)      # 'a'
+CHR_LF_ = const(0x66)     # 'f'
+
+
+def hex_val(c):  # value of an ASCII hex digit, -1 if c is not a hex digit
+    if CHR_0 <= c <= CHR_9:
+        return c - CHR_0
+    if CHR_UA <= c <= CHR_UF:
+        return c - CHR_UA + 10
+    if CHR_LA <= c <= CHR_LF_:
+        return c - CHR_LA + 10
+    return -1
+
+
+"""
+rxbuf_size(baud, block_ms) -> nr_bytes
+        The uart rx buffer that holds the bytes received at baud in block_ms, plus one sentence,
+        rounded up to a multiple of STAGE_SIZE and limited to RXBUF_MIN ... RXBUF_MAX
+"""
+def rxbuf_size(baud, block_ms):
+    n = baud // BYTE_BITS * block_ms // 1000 + LINE_SIZE
+    n = (n + STAGE_SIZE - 1) // STAGE_SIZE * STAGE_SIZE
+    if n < RXBUF_MIN:
+        return RXBUF_MIN
+    return n if n < RXBUF_MAX else RXBUF_MAX
+
+
+class NMEAFramer:
+
+    def __init__(self, uart, ring_size=RING_SIZE, rxbuf=0):
+        if ring_size & (ring_size - 1):
+            raise ValueError("ring_size must be a power of 2")
+        self._uart = uart
+        self._ring = bytearray(ring_size)
+        self._mask = ring_size - 1
+        self._head = 0  # next write position
+        self._tail = 0  # next read position
+        self._used = 0  # nr of unread bytes in the ring
+        self._stage = bytearray(STAGE_SIZE)
+        self.stage_mv = memoryview(self._stage)
+        self.line = bytearray(LINE_SIZE)
+        self.line_mv = memoryview(self.line)
+        self._line_n = 0
+        self._in_frame = False
+        self._cs = 0     # running XOR checksum
+        self._star = 0   # position of '*' in self.line, 0: not (yet) received
+        self.accepted = 0
+        self.rejected = 0
+        self.truncated = 0
+        self.overruns = 0
+        self.nbytes = 0
+        self.backlog_max = 0
+        self.rxbuf = rxbuf  # the rx buffer size of the uart, 0: unknown (no overrun check)
+
+    """
+    fill(void) -> nr_bytes
+            Move the bytes waiting in the UART into the ring buffer, STAGE_SIZE bytes at a time.
+            It stops when fewer than STAGE_SIZE bytes of room are left in the ring: the rest
+            waits in the UART for the next call (after next_sentence() made room), nothing is lost.
+            push() (also called by rx_task() after a StreamReader.readinto()) does not stop: when
+            the ring is full it overwrites the oldest bytes and counts an overrun.
+            With rxbuf given, a full uart rx buffer is counted as an overrun
+            Return: the number of bytes moved (0 if the UART had nothing)
+    """
+    def fill(self):
+        if self.rxbuf:
+            waiting = self._uart.any()
+            if waiting > self.backlog_max:
+                self.backlog_max = waiting
+            if waiting >= self.rxbuf:  # the uart had no room for the bytes that came next
+                self.overruns += 1
+        total = 0
+        while self._mask + 1 - self._used >= STAGE_SIZE:
+            n = self._uart.readinto(self.stage_mv)
+            if not n:  # None: uart timeout, no data
+                break
+            self.push(n)
+            total += n
+            if n < STAGE_SIZE:  # the uart is empty
+                break
+        return total
+
+    def push(self, n):  # copy the first n bytes of the staging buffer (stage_mv) into the ring. A full ring loses its oldest bytes
+        ring = self._ring
+        stage = self._stage
+        mask = self._mask
+        head = self._head
+        i = 0
+        while i < n:
+            ring[head] = stage[i]
+            head = (head + 1) & mask
+            i += 1
+        self._head = head
+        self._used += n
+        self.nbytes = (self.nbytes + n) & NBYTES_MASK
+        if self._used > mask + 1:  # overrun: drop the oldest bytes
+            self.overruns += 1
+            self._used = mask + 1
+            self._tail = self._head
+
+    def pending(self):
+        return self._used
+
+    """
+    next_sentence(void) -> n
+            Consume ring bytes until a complete sentence with a valid checksum has been
+            assembled in self.line. Invalid and incomplete sentences are counted and dropped.
+            A partially received sentence stays in self.line until the next call.
+            Return: length of the sentence in self.line, 0 if no complete sentence yet
+    """
+    def next_sentence(self):
+        ring = self._ring
+        line = self.line
+        mask = self._mask
+        tail = self._tail
+        used = self._used
+        n = self._line_n
+        in_frame = self._in_frame
+        cs = self._cs
+        star = self._star
+        result = 0
+        while used:
+            c = ring[tail]
+            tail = (tail + 1) & mask
+            used -= 1
+            if c == CHR_DOLLAR:  # start of a (new) sentence
+                if in_frame:
+                    self.truncated += 1
+                line[0] = c
+                n = 1
+                cs = 0
+                star = 0
+                in_frame = True
+            elif in_frame:
+                if n >= LINE_SIZE:  # no '\n' in time: discard
+                    self.truncated += 1
+                    in_frame = False
+                    n = 0
+                    continue
+                line[n] = c
+                if c == CHR_LF:
+                    in_frame = False
+                    if star == 0 or n < star + 3:  # no '*hh' tail
+                        self.truncated += 1
+                        n = 0
+                        continue
+                    hi = hex_val(line[star + 1])
+                    lo = hex_val(line[star + 2])
+                    if hi >= 0 and lo >= 0 and (hi << 4) + lo == cs:
+                        self.accepted += 1
+                        result = n + 1
+                        n = 0
+                        break
+                    self.rejected += 1  # a checksum mismatch or a '*hh' tail that is not hex
+                    n = 0
+                    continue
+                if star == 0:
+                    if c == CHR_STAR:
+                        star = n
+                    else:
+                        cs ^= c
+                n += 1
+            # else: byte outside a frame, e.g. an isolated '\x00'. Skip it
+        self._tail = tail
+        self._used = used
+        self._line_n = n
+        self._in_frame = in_frame
+        self._cs = cs
+        self._star = star
+        return result
+
+    """
+    copy_line(dst, offset) -> offset
+            Copy the last sentence returned by next_sentence() into dst, starting at offset.
+            Copies as much as fits into dst.
+            Return: the offset just past the copied bytes
+    """
+    def copy_line(self, dst, offset):
+        line = self.line
+        le = len(dst)
+        for i in range(LINE_SIZE):
+            if offset >= le:
+                break
+            c = line[i]
+            dst[offset] = c
+            offset += 1
+            if c == CHR_LF:
+                break
+        return offset
+
+    def stats(self):  # (accepted, rejected, truncated)
+        return self.accepted, self.rejected, self.truncated
+
+    def discard(self):  # drop the bytes waiting in the uart (e.g. received before the receiver started) and reset
+        while self._uart.readinto(self.stage_mv):
+            pass
+        self.backlog_max = 0
+        self.reset()
+
+    def reset(self):
+        self._head = self._tail = self._used = 0
+        self._line_n = 0
+        self._in_frame = False
+        self._cs = 0
+        self._star = 0
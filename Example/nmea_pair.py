@@ -0,0 +1,123 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Pairing of the GPRMC and GPGGA sentences of one epoch by their UTC time field.
+
+    Both sentences are parsed into the same record (see nmea_parse.py): GPRMC writes the position,
+    speed, track etc., GPGGA the altitude. A fix is only coherent when both halves carry the same
+    hhmmss.ss time. The FixPairer is told about every parsed GPRMC (rmc()) and GPGGA (gga()):
+        - a GPGGA of the epoch of the pending GPRMC completes the fix
+        - a GPGGA of another epoch is kept, in case its GPRMC follows (receivers that send
+          GPGGA first); a later GPRMC of that epoch completes the fix at once
+        - a GPRMC that has waited wait_ms for its GPGGA is emitted alone by poll(), with the
+          altitude of the last GPGGA (cached). GGA_OK is then reset in the record
+    The time field must be parsed (F_TIME in the want argument of nmea_parse.dispatch()).
+    Counters (attributes):
+        pairs:       fixes of a GPRMC and a GPGGA of the same epoch
+        rmc_only:    fixes of a GPRMC alone, with the cached altitude
+        mismatched:  GPGGA sentences of another epoch than the pending GPRMC
+        dropped:     GPRMC sentences replaced by a newer one before they were emitted
+
+    Usage:
+        pair = FixPairer()
+        key = dispatch(line, n, rec)
+        if key == KEY_RMC:
+            ok = pair.rmc(rec, time.ticks_ms())
+        elif key == KEY_GGA:
+            ok = pair.gga(rec)
+        ...
+        if pair.poll(rec, time.ticks_ms()):  # e.g. every ms while pair.waiting()
+            ...                               # an RMC-only fix
+"""
+import time
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+from nmea_parse import TIME, ALT, VALID, GGA_OK
+
+PAIR_WAIT_MS = const(500)  # a GPRMC waits this long for its GPGGA. At 4800 baud a GPGGA takes 170 ms
+NO_TIME = const(-1)
+
+
+class FixPairer:
+
+    def __init__(self, wait_ms=PAIR_WAIT_MS):
+        self.wait_ms = wait_ms
+        self.pairs = 0
+        self.rmc_only = 0
+        self.mismatched = 0
+        self.dropped = 0
+        self.alt = 0              # the cached altitude: of the last GPGGA, meters x 10
+        self.alt_ok = False       # a GPGGA has been received (alt is valid)
+        self._rmc_t = NO_TIME     # time of the pending GPRMC (hhmmss.ss x 100)
+        self._rmc_ms = 0          # ticks_ms it arrived
+        self._gga_t = NO_TIME     # time of the GPGGA kept for a later GPRMC
+        self._gga_alt = 0
+
+    def waiting(self):  # a GPRMC waits for its GPGGA
+        return self._rmc_t != NO_TIME
+
+    """
+    rmc(rec, t_ms) -> bool
+            A GPRMC sentence has been parsed into rec at t_ms
+            Return: True if it completes a fix with the GPGGA kept before (rec holds the fix)
+    """
+    def rmc(self, rec, t_ms):
+        if self._rmc_t != NO_TIME:
+            self.dropped += 1
+        t = rec[TIME]
+        if t == self._gga_t:  # its GPGGA came first
+            self._rmc_t = self._gga_t = NO_TIME
+            rec[ALT] = self._gga_alt
+            rec[VALID] |= GGA_OK
+            self.pairs += 1
+            return True
+        self._rmc_t = t
+        self._rmc_ms = t_ms
+        return False
+
+    """
+    gga(rec) -> bool
+            A GPGGA sentence has been parsed into rec (its time and altitude)
+            Return: True if it completes the fix of the pending GPRMC (rec holds the fix)
+    """
+    def gga(self, rec):
+        t = rec[TIME]
+        self.alt = rec[ALT]
+        self.alt_ok = True
+        if t == self._rmc_t:
+            self._rmc_t = NO_TIME
+            self.pairs += 1
+            return True
+        self._gga_t = t
+        self._gga_alt = rec[ALT]
+        if self._rmc_t != NO_TIME:
+            self.mismatched += 1
+            rec[TIME] = self._rmc_t  # rec keeps the pending GPRMC
+        rec[VALID] &= ~GGA_OK
+        return False
+
+    """
+    poll(rec, t_ms) -> bool
+            Emit the pending GPRMC alone if it has waited wait_ms for its GPGGA at t_ms.
+            rec[ALT] is set to the cached altitude (if alt_ok) and GGA_OK is reset
+            Return: True if rec holds an RMC-only fix
+    """
+    def poll(self, rec, t_ms):
+        if self._rmc_t == NO_TIME or time.ticks_diff(t_ms, self._rmc_ms) < self.wait_ms:
+            return False
+        self._rmc_t = NO_TIME
+        rec[ALT] = self.alt
+        rec[VALID] &= ~GGA_OK
+        self.rmc_only += 1
+        return True
+
+    def stats(self):  # (pairs, rmc_only, mismatched, dropped)
+        return self.pairs, self.rmc_only, self.mismatched, self.dropped
@@ -0,0 +1,361 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Byte level parser for the NMEA sentences sent by FSUIPC7 GPSout (and other GPS receivers).
+
+    The parse functions walk the raw sentence bytes (e.g. framer.line) once and write the
+    values as fixed-point integers straight into a preallocated numeric record
+    (an array('i') created by new_record()). No intermediate list or string is created.
+
+    Dispatch table: dispatch() looks up the handler of a sentence by its id (the three
+    characters after the talker id GP or GN, e.g. RMC) in HANDLERS, without creating a
+    bytes object. Built in handlers: RMC, GGA, VTG and GLL. Other sentences can be
+    added with register().
+    Lazy parsing: a handler only converts the fields of the record whose bit (F_TIME, F_LAT, ...)
+    is set in its want argument. The other fields are skipped (their commas are still counted,
+    so the completeness check of a sentence does not change) and keep their old value.
+
+    Record layout (index: contents):
+        TIME:  UTC time hhmmss.ss x 100            e.g. 151948.00  -> 15194800
+        LAT:   latitude ddmm.mmmm x 10000           e.g. 5031.8614  -> 50318614 (negative = S)
+        LON:   longitude dddmm.mmmm x 10000         e.g. 00005.2524 -> 52524    (negative = W)
+        GS:    groundspeed in knots x 10            e.g. 83.0       -> 830
+        CRS:   track made good true, degrees x 10   e.g. 315.1      -> 3151
+        DATE:  ddmmyy                               e.g. 201122     -> 201122
+        VAR:   magnetic variation, degrees x 10     e.g. 0.5,E      -> 5        (negative = W)
+        ALT:   altitude in meters x 10              e.g. 914.4      -> 9144
+        VALID: bit flags, see RMC_OK, GGA_OK and FIX_OK
+
+    Examples of sentences:
+        b'$GPRMC,151948.00,A,5031.8614,N,00005.2524,E,83.0,315.1,201122,0.5,E*6A\\r\\n'
+        b'$GPGGA,151948.00,5031.8614,N,00005.2524,E,1,05,0.0,914.4,M,0.0,M,0.0,0000*77\\r\\n'
+        b'$GPVTG,315.1,T,314.6,M,83.0,N,153.7,K*73\\r\\n'
+        b'$GPGLL,5031.8614,N,00005.2524,E,151948.00,A*0C\\r\\n'
+"""
+from array import array
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+TIME = const(0)
+LAT = const(1)
+LON = const(2)
+GS = const(3)
+CRS = const(4)
+DATE = const(5)
+VAR = const(6)
+ALT = const(7)
+VALID = const(8)
+NR_FIELDS = const(9)
+
+RMC_OK = const(1)  # a complete GPRMC sentence has been parsed
+GGA_OK = const(2)  # a complete GPGGA sentence has been parsed
+FIX_OK = const(4)  # GPRMC status 'A' (data valid). 'V' (void): the fields are empty, not a fix
+
+# Field bits for the want argument of the parse functions (1 << index in the record)
+F_TIME = const(1)
+F_LAT = const(2)
+F_LON = const(4)
+F_GS = const(8)
+F_CRS = const(16)
+F_DATE = const(32)
+F_VAR = const(64)
+F_ALT = const(128)
+F_ALL = const(255)
+
+CHR_COMMA = const(0x2C)  # ','
+CHR_STAR = const(0x2A)   # '*'
+CHR_DOT = const(0x2E)    # '.'
+CHR_MINUS = const(0x2D)  # '-'
+CHR_0 = const(0x30)
+CHR_9 = const(0x39)
+CHR_A = const(0x41)
+CHR_S = const(0x53)
+CHR_W = const(0x57)
+CHR_DOLLAR = const(0x24)  # '$'
+CHR_G = const(0x47)
+CHR_N = const(0x4E)
+CHR_P = const(0x50)
+
+FT_PER_M_E4 = const(32808)  # 3.2808 ft per meter, x 10000
+
+DATA_START = const(7)  # index of the first character after '$GPRMC,' or '$GPGGA,'
+
+# The fields (F_* bits) the data fields of a sentence are converted into. Index: field nr
+RMC_FIELDS = (0, F_TIME, 0, F_LAT, F_LAT, F_LON, F_LON, F_GS, F_CRS, F_DATE, F_VAR, F_VAR)
+GGA_FIELDS = (0, F_TIME, 0, 0, 0, 0, 0, 0, 0, F_ALT)
+
+
+def new_record():
+    return array('i', [0] * NR_FIELDS)
+
+
+"""
+fixed(buf, start, end, decimals) -> int
+        Convert the ASCII number in buf[start:end] into an integer scaled by 10**decimals.
+        Superfluous decimals are truncated, missing ones are padded with zeroes.
+        An empty field results in 0.
+"""
+def fixed(buf, start, end, decimals):
+    v = 0
+    neg = False
+    frac = -1  # nr of decimals seen, -1: no decimal point yet
+    i = start
+    while i < end:
+        c = buf[i]
+        if CHR_0 <= c <= CHR_9:
+            if frac < 0:
+                v = v * 10 + c - CHR_0
+            elif frac < decimals:
+                v = v * 10 + c - CHR_0
+                frac += 1
+        elif c == CHR_DOT:
+            frac = 0
+        elif c == CHR_MINUS:
+            neg = True
+        i += 1
+    if frac < 0:
+        frac = 0
+    while frac < decimals:
+        v *= 10
+        frac += 1
+    return -v if neg else v
+
+
+"""
+parse_rmc(buf, n, rec, want) -> bool
+        Parse the GPRMC sentence in buf[:n] into rec. Only the fields in want are converted,
+        the status (FIX_OK) always. A GPRMC sentence starts a new GPRMC + GPGGA pair: GGA_OK is reset
+        Return: True if all 11 data fields were present
+"""
+def parse_rmc(buf, n, rec, want=F_ALL):
+    rec[VALID] &= ~GGA_OK
+    try:
+        fld = _parse_rmc(buf, n, rec, want)
+    except OverflowError:  # garbage that passed the (8 bit) checksum
+        fld = 0
+    if fld >= 12:
+        rec[VALID] |= RMC_OK
+        return True
+    rec[VALID] &= ~RMC_OK
+    return False
+
+
+def _parse_rmc(buf, n, rec, want):
+    fld = 1
+    start = i = DATA_START
+    lat = lon = var = 0
+    while i < n:
+        c = buf[i]
+        if c == CHR_COMMA or c == CHR_STAR:
+            if fld < 12 and RMC_FIELDS[fld] and not RMC_FIELDS[fld] & want:
+                pass  # not subscribed
+            elif fld == 1:
+                rec[TIME] = fixed(buf, start, i, 2)
+            elif fld == 2:
+                if i > start and buf[start] == CHR_A:
+                    rec[VALID] |= FIX_OK
+                else:
+                    rec[VALID] &= ~FIX_OK
+            elif fld == 3:
+                lat = fixed(buf, start, i, 4)
+            elif fld == 4:
+                rec[LAT] = -lat if i > start and buf[start] == CHR_S else lat
+            elif fld == 5:
+                lon = fixed(buf, start, i, 4)
+            elif fld == 6:
+                rec[LON] = -lon if i > start and buf[start] == CHR_W else lon
+            elif fld == 7:
+                rec[GS] = fixed(buf, start, i, 1)
+            elif fld == 8:
+                rec[CRS] = fixed(buf, start, i, 1)
+            elif fld == 9:
+                rec[DATE] = fixed(buf, start, i, 0)
+            elif fld == 10:
+                var = fixed(buf, start, i, 1)
+            elif fld == 11:
+                rec[VAR] = -var if i > start and buf[start] == CHR_W else var
+            fld += 1
+            start = i + 1
+            if c == CHR_STAR:
+                break
+        i += 1
+    return fld
+
+
+"""
+parse_gga(buf, n, rec, want) -> bool
+        Parse the altitude (and time) of the GPGGA sentence in buf[:n] into rec, if in want.
+        Position data is taken from the GPRMC sentence.
+        Return: True if all 14 data fields were present
+"""
+def parse_gga(buf, n, rec, want=F_ALL):
+    try:
+        fld = _parse_gga(buf, n, rec, want & (F_TIME | F_ALT))
+    except OverflowError:
+        fld = 0
+    if fld >= 15:
+        rec[VALID] |= GGA_OK
+        return True
+    rec[VALID] &= ~GGA_OK
+    return False
+
+
+def _parse_gga(buf, n, rec, want):
+    fld = 1
+    start = i = DATA_START
+    while i < n:
+        c = buf[i]
+        if c == CHR_COMMA or c == CHR_STAR:
+            if want and fld < 10 and GGA_FIELDS[fld] & want:
+                if fld == 1:
+                    rec[TIME] = fixed(buf, start, i, 2)
+                else:  # 9
+                    rec[ALT] = fixed(buf, start, i, 1)
+            fld += 1
+            start = i + 1
+            if c == CHR_STAR:
+                break
+        i += 1
+    return fld
+
+
+"""
+parse_vtg(buf, n, rec, want) -> bool
+        Parse the track made good true (field 1) and the groundspeed in knots (field 5)
+        of the GPVTG sentence in buf[:n] into rec, if in want.
+        Return: True if the 8 data fields were present
+"""
+def parse_vtg(buf, n, rec, want=F_ALL):
+    want &= F_GS | F_CRS
+    fld = 1
+    start = i = DATA_START
+    try:
+        while i < n:
+            c = buf[i]
+            if c == CHR_COMMA or c == CHR_STAR:
+                if fld == 1 and want & F_CRS and i > start:
+                    rec[CRS] = fixed(buf, start, i, 1)
+                elif fld == 5 and want & F_GS and i > start:
+                    rec[GS] = fixed(buf, start, i, 1)
+                fld += 1
+                start = i + 1
+                if c == CHR_STAR:
+                    break
+            i += 1
+    except OverflowError:
+        return False
+    return fld >= 9
+
+
+"""
+parse_gll(buf, n, rec, want) -> bool
+        Parse the position (and time) of the GPGLL sentence in buf[:n] into rec, if in want.
+        The values are only written if the status (field 6) is 'A' (data valid).
+        Return: True if the 6 data fields were present
+"""
+def parse_gll(buf, n, rec, want=F_ALL):
+    want &= F_LAT | F_LON | F_TIME
+    fld = 1
+    start = i = DATA_START
+    lat = lon = t = 0
+    valid = False
+    try:
+        while i < n:
+            c = buf[i]
+            if c == CHR_COMMA or c == CHR_STAR:
+                if fld == 1 and want & F_LAT:
+                    lat = fixed(buf, start, i, 4)
+                elif fld == 2 and want & F_LAT:
+                    lat = -lat if i > start and buf[start] == CHR_S else lat
+                elif fld == 3 and want & F_LON:
+                    lon = fixed(buf, start, i, 4)
+                elif fld == 4 and want & F_LON:
+                    lon = -lon if i > start and buf[start] == CHR_W else lon
+                elif fld == 5 and want & F_TIME:
+                    t = fixed(buf, start, i, 2)
+                elif fld == 6:
+                    valid = i > start and buf[start] == CHR_A
+                fld += 1
+                start = i + 1
+                if c == CHR_STAR:
+                    break
+            i += 1
+    except OverflowError:
+        return False
+    if fld < 7:
+        return False
+    if valid:
+        if want & F_LAT:
+            rec[LAT] = lat
+        if want & F_LON:
+            rec[LON] = lon
+        if want & F_TIME:
+            rec[TIME] = t
+    return True
+
+
+# +--------------------------------------------------------------+
+# | Dispatch table                                               |
+# +--------------------------------------------------------------+
+HANDLERS = {}  # sentence key (see sentence_key()) -> handler(buf, n, rec, want) -> bool
+
+
+def sentence_key(sid):  # the key of a sentence id, e.g. b"RMC"
+    return (sid[0] << 16) | (sid[1] << 8) | sid[2]
+
+
+def register(sid, handler):  # add (or replace) the handler of the sentences with id sid (e.g. b"VTG")
+    HANDLERS[sentence_key(sid)] = handler
+
+
+KEY_RMC = const(0x524D43)  # sentence_key(b"RMC")
+KEY_GGA = const(0x474741)  # sentence_key(b"GGA")
+
+register(b"RMC", parse_rmc)
+register(b"GGA", parse_gga)
+register(b"VTG", parse_vtg)
+register(b"GLL", parse_gll)
+
+
+def line_key(buf, n):  # the key of the '$GP...' or '$GN...' sentence in buf[:n], 0 for another talker
+    if n < DATA_START or buf[0] != CHR_DOLLAR or buf[1] != CHR_G or (buf[2] != CHR_P and buf[2] != CHR_N):
+        return 0
+    return (buf[3] << 16) | (buf[4] << 8) | buf[5]
+
+
+"""
+dispatch(buf, n, rec, want) -> key
+        Parse the sentence in buf[:n] ('$GP...' or '$GN...') with the handler registered for its id
+        Return: the key of the sentence (e.g. KEY_RMC) if its handler accepted it, 0 if it was
+                incomplete, of another talker or without a handler
+"""
+def dispatch(buf, n, rec, want=F_ALL):
+    key = line_key(buf, n)
+    handler = HANDLERS.get(key)
+    if handler is None or not handler(buf, n, rec, want):
+        return 0
+    return key
+
+
+def alt_ft(rec):  # altitude in (rounded) feet
+    return m_to_ft(rec[ALT])
+
+
+def m_to_ft(alt):  # meters x 10 -> (rounded) feet
+    return (alt * FT_PER_M_E4 + 50000) // 100000
+
+
+def crs_mag(rec):  # track made good magnetic, degrees x 10, in the range 0...3599
+    t = rec[CRS] - rec[VAR]  # variation E: subtract, W: add
+    while t < 0:
+        t += 3600
+    while t >= 3600:
+        t -= 3600
+    return t
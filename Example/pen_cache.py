@@ -0,0 +1,55 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Bounded palette cache for PicoGraphics pens.
+
+    The render code asks for the same few colours over and over (the background, the ribbon
+    colours, the colours of the gradient background). pen(r, g, b) returns the pen created
+    before for that colour, keyed by the packed RGB value 0xRRGGBB, and only calls
+    gr.create_pen() for a colour it has not seen yet. The cache holds at most max_pens colours:
+    when it is full it is emptied (the pens stay valid: with the RGB888 pen type of the
+    Galactic Unicorn a pen is its colour value).
+    Counters (attributes):
+        hits:   pen() calls answered from the cache
+        misses: pen() calls that created a pen
+
+    Usage:
+        pens = PenCache(gr)
+        gr.set_pen(pens.pen(0, 100, 100))
+"""
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+MAX_PENS = const(64)
+
+
+class PenCache:
+
+    def __init__(self, gr, max_pens=MAX_PENS):
+        self._gr = gr
+        self._max_pens = max_pens
+        self._pens = {}
+        self.hits = 0
+        self.misses = 0
+
+    def pen(self, r, g, b):
+        key = ((int(r) & 0xFF) << 16) | ((int(g) & 0xFF) << 8) | (int(b) & 0xFF)
+        p = self._pens.get(key)
+        if p is not None:
+            self.hits += 1
+            return p
+        self.misses += 1
+        if len(self._pens) >= self._max_pens:
+            self._pens.clear()
+        p = self._pens[key] = self._gr.create_pen(r, g, b)
+        return p
+
+    def stats(self):  # (hits, misses)
+        return self.hits, self.misses
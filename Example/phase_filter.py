@@ -0,0 +1,111 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Phase (parked, taxying, flying) of the airplane from its groundspeed, filtered.
+
+    The groundspeed of every fix (knots x 10, see nmea_parse.py) is given to update():
+        - it is smoothed with an exponential moving average whose weight follows from the time
+          since the previous fix: dt / (dt + smooth_ms), so it smooths the same at 1 and at 10 Hz
+        - the smoothed speed is classified with hysteresis bands: parked -> taxying above stop_up,
+          back below stop_dn; taxying -> flying above fly_up, back below fly_dn
+        - a new phase is only taken when the current one has lasted dwell_ms
+    Noise around a threshold therefore does not flip the phase (and redraw the display) on every fix.
+    After a gap of PHASE_RESET_MS without fixes (e.g. a new flight) the filter starts over from
+    the speed of the next fix, as it does after reset().
+    Integer arithmetic only: the smoothed speed is kept in knots x 10 x 2**SMOOTH_BITS.
+    Counters (attributes):
+        changes:  phase changes
+        held:     fixes at which the phase would have changed, but the current one had not lasted dwell_ms
+
+    Usage:
+        phase = PhaseFilter()
+        phase.update(rec[GS], t_ms)  # every fix
+        if phase.phase == PH_FLYING:
+            ...
+"""
+import time
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+PH_NONE = const(0)      # no fix yet. The values are those of ac_no_data ... ac_flying of the main script
+PH_STOPPED = const(1)
+PH_TAXYING = const(2)
+PH_FLYING = const(3)
+
+PHASE_SMOOTH_MS = const(2000)  # time constant of the moving average
+PHASE_DWELL_MS = const(3000)   # a phase lasts at least this long
+PHASE_RESET_MS = const(10000)  # a gap without fixes this long restarts the filter
+STOP_UP = const(10)            # knots x 10. Parked -> taxying above 1.0 kt
+STOP_DN = const(5)             # taxying -> parked below 0.5 kt (while parked the gs can be 0.1)
+FLY_UP = const(320)            # taxying -> flying above 32 kts
+FLY_DN = const(280)            # flying -> taxying below 28 kts
+SMOOTH_BITS = const(4)         # fraction bits of the smoothed speed
+
+
+class PhaseFilter:
+
+    def __init__(self, smooth_ms=PHASE_SMOOTH_MS, dwell_ms=PHASE_DWELL_MS,
+                 stop_up=STOP_UP, stop_dn=STOP_DN, fly_up=FLY_UP, fly_dn=FLY_DN):
+        self.smooth_ms = smooth_ms
+        self.dwell_ms = dwell_ms
+        self.stop_up = stop_up
+        self.stop_dn = stop_dn
+        self.fly_up = fly_up
+        self.fly_dn = fly_dn
+        self.phase = PH_NONE
+        self.changes = 0
+        self.held = 0
+        self._s = 0       # smoothed speed, knots x 10 << SMOOTH_BITS
+        self._t = 0       # ticks_ms of the last fix
+        self._t_phase = 0 # ticks_ms of the last phase change
+
+    def speed(self):  # the smoothed groundspeed, knots x 10
+        return self._s >> SMOOTH_BITS
+
+    def _target(self, s):  # the phase of smoothed speed s (knots x 10) from the current phase
+        p = self.phase
+        if s > self.fly_up or (p == PH_FLYING and s >= self.fly_dn):
+            return PH_FLYING
+        if s > self.stop_up or (p != PH_STOPPED and s >= self.stop_dn):
+            return PH_TAXYING
+        return PH_STOPPED
+
+    """
+    update(gs, t_ms) -> phase
+            Add the groundspeed gs (knots x 10) of a fix that arrived at t_ms
+            Return: the (filtered) phase: PH_STOPPED, PH_TAXYING or PH_FLYING
+    """
+    def update(self, gs, t_ms):
+        if gs < 0:
+            gs = 0
+        dt = time.ticks_diff(t_ms, self._t)
+        self._t = t_ms
+        if self.phase == PH_NONE or dt >= PHASE_RESET_MS or dt < 0:  # start over from this fix
+            self._s = gs << SMOOTH_BITS
+            self.phase = PH_STOPPED  # no history: classify from parked, without the lower bands
+            self.phase = self._target(gs)
+            self._t_phase = t_ms
+            return self.phase
+        self._s += ((gs << SMOOTH_BITS) - self._s) * dt // (dt + self.smooth_ms)
+        p = self._target(self._s >> SMOOTH_BITS)
+        if p != self.phase:
+            if time.ticks_diff(t_ms, self._t_phase) < self.dwell_ms:
+                self.held += 1
+            else:
+                self.phase = p
+                self._t_phase = t_ms
+                self.changes += 1
+        return self.phase
+
+    def reset(self):  # forget the fixes: the next update() starts over. nodata() of the main script calls it
+        self.phase = PH_NONE
+
+    def stats(self):  # (changes, held)
+        return self.changes, self.held
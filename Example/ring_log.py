@@ -0,0 +1,141 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Leveled logger with an in-RAM ring buffer.
+
+    A message is stored as its format string and arguments: it is only formatted when it is
+    echoed to the console (level >= echo) or when the ring buffer is dumped. The ring buffer
+    keeps the last size messages, older ones are overwritten.
+    Arguments are stored by reference: pass immutable values (ints, strings, bytes copies),
+    not a buffer that is reused.
+    While two cores log, set lock to a _thread lock: a message is then stored (and dump() copies
+    the ring) under it. Formatting and printing happen outside the lock.
+
+    To remove the calls below a level at compile time, guard them with const() levels of the
+    calling module (MicroPython drops an 'if' block with a constant false condition):
+        LOG_LEVEL = const(LOG_INFO)
+        if LOG_LEVEL <= LOG_DEBUG:
+            log.debug(TAG, "sentence: {}", bytes(line[:n]))
+
+    Usage:
+        log = RingLog()
+        log.info("add_data(): ", "fix {} alt {}", seq, alt)
+        log.dump()  # print the buffered messages, oldest first
+"""
+from array import array
+import time
+try:
+    from micropython import const
+except ImportError:  # CPython (host side benchmarks)
+    def const(x):
+        return x
+
+LOG_DEBUG = const(0)
+LOG_INFO = const(1)
+LOG_WARN = const(2)
+LOG_ERROR = const(3)
+LOG_OFF = const(4)
+
+LOG_SIZE = const(64)  # nr of messages kept
+
+LEVEL_NAMES = ("D", "I", "W", "E")
+
+
+def _line(t, level, tag, fmt, args):  # a message as printed: ticks_ms, level, tag and the formatted text
+    msg = fmt.format(*args) if args else fmt
+    return "{:>10d} {:s} {:s}{:s}".format(t, LEVEL_NAMES[level], tag, msg)
+
+
+class RingLog:
+
+    def __init__(self, size=LOG_SIZE, level=LOG_DEBUG, echo=LOG_WARN):
+        self.level = level  # messages below this level are ignored
+        self.echo = echo    # messages of this level and higher are printed at once too
+        self._size = size
+        self._lvl = bytearray(size)
+        self._t = array('i', [0] * size)
+        self._tag = [None] * size
+        self._fmt = [None] * size
+        self._args = [None] * size
+        self._head = 0     # index of the next message
+        self.logged = 0    # nr of messages stored since the start (or clear())
+        self.lock = None   # a _thread lock while another core logs too
+
+    """
+    log(level, tag, fmt, *args) -> void
+            Store fmt and args in the ring buffer (and print fmt.format(*args) if level >= echo)
+    """
+    def log(self, level, tag, fmt, *args):
+        if level < self.level:
+            return
+        t = time.ticks_ms()
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            i = self._head
+            self._lvl[i] = level
+            self._t[i] = t
+            self._tag[i] = tag
+            self._fmt[i] = fmt
+            self._args[i] = args
+            self._head = i + 1 if i + 1 < self._size else 0
+            self.logged += 1
+        finally:
+            if lock:
+                lock.release()
+        if level >= self.echo:
+            print(_line(t, level, tag, fmt, args))
+
+    def debug(self, tag, fmt, *args):
+        self.log(LOG_DEBUG, tag, fmt, *args)
+
+    def info(self, tag, fmt, *args):
+        self.log(LOG_INFO, tag, fmt, *args)
+
+    def warn(self, tag, fmt, *args):
+        self.log(LOG_WARN, tag, fmt, *args)
+
+    def error(self, tag, fmt, *args):
+        self.log(LOG_ERROR, tag, fmt, *args)
+
+    def dump(self):  # print the buffered messages, oldest first
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:  # copy the slots: they are formatted and printed without the lock
+            logged = self.logged
+            n = logged if logged < self._size else self._size
+            i = self._head - n
+            if i < 0:
+                i += self._size
+            msgs = []
+            for _ in range(n):
+                msgs.append((self._t[i], self._lvl[i], self._tag[i], self._fmt[i], self._args[i]))
+                i = i + 1 if i + 1 < self._size else 0
+        finally:
+            if lock:
+                lock.release()
+        print("RingLog: last {} of {} messages".format(n, logged))
+        for m in msgs:
+            print(_line(*m))
+
+    def clear(self):
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            for i in range(self._size):
+                self._fmt[i] = self._args[i] = self._tag[i] = None
+            self._head = 0
+            self.logged = 0
+        finally:
+            if lock:
+                lock.release()
+
+    def stats(self):  # (messages stored, messages overwritten)
+        return self.logged, self.logged - self._size if self.logged > self._size else 0
@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH MICROPYTHON
+
+    Per-stage timing counters of the receive-and-render pipeline.
+
+    Every stage (e.g. parse, render) has a call count, a total and the minimum and maximum
+    duration in microseconds, kept in preallocated arrays: timing a stage allocates nothing.
+    The totals are a list of ints, so a stage that adds up wall time (e.g. the wait for a fix)
+    does not overflow: only a total above 2**30 us (18 minutes) becomes a long int.
+    While two cores time stages, set lock to a _thread lock: add(), get() and reset() then run
+    under it.
+        t = stats.start()
+        ...                       # the stage
+        stats.stop(STG_PARSE, t)  # STG_PARSE: the index of the stage in names
+
+    Usage:
+        stats = StageStats(("rx wait", "frame", "parse"))
+        stats.dump()    # print a table (min, avg, max in us)
+        stats.text()    # the same as one line, for the scroller
+        stats.reset()
+"""
+from array import array
+import time
+
+US_MAX = 0x3FFFFFFF  # the initial minimum (fits a small int)
+
+
+class StageStats:
+
+    def __init__(self, names):
+        n = len(names)
+        self.names = names
+        self._count = array('i', [0] * n)
+        self._total = [0] * n  # us. Python ints: the wait stages add up hours of wall time
+        self._min = array('i', [US_MAX] * n)
+        self._max = array('i', [0] * n)
+        self.lock = None  # a _thread lock while another core times stages too
+
+    def start(self):
+        return time.ticks_us()
+
+    def stop(self, stage, t_start):  # add the time since t_start (a start() value) to stage
+        self.add(stage, time.ticks_diff(time.ticks_us(), t_start))
+
+    def add(self, stage, us):
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            self._count[stage] += 1
+            self._total[stage] += us
+            if us < self._min[stage]:
+                self._min[stage] = us
+            if us > self._max[stage]:
+                self._max[stage] = us
+        finally:
+            if lock:
+                lock.release()
+
+    def get(self, stage):  # (count, min, avg, max), times in us
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            n = self._count[stage]
+            r = (n, self._min[stage], self._total[stage] // n, self._max[stage]) if n else (0, 0, 0, 0)
+        finally:
+            if lock:
+                lock.release()
+        return r
+
+    def reset(self):
+        lock = self.lock
+        if lock:
+            lock.acquire()
+        try:
+            for i in range(len(self.names)):
+                self._count[i] = self._total[i] = self._max[i] = 0
+                self._min[i] = US_MAX
+        finally:
+            if lock:
+                lock.release()
+
+    def dump(self):  # print a table of all stages
+        print("{:<10} {:>7} {:>9} {:>9} {:>9}".format("stage", "calls", "min us", "avg us", "max us"))
+        for i in range(len(self.names)):
+            print("{:<10} {:>7} {:>9} {:>9} {:>9}".format(self.names[i], *self.get(i)))
+
+    def text(self):  # all stages as one line: 'name min/avg/max' in ms with 1 decimal
+        parts = []
+        for i in range(len(self.names)):
+            n, lo, avg, hi = self.get(i)
+            parts.append("{} {}.{}/{}.{}/{}.{}".format(self.names[i].upper(),
+                lo // 1000, lo % 1000 // 100, avg // 1000, avg % 1000 // 100, hi // 1000, hi % 1000 // 100))
+        return "  ".join(parts) + " MS"
@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Acceptance benchmark of the 10 Hz mode (high_rate) of the main script on the simulated
+    Galactic Unicorn (host_sim).
+
+    A flight of 10 GPRMC + GPGGA pairs per second (host_sim/nmea_gen.py) is sent at 38400 baud
+    and run through the real pipeline with high_rate = True (uasyncio tasks, see set_high_rate()).
+    It passes when:
+        - every fix that arrived after the receiver started reached add_fix(): none was lost in
+          the uart, the framer, the pairing (rmc only, dropped) or coalesced in the mailbox
+        - the fix latency (the last byte of its GPGGA on the line to add_fix()) of every fix is
+          at most FIX_BUDGET_MS
+        - the uart-to-pixel latency (as in bench_pipeline.py) p99 is at most PIXEL_BUDGET_MS
+    The latencies are measured with the simulator clock. The exit status is 1 if it fails.
+
+    Usage:
+        python3 bench/accept_10hz.py                  # 180 s flight
+        python3 bench/accept_10hz.py --seconds 420    # the whole flight (cruise included)
+        python3 bench/accept_10hz.py --core1          # with use_core1 (receiver in a thread)
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+import host_sim
+from host_sim import clock, machine, nmea_gen
+from bench_pipeline import INTRO_SECS, gga_end_times, percentile
+sys.path.insert(0, host_sim.EXAMPLE_DIR)
+from nmea_framer import BYTE_BITS, NBYTES_MASK
+
+RATE_HZ = 10
+BAUD = 38400
+FIX_BUDGET_MS = 50     # half an epoch
+PIXEL_BUDGET_MS = 100  # an epoch
+SETTLE_SECS = 0.2      # epochs this close to the start of the receiver or the end of the run are not counted
+
+
+def run(seconds, core1=False):
+    capture = nmea_gen.flight(seconds, RATE_HZ)
+    host_sim.install(capture=capture, fast=True, line_baud=BAUD)
+    clock.set_deadline(None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = host_sim.load_script(high_rate=True, use_core1=core1)
+    ends = gga_end_times(capture)
+    fix_ms = {}        # time field of a fix -> its fix latency
+    latencies = []     # uart-to-pixel
+    pending = []
+    started = []       # the time the receiver started (framer.discard() in run_tasks()), framer byte and sentence counts
+
+    def arrival(end):
+        return app.uart._t_open + machine.arrival_time(end, BAUD)
+
+    discard = app.framer.discard
+
+    def discard_hook():
+        discard()
+        started.append((clock.seconds(), app.framer.nbytes, app.framer.accepted))
+    app.framer.discard = discard_hook
+
+    add_fix = app.add_fix
+
+    def add_fix_hook(rec, fields, t_ms):
+        if not add_fix(rec, fields, t_ms):  # a void fix
+            return False
+        end = ends.get(rec[app.TIME])
+        if end is not None:
+            fix_ms[rec[app.TIME]] = (clock.seconds() - arrival(end)) * 1000
+            pending[:] = [arrival(end)]
+        return True
+    app.add_fix = add_fix_hook
+
+    def on_update(gu):
+        if pending:
+            latencies.append((clock.seconds() - pending.pop()) * 1000)
+    app.gu.on_update = on_update
+    changed = app.shown.changed
+
+    def changed_hook(scr, value):
+        result = changed(scr, value)
+        if not result:
+            on_update(None)
+        return result
+    app.shown.changed = changed_hook
+
+    deadline = machine.source_duration(BAUD) + INTRO_SECS
+    clock.set_deadline(deadline)
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            app.main(False)
+        except (SystemExit, KeyboardInterrupt):
+            pass
+    end_secs = clock.seconds()
+    clock.set_deadline(None)
+    t0, nbytes0, accepted0 = started[0] if started else (end_secs, app.framer.nbytes, app.framer.accepted)
+    t_start = t0 + SETTLE_SECS
+    t_stream = min(end_secs, app.uart._t_open + machine.source_duration(BAUD))  # the last byte on the line
+    run_secs = max(t_stream - t0, 1e-3)  # the meter's windows end with the stream: its average instead
+    bytes_s = ((app.framer.nbytes - nbytes0) & NBYTES_MASK) / run_secs
+    expected = [t for t, end in ends.items() if t_start <= arrival(end) <= end_secs - SETTLE_SECS]
+    missed = [t for t in expected if t not in fix_ms]
+    lat = [fix_ms[t] for t in expected if t in fix_ms]
+    return {
+        "baud": app.baud,
+        "expected": len(expected),
+        "missed": missed,
+        "fix_p50_ms": percentile(lat, 50),
+        "fix_max_ms": max(lat) if lat else 0.0,
+        "pixel_p50_ms": percentile(latencies, 50),
+        "pixel_p99_ms": percentile(latencies, 99),
+        "pair": app.pair.stats(),
+        "mailbox": app.mailbox.stats(),
+        "framer": app.framer.stats(),
+        "overruns": app.framer.overruns,
+        "link": (int(bytes_s), int((app.framer.accepted - accepted0) * 10 / run_secs),
+                 int(bytes_s * BYTE_BITS * 100 / app.baud)),
+        "updates": app.gu.updates,
+    }
+
+
+def check(name, r):
+    print("\n{}".format(name))
+    print("  {} baud, fixes expected: {}  missed: {}  display updates: {}".format(
+        r["baud"], r["expected"], len(r["missed"]), r["updates"]))
+    print("  fix latency: p50 {:.1f} ms  max {:.1f} ms (budget {} ms)".format(
+        r["fix_p50_ms"], r["fix_max_ms"], FIX_BUDGET_MS))
+    print("  uart-to-pixel latency: p50 {:.1f} ms  p99 {:.1f} ms (budget {} ms)".format(
+        r["pixel_p50_ms"], r["pixel_p99_ms"], PIXEL_BUDGET_MS))
+    print("  pairs: {}  rmc only: {}  gga of another epoch: {}  rmc dropped: {}".format(*r["pair"]))
+    print("  mailbox: fixes {}  coalesced {}   framer: accepted {}  rejected {}  truncated {}  overruns {}".format(
+        *(r["mailbox"] + r["framer"] + (r["overruns"],))))
+    print("  link (average while the receiver ran): {} bytes/s  {} sentences/s x 10  load {} %".format(*r["link"]))
+    failed = []
+    if r["baud"] != BAUD:
+        failed.append("uart at {} baud".format(r["baud"]))
+    if r["expected"] == 0:
+        failed.append("no fixes expected: the receiver did not start")
+    if r["missed"]:
+        failed.append("{} fixes dropped, e.g. {}".format(len(r["missed"]), r["missed"][:5]))
+    if r["fix_max_ms"] > FIX_BUDGET_MS:
+        failed.append("fix latency {:.1f} ms > {} ms".format(r["fix_max_ms"], FIX_BUDGET_MS))
+    if r["pixel_p99_ms"] > PIXEL_BUDGET_MS:
+        failed.append("uart-to-pixel latency p99 {:.1f} ms > {} ms".format(r["pixel_p99_ms"], PIXEL_BUDGET_MS))
+    return ["{}: {}".format(name, f) for f in failed]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Acceptance benchmark of the 10 Hz mode (high_rate)")
+    ap.add_argument("--seconds", type=int, default=180, help="length of the simulated flight")
+    ap.add_argument("--core1", action="store_true", help="also run with use_core1: the receiver in a second thread")
+    args = ap.parse_args()
+
+    failed = check("10 Hz, {} s".format(args.seconds), run(args.seconds))
+    if args.core1:
+        failed += check("10 Hz, {} s, core1".format(args.seconds), run(args.seconds, core1=True))
+    if failed:
+        print("\nFAILED:")
+        for line in failed:
+            print("  " + line)
+        return 1
+    print("\naccepted: no fix dropped, latencies within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Benchmark of the NMEA framer (Example/nmea_framer.py) against the former
+    uart.readline() based reception of ck_uart().
+
+    Both paths read the same stream of GPRMC + GPGGA sentences from an in-memory "uart".
+    Allocations are measured with tracemalloc: before each step the traced peak is reset,
+    so any allocation made during the step raises the peak above the starting level.
+    The reported value is the sum of these peak increases (less the cost of the measurement
+    itself, see probe_overhead()), divided by the number of sentences.
+
+    Before the benchmark, check_framer() feeds the framer sentences with good and bad '*hh' tails
+    and checks that each one is accepted, rejected or truncated as it should be (exit status 1 if not).
+
+    Usage:
+        python3 bench/bench_framer.py [nr_of_sentence_pairs]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Example"))
+
+from nmea_framer import NMEAFramer
+
+
+def nmea_sentence(body):
+    cs = 0
+    for c in body.encode():
+        cs ^= c
+    return "${}*{:02X}\r\n".format(body, cs).encode()
+
+
+def make_stream(pairs):
+    buf = bytearray()
+    for i in range(pairs):
+        hh, mm, ss = (i // 3600) % 24, (i // 60) % 60, i % 60
+        buf += nmea_sentence("GPRMC,{:02d}{:02d}{:02d}.00,A,5031.8614,N,00005.2524,E,83.0,315.1,201122,0.5,E".format(hh, mm, ss))
+        buf += nmea_sentence("GPGGA,{:02d}{:02d}{:02d}.00,5031.8614,N,00005.2524,E,1,05,0.0,914.4,M,0.0,M,0.0,0000".format(hh, mm, ss))
+    return bytes(buf)
+
+
+def probe_overhead():
+    """ Peak increase caused by the tracemalloc calls themselves, for an empty step """
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    return tracemalloc.get_traced_memory()[1] - start
+
+
+def bench_readline(stream):
+    """ The way ck_uart() used to read: new buffer, readline(), decode() and find() per line """
+    uart = io.BytesIO(stream)
+    overhead = probe_overhead()
+    sentences = 0
+    alloc = 0
+    t0 = time.perf_counter()
+    while True:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        rx_buffer = bytearray(256 * b'\x00')
+        rx_buffer = uart.readline()
+        if not rx_buffer:
+            break
+        rx_buffer_s = rx_buffer.decode('utf-8')
+        if rx_buffer_s.find("$GPRMC") >= 0 or rx_buffer_s.find("$GPGGA") >= 0:
+            sentences += 1
+        alloc += tracemalloc.get_traced_memory()[1] - start - overhead
+        del rx_buffer, rx_buffer_s
+    return sentences, alloc, time.perf_counter() - t0
+
+
+def bench_framer(stream):
+    uart = io.BytesIO(stream)
+    framer = NMEAFramer(uart)
+    overhead = probe_overhead()
+    sentences = 0
+    alloc = 0
+    t0 = time.perf_counter()
+    while True:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        nr_bytes = framer.fill()
+        n = framer.next_sentence()
+        found = 0
+        while n:
+            found += 1
+            n = framer.next_sentence()
+        alloc += tracemalloc.get_traced_memory()[1] - start - overhead
+        sentences += found
+        if nr_bytes == 0 and framer.pending() == 0:
+            break
+    return sentences, alloc, time.perf_counter() - t0
+
+
+# (stream, expected (accepted, rejected, truncated))
+FRAMER_CASES = (
+    (nmea_sentence("GPTXT,48"), (1, 0, 0)),
+    (b'$GPTXT,48*6F\r\n', (1, 0, 0)),
+    (b'$GPTXT,48*6f\r\n', (1, 0, 0)),
+    (b'$GPTXT,48*6E\r\n', (0, 1, 0)),   # checksum mismatch
+    (b'$GPTXT,48*7Z\r\n', (0, 1, 0)),   # not a hex digit: (7 << 4) - 1 == 0x6F must not match
+    (b'$GPTXT,48*Z\x7f\r\n', (0, 1, 0)),
+    (b'$GPTXT,48*6\r\n', (0, 1, 0)),    # '\r' as the second digit
+    (b'$GPTXT,48*\r\n', (0, 0, 1)),     # no '*hh' tail
+    (b'$GPTXT,48\r\n', (0, 0, 1)),
+    (b'$GPTXT,4$GPTXT,48*6F\r\n', (1, 0, 1)),
+)
+
+
+def check_framer():
+    """ Run FRAMER_CASES through NMEAFramer. Return the failed cases """
+    failed = []
+    for stream, expected in FRAMER_CASES:
+        framer = NMEAFramer(io.BytesIO(stream))
+        framer.fill()
+        while framer.next_sentence():
+            pass
+        if framer.stats() != expected:
+            failed.append("{}: {} (accepted, rejected, truncated), expected {}".format(stream, framer.stats(), expected))
+    return failed
+
+
+def main():
+    failed = check_framer()
+    if failed:
+        print("framer check FAILED:")
+        for line in failed:
+            print("  " + line)
+        return 1
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    stream = make_stream(pairs)
+    tracemalloc.start()
+    for name, func in (("readline", bench_readline), ("framer", bench_framer)):
+        sentences, alloc, secs = func(stream)
+        print("{:<9s} sentences: {:6d}  allocated: {:6.1f} bytes/sentence  time: {:6.1f} us/sentence".format(
+            name, sentences, alloc / sentences, secs * 1e6 / sentences))
+    tracemalloc.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,326 @@
+#!/usr/bin/python3
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    End-to-end benchmark of the main script on the simulated Galactic Unicorn (host_sim).
+
+    The NMEA captures (default: all host_sim/captures/*.nmea) are fed to the simulated UART,
+    one epoch per second of their time fields, at 4800 baud, and run through the real pipeline:
+        rx_sentence() -> add_fix() -> ac_status() -> screen_step() (disp_*()) -> gu.update()
+    Reported per capture:
+        - parse throughput: sentences/s of NMEAFramer + nmea_parse.dispatch() (all fields) alone
+        - per stage: number of calls, mean and p99 CPU time (us), mean bytes allocated (tracemalloc)
+        - fixes decoded, sentences accepted/rejected, uart bytes lost, display updates,
+          frames drawn and skipped because the display showed the same value already,
+          pen cache hits and misses
+        - uart-to-pixel latency p50/p99 (ms): from the arrival of the last byte of a GPGGA sentence
+          on the line to the first gu.update() after add_fix() took that fix, or to the frame
+          skipped because the display showed that value already (simulator clock, so the
+          blocking sleep() calls of the script are included)
+
+    The results are compared with bench/baseline.json. A metric that is worse than its
+    baseline by more than its tolerance is a regression: the exit status is then 1.
+    There is one baseline. It is not re-stored with a change that moved the numbers: a regression
+    is fixed in the code, and an improvement passes against the old baseline. It is only stored
+    again, in a commit of its own whose message says why, for a new host (CPU times depend on
+    it), a new capture or stage, or a trade-off that is meant. --save-baseline refuses to store
+    results that regress against the current baseline unless --force is given.
+
+    Usage:
+        python3 bench/bench_pipeline.py                    # run and compare with the baseline
+        python3 bench/bench_pipeline.py --save-baseline    # run and store the results as baseline (no regressions)
+        python3 bench/bench_pipeline.py --save-baseline --force  # store them anyway (a new host)
+        python3 bench/bench_pipeline.py my_capture.nmea    # other capture(s)
+        python3 bench/bench_pipeline.py --core1            # also with use_core1 (receiver in a thread)
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import host_sim
+from host_sim import clock
+
+BASELINE = os.path.join(HERE, "baseline.json")
+BAUD = 4800
+INTRO_SECS = 30  # intro(), sync_time() and the first scroll_text() calls
+
+STAGES = ("ck_uart", "rx_sentence", "add_fix", "ac_status", "screen_step")
+
+# metric: (direction, relative tolerance, absolute tolerance). 'max': higher is worse
+TOLERANCES = {
+    "parse_sentences_per_s": ("min", 0.30, 0),
+    "fixes": ("min", 0.10, 1),
+    "bytes_lost": ("max", 0.10, 200),
+    "latency_p50_ms": ("max", 0.20, 20),
+    "latency_p99_ms": ("max", 0.20, 50),
+    "stage_mean_us": ("max", 0.50, 20),
+    "stage_p99_us": ("max", 1.00, 100),
+    "stage_alloc_bytes": ("max", 0.10, 64),
+}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    v = sorted(values)
+    return v[min(len(v) - 1, int(round(p / 100 * (len(v) - 1))))]
+
+
+def gga_end_times(capture):
+    """ UTC time field (hhmmss.ss x 100) of every GPGGA -> offset just past its '\\n' """
+    ends = {}
+    pos = capture.find(b"$GPGGA")
+    while pos >= 0:
+        end = capture.find(b"\n", pos)
+        if end < 0:
+            break
+        comma = capture.find(b",", pos + 7)
+        field = capture[pos + 7:comma]
+        try:
+            ends.setdefault(int(round(float(field) * 100)), end + 1)
+        except ValueError:
+            pass
+        pos = capture.find(b"$GPGGA", end)
+    return ends
+
+
+def parse_throughput(capture):
+    sys.path.insert(0, host_sim.EXAMPLE_DIR)
+    from nmea_framer import NMEAFramer
+    from nmea_parse import new_record, dispatch
+    framer = NMEAFramer(io.BytesIO(capture))
+    rec = new_record()
+    line = framer.line
+    sentences = 0
+    t0 = time.perf_counter()
+    while True:
+        nr = framer.fill()
+        n = framer.next_sentence()
+        while n:
+            dispatch(line, n, rec)
+            sentences += 1
+            n = framer.next_sentence()
+        if nr == 0:
+            break
+    return sentences / (time.perf_counter() - t0)
+
+
+def run_pipeline(capture, trace_alloc, core1=False):
+    """ Run the main script on capture. Return a dict with the stage records and totals """
+    host_sim.install(capture=capture, fast=True)
+    clock.set_deadline(None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = host_sim.load_script(use_core1=core1)
+    ends = gga_end_times(capture)
+    times = {s: [] for s in STAGES}
+    allocs = {s: [] for s in STAGES}
+    latencies = []
+    pending = []  # arrival time (s) of the fix waiting to be shown
+
+    def wrap(name, func):
+        def timed(*args, **kwargs):
+            if trace_alloc:
+                tracemalloc.reset_peak()
+                start = tracemalloc.get_traced_memory()[0]
+            t = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[name].append((time.perf_counter() - t) * 1e6)
+                if trace_alloc:
+                    allocs[name].append(tracemalloc.get_traced_memory()[1] - start)
+        return timed
+
+    for name in STAGES:
+        setattr(app, name, wrap(name, getattr(app, name)))
+
+    add_fix = app.add_fix
+    fixes = []
+
+    def add_fix_hook(rec, fields, t_ms):
+        if not add_fix(rec, fields, t_ms):  # a void fix
+            return False
+        fixes.append(rec[app.TIME])
+        end = ends.get(rec[app.TIME])
+        if end is not None:
+            pending[:] = [app.uart._t_open + host_sim.machine.arrival_time(end, BAUD)]
+        return True
+    app.add_fix = add_fix_hook
+
+    def on_update(gu):
+        if pending:
+            latencies.append((clock.seconds() - pending.pop()) * 1000)
+    app.gu.on_update = on_update
+
+    if hasattr(app, "shown"):  # a skipped frame: the display shows the fix already
+        changed = app.shown.changed
+
+        def changed_hook(scr, value):
+            result = changed(scr, value)
+            if not result:
+                on_update(None)
+            return result
+        app.shown.changed = changed_hook
+
+    clock.set_deadline(host_sim.machine.source_duration(BAUD) + INTRO_SECS)
+    if trace_alloc:
+        tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            app.main(False)
+        except (SystemExit, KeyboardInterrupt):
+            pass
+    if trace_alloc:
+        tracemalloc.stop()
+    clock.set_deadline(None)
+    accepted, rejected, truncated = app.framer.stats()
+    return {
+        "times": times,
+        "allocs": allocs,
+        "latencies": latencies,
+        "fixes": len(fixes),
+        "accepted": accepted,
+        "rejected": rejected,
+        "bytes_lost": app.uart.bytes_lost,
+        "updates": app.gu.updates,
+        "frames": app.shown.stats() if hasattr(app, "shown") else (0, 0),
+        "pens": app.pens.stats() if hasattr(app, "pens") else (0, 0),
+    }
+
+
+def bench_capture(path, core1=False):
+    with open(path, "rb") as f:
+        capture = f.read()
+    timed = run_pipeline(capture, trace_alloc=False, core1=core1)
+    traced = run_pipeline(capture, trace_alloc=True, core1=core1)
+    stages = {}
+    for s in STAGES:
+        t = timed["times"][s]
+        a = traced["allocs"][s]
+        if not t:
+            continue
+        stages[s] = {
+            "calls": len(t),
+            "stage_mean_us": round(sum(t) / len(t), 1),
+            "stage_p99_us": round(percentile(t, 99), 1),
+            "stage_alloc_bytes": round(sum(a) / len(a), 1) if a else 0.0,
+        }
+    lat = timed["latencies"]
+    return {
+        "parse_sentences_per_s": round(max(parse_throughput(capture) for _ in range(3))),
+        "fixes": timed["fixes"],
+        "sentences_accepted": timed["accepted"],
+        "sentences_rejected": timed["rejected"],
+        "bytes_lost": timed["bytes_lost"],
+        "updates": timed["updates"],
+        "frames_drawn": timed["frames"][0],
+        "frames_skipped": timed["frames"][1],
+        "pen_hits": timed["pens"][0],
+        "pen_misses": timed["pens"][1],
+        "latency_p50_ms": round(percentile(lat, 50), 1),
+        "latency_p99_ms": round(percentile(lat, 99), 1),
+        "stages": stages,
+    }
+
+
+def report(name, r):
+    print("\n{}".format(name))
+    print("  parse throughput:  {:>10} sentences/s".format(r["parse_sentences_per_s"]))
+    print("  fixes: {}  sentences accepted: {}  rejected: {}  uart bytes lost: {}  display updates: {}".format(
+        r["fixes"], r["sentences_accepted"], r["sentences_rejected"], r["bytes_lost"], r["updates"]))
+    print("  frames drawn: {}  skipped (unchanged): {}  pen cache hits: {}  misses: {}".format(
+        r.get("frames_drawn", 0), r.get("frames_skipped", 0), r.get("pen_hits", 0), r.get("pen_misses", 0)))
+    print("  uart-to-pixel latency: p50 {:.1f} ms  p99 {:.1f} ms".format(r["latency_p50_ms"], r["latency_p99_ms"]))
+    print("  {:<10} {:>6} {:>12} {:>12} {:>14}".format("stage", "calls", "mean us", "p99 us", "alloc bytes"))
+    for s, v in r["stages"].items():
+        print("  {:<10} {:>6} {:>12.1f} {:>12.1f} {:>14.1f}".format(
+            s, v["calls"], v["stage_mean_us"], v["stage_p99_us"], v["stage_alloc_bytes"]))
+
+
+def regressions(name, r, base):
+    found = []
+
+    def check(label, metric, value, ref):
+        direction, rel, ab = TOLERANCES[metric]
+        if direction == "max" and value > ref * (1 + rel) + ab:
+            found.append("{} {}: {} > baseline {}".format(name, label, value, ref))
+        if direction == "min" and value < ref * (1 - rel) - ab:
+            found.append("{} {}: {} < baseline {}".format(name, label, value, ref))
+
+    for metric in TOLERANCES:
+        if metric in r and metric in base:
+            check(metric, metric, r[metric], base[metric])
+    for s, v in r["stages"].items():
+        ref = base.get("stages", {}).get(s)
+        if ref:
+            for metric in ("stage_mean_us", "stage_p99_us", "stage_alloc_bytes"):
+                check(s + " " + metric, metric, v[metric], ref[metric])
+    return found
+
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end benchmark of the GPS decode-and-render pipeline")
+    ap.add_argument("captures", nargs="*", help="NMEA capture files. Default: host_sim/captures/*.nmea")
+    ap.add_argument("--save-baseline", action="store_true", help="store the results in bench/baseline.json")
+    ap.add_argument("--baseline", default=BASELINE, help="baseline file")
+    ap.add_argument("--force", action="store_true", help="with --save-baseline: store results that regress too")
+    ap.add_argument("--core1", action="store_true",
+                    help="also run with use_core1: the receiver in a second thread (results: '<capture> core1')")
+    args = ap.parse_args()
+
+    captures = args.captures or sorted(
+        os.path.join(host_sim.CAPTURE_DIR, f) for f in os.listdir(host_sim.CAPTURE_DIR) if f.endswith(".nmea"))
+    results = {}
+    for path in captures:
+        name = os.path.basename(path)
+        results[name] = bench_capture(path)
+        report(name, results[name])
+        if args.core1:
+            results[name + " core1"] = bench_capture(path, core1=True)
+            report(name + " core1", results[name + " core1"])
+
+    if not os.path.exists(args.baseline):
+        baseline = None
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    found = []
+    for name, r in results.items():
+        if baseline and name in baseline:
+            found += regressions(name, r, baseline[name])
+    if found:
+        print("\nREGRESSIONS:")
+        for line in found:
+            print("  " + line)
+    if args.save_baseline:
+        if found and not args.force:
+            print("\nbaseline not stored: fix the regressions, or give --force (e.g. a new host)")
+            return 1
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("\nbaseline stored in {}. Commit it on its own, with the reason".format(args.baseline))
+        return 0
+    if baseline is None:
+        print("\nno baseline ({}). Store one with --save-baseline".format(args.baseline))
+        return 0
+    if found:
+        return 1
+    print("\nno regressions against {}".format(os.path.basename(args.baseline)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
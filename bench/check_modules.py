@@ -0,0 +1,232 @@
+#!/usr/bin/python3
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Behaviour checks of the logic modules of Example/ that the pipeline benchmark only runs
+    end to end. Each check_*() feeds its module a few hand-made cases and returns the ones
+    whose result differs from the expected one (the framer has its own, see bench_framer.py):
+        check_dr():        DeadReckoner (dead_reckon.py): extrapolation along the track, the
+                           DR_MAX_MS limit and the smoothed vertical rate
+        check_dispatch():  nmea_parse.dispatch(): the talkers and handlers, lazy fields (want),
+                           a void GPRMC (no FIX_OK), a GLL that is not valid
+        check_pair():      FixPairer (nmea_pair.py): pairs by the time field, a GPGGA that comes
+                           first or of another epoch, the wait_ms timeout, a replaced GPRMC
+        check_mailbox():   FixMailbox (fix_mailbox.py): latest wins, coalescing, take() once,
+                           the lock is free after every call
+        check_phase():     PhaseFilter (phase_filter.py): the hysteresis bands, the dwell time,
+                           the smoothing, the restart after a gap and after reset()
+    The times are passed as t_ms values, so the checks do not depend on the clock.
+    The exit status is 1 if a check fails.
+
+    Usage:
+        python3 bench/check_modules.py
+"""
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from host_sim import clock, EXAMPLE_DIR
+clock.install()  # time.ticks_diff() etc.
+sys.path.insert(0, EXAMPLE_DIR)
+
+from nmea_parse import new_record, dispatch, TIME, LAT, LON, GS, CRS, ALT, VALID, F_ALL, F_ALT, F_CRS, \
+    FIX_OK, RMC_OK, GGA_OK, KEY_RMC, KEY_GGA
+from dead_reckon import DeadReckoner, DR_MAX_MS
+from nmea_pair import FixPairer, PAIR_WAIT_MS
+from fix_mailbox import FixMailbox
+from phase_filter import PhaseFilter, PH_NONE, PH_STOPPED, PH_TAXYING, PH_FLYING, PHASE_RESET_MS
+
+
+def record(lat=0, lon=0, gs=0, crs=0, alt=0, t=0):
+    rec = new_record()
+    rec[LAT], rec[LON], rec[GS], rec[CRS], rec[ALT], rec[TIME] = lat, lon, gs, crs, alt, t
+    return rec
+
+
+def expect(failed, name, value, expected):
+    if value != expected:
+        failed.append("{}: {}, expected {}".format(name, value, expected))
+
+
+def check_dr():
+    """ DeadReckoner cases. Return the failed ones """
+    failed = []
+    dr = DeadReckoner()
+    dr.update(record(lat=50000000, gs=600, crs=0), 1000)  # 5000.0000 N, 60 kts north
+    expect(failed, "dr position at the fix", dr.position(1000), (50000000, 0))
+    expect(failed, "dr position before the fix", dr.position(500), (50000000, 0))
+    # 60 kts for 3 s: 0.05 nm, 0.05 minute of latitude
+    expect(failed, "dr position after 3 s north", dr.position(1000 + DR_MAX_MS), (50000500, 0))
+    expect(failed, "dr position limited to DR_MAX_MS", dr.position(1000 + 2 * DR_MAX_MS), (50000500, 0))
+    dr.update(record(lat=0, lon=-10000, gs=600, crs=900), 10000)  # 0000.0000, 00001.0000 W, east
+    expect(failed, "dr position after 3 s east", dr.position(10000 + DR_MAX_MS), (0, -9500))
+    dr.update(record(lat=-30000000, gs=0, crs=1800), 20000)  # 3000.0000 S, standing still
+    expect(failed, "dr position at gs 0", dr.position(21000), (-30000000, 0))
+
+    dr = DeadReckoner()
+    dr.update(record(alt=1000), 0)
+    expect(failed, "dr vs after one fix", dr.vs(), 0)
+    dr.update(record(alt=1100), 1000)  # +10 m in 1 s: 1/4 of it after the smoothing
+    expect(failed, "dr vs after a climb", dr.vs(), 25)
+    expect(failed, "dr altitude after 1 s", dr.altitude(2000), 1125)
+    expect(failed, "dr altitude limited to DR_MAX_MS", dr.altitude(10000), 1100 + 25 * DR_MAX_MS // 1000)
+    dr.update(record(alt=1200), 2000, F_ALL & ~F_ALT)  # an RMC-only fix: no altitude
+    expect(failed, "dr vs without an altitude", dr.vs(), 0)
+    dr.update(record(alt=1300), 20000)  # after an RMC-only fix: no rate yet
+    expect(failed, "dr vs after an RMC-only fix", dr.vs(), 0)
+    return failed
+
+
+RMC = b'$GPRMC,151948.00,A,5031.8614,N,00005.2524,E,83.0,315.1,201122,0.5,E*6A\r\n'
+GGA = b'$GPGGA,151948.00,5031.8614,N,00005.2524,E,1,05,0.0,914.4,M,0.0,M,0.0,0000*77\r\n'
+
+
+def check_dispatch():
+    """ nmea_parse.dispatch() cases. Return the failed ones """
+    failed = []
+    rec = new_record()
+    expect(failed, "dispatch GPRMC", dispatch(RMC, len(RMC), rec), KEY_RMC)
+    expect(failed, "GPRMC fields", tuple(rec[i] for i in (TIME, LAT, LON, GS, CRS)), (15194800, 50318614, 52524, 830, 3151))
+    expect(failed, "GPRMC status A", rec[VALID] & (RMC_OK | FIX_OK), RMC_OK | FIX_OK)
+    gn = b'$GN' + RMC[3:]
+    expect(failed, "dispatch GNRMC", dispatch(gn, len(gn), new_record()), KEY_RMC)
+    other = b'$BDRMC' + RMC[6:]
+    expect(failed, "dispatch another talker", dispatch(other, len(other), new_record()), 0)
+    txt = b'$GPTXT,01,01,02,text*7B\r\n'
+    expect(failed, "dispatch without a handler", dispatch(txt, len(txt), new_record()), 0)
+    expect(failed, "dispatch of a cut sentence", dispatch(RMC, 40, new_record()), 0)
+
+    rec = new_record()
+    expect(failed, "dispatch GPGGA for the altitude", dispatch(GGA, len(GGA), rec, F_ALT), KEY_GGA)
+    expect(failed, "lazy GPGGA: only the altitude", (rec[TIME], rec[ALT]), (0, 9144))
+    rec = new_record()
+    dispatch(RMC, len(RMC), rec, F_CRS)
+    expect(failed, "lazy GPRMC: only the track", (rec[LAT], rec[GS], rec[CRS]), (0, 0, 3151))
+
+    void = b'$GPRMC,151948.00,V,,,,,,,201122,,*00\r\n'
+    rec = new_record()
+    expect(failed, "dispatch a void GPRMC", dispatch(void, len(void), rec), KEY_RMC)
+    expect(failed, "void GPRMC: no FIX_OK", rec[VALID] & FIX_OK, 0)
+
+    vtg = b'$GPVTG,315.1,T,314.6,M,83.0,N,153.7,K*73\r\n'
+    rec = new_record()
+    dispatch(vtg, len(vtg), rec)
+    expect(failed, "GPVTG track and gs", (rec[CRS], rec[GS]), (3151, 830))
+    gll = b'$GPGLL,5031.8614,N,00005.2524,E,151948.00,V*0C\r\n'
+    rec = new_record()
+    dispatch(gll, len(gll), rec)
+    expect(failed, "GPGLL status V: no position", (rec[LAT], rec[LON]), (0, 0))
+    return failed
+
+
+def check_pair():
+    """ FixPairer cases. Return the failed ones """
+    failed = []
+    pair = FixPairer()
+    rec = record(t=100, alt=500)
+    expect(failed, "rmc waits for its gga", pair.rmc(rec, 1000), False)
+    expect(failed, "waiting()", pair.waiting(), True)
+    rec[ALT] = 600
+    rec[VALID] |= GGA_OK
+    expect(failed, "gga of the same epoch completes the fix", pair.gga(rec), True)
+    expect(failed, "not waiting after the pair", pair.waiting(), False)
+    expect(failed, "cached altitude", (pair.alt, pair.alt_ok), (600, True))
+
+    rec = record(t=200, alt=700)  # a receiver that sends the GPGGA first
+    expect(failed, "gga without its rmc", pair.gga(rec), False)
+    rec[TIME], rec[ALT] = 200, 0  # its GPRMC overwrites the record
+    expect(failed, "rmc of the kept gga completes the fix", pair.rmc(rec, 2000), True)
+    expect(failed, "gga first: its altitude", (rec[ALT], rec[VALID] & GGA_OK), (700, GGA_OK))
+
+    rec = record(t=300)
+    pair.rmc(rec, 3000)
+    rec[TIME], rec[ALT] = 400, 800  # a GPGGA of another epoch
+    expect(failed, "gga of another epoch", pair.gga(rec), False)
+    expect(failed, "the record keeps the time of the pending rmc", rec[TIME], 300)
+    expect(failed, "no poll before wait_ms", pair.poll(rec, 3000 + PAIR_WAIT_MS - 1), False)
+    expect(failed, "poll after wait_ms", pair.poll(rec, 3000 + PAIR_WAIT_MS), True)
+    expect(failed, "rmc only: the cached altitude, no GGA_OK", (rec[ALT], rec[VALID] & GGA_OK), (800, 0))
+    expect(failed, "nothing to poll", pair.poll(rec, 9000), False)
+
+    pair.rmc(record(t=500), 5000)
+    pair.rmc(record(t=600), 5100)  # the GPGGA of 500 never came
+    expect(failed, "stats (pairs, rmc_only, mismatched, dropped)", pair.stats(), (2, 1, 1, 1))
+    return failed
+
+
+def check_mailbox():
+    """ FixMailbox cases. Return the failed ones """
+    failed = []
+    box = FixMailbox(len(new_record()))
+    out = new_record()
+    expect(failed, "take() of an empty mailbox", box.take(out), -1)
+    box.put(record(t=100), F_ALL, 1000)
+    expect(failed, "take() of a fix", box.take(out), F_ALL)
+    expect(failed, "the fix taken", (out[TIME], box.fix_ms, box.age(1250)), (100, 1000, 250))
+    expect(failed, "take() the same fix again", box.take(out), -1)
+    box.put(record(t=200), F_ALT, 2000)
+    box.put(record(t=300), F_CRS, 3000)  # 200 is overwritten before it was taken
+    expect(failed, "take() the latest fix", (box.take(out), out[TIME], box.fix_ms), (F_CRS, 300, 3000))
+    box.put(record(t=400), F_ALL, 4000)
+    expect(failed, "stats (put, coalesced)", box.stats(), (4, 1))
+    expect(failed, "lock free", box.lock is None or not box.lock.locked(), True)
+    return failed
+
+
+# (gs knots x 10, t_ms, expected phase) fed in turn to PhaseFilter(smooth_ms=0): no smoothing
+PHASE_CASES = (
+    (0, 0, PH_STOPPED),
+    (8, 1000, PH_STOPPED),      # 0.8 kt: below stop_up
+    (12, 4000, PH_TAXYING),
+    (8, 8000, PH_TAXYING),      # not below stop_dn
+    (300, 12000, PH_TAXYING),   # 30 kts: below fly_up
+    (330, 13000, PH_FLYING),
+    (250, 14000, PH_FLYING),    # 25 kts after 1 s: held, the phase lasts dwell_ms
+    (290, 15000, PH_FLYING),    # not below fly_dn
+    (250, 17000, PH_TAXYING),   # 4 s after the change to flying
+    (0, 17000 + PHASE_RESET_MS, PH_STOPPED),  # a gap: starts over, without dwell
+)
+
+
+def check_phase():
+    """ PhaseFilter cases. Return the failed ones """
+    failed = []
+    phase = PhaseFilter(smooth_ms=0)
+    for gs, t_ms, expected in PHASE_CASES:
+        expect(failed, "phase at gs {} t {}".format(gs, t_ms), phase.update(gs, t_ms), expected)
+    expect(failed, "stats (changes, held)", phase.stats(), (3, 1))
+    phase.reset()
+    expect(failed, "phase after reset()", phase.phase, PH_NONE)
+    expect(failed, "first fix after reset()", phase.update(400, 40000), PH_FLYING)
+
+    phase = PhaseFilter()  # smoothed
+    phase.update(0, 0)
+    expect(failed, "smoothed: one fast fix", (phase.update(400, 1000), phase.speed()), (PH_STOPPED, 133))
+    return failed
+
+
+CHECKS = (("dead reckoning", check_dr), ("dispatch", check_dispatch), ("pairing", check_pair),
+          ("mailbox", check_mailbox), ("phase", check_phase))
+
+
+def main():
+    failed = []
+    for name, check in CHECKS:
+        failed += ["{}: {}".format(name, line) for line in check()]
+    if failed:
+        print("FAILED:")
+        for line in failed:
+            print("  " + line)
+        return 1
+    print("{} module checks passed".format(len(CHECKS)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
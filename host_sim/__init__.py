@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Simulator of the Galactic Unicorn hardware, so the MicroPython scripts in Example/
+    run unchanged on a Linux/Windows/macOS host and can be profiled and benchmarked.
+
+    install() registers stand-ins for the modules of Pimoroni's MicroPython firmware:
+        galactic       GalacticUnicorn (53 x 11 LED matrix, buttons)
+        picographics   PicoGraphics (53 x 11 framebuffer: pixel, text, measure_text, create_pen, ...)
+        machine        Pin (with IRQs), UART (fed from a capture file, paced at the baudrate), RTC, Timer
+        uasyncio       scheduler driven by the simulator clock
+        network, ntptime, pimoroni_i2c, micropython, gc (MicroPython flavour)
+        _thread        threads on the simulator clock (the second core)
+    and adds ticks_ms(), ticks_us(), ticks_diff(), sleep_ms() etc. to the time module (see clock.py).
+
+    Usage:
+        import host_sim
+        host_sim.install(capture="host_sim/captures/sample_flight_1hz.nmea")
+        app = host_sim.load_script()   # imports Example/Galactic_Unicorn_GPRMC_53x11_matrix_code_v1.py
+        app.main(False)
+
+    or from the command line: python3 -m host_sim --help
+"""
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE_DIR = os.path.join(ROOT, "Example")
+CAPTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "captures")
+DEFAULT_CAPTURE = os.path.join(CAPTURE_DIR, "sample_flight_1hz.nmea")
+MAIN_SCRIPT = "Galactic_Unicorn_GPRMC_53x11_matrix_code_v1"
+
+_STUBS = ("galactic", "picographics", "machine", "network", "ntptime", "pimoroni_i2c", "micropython",
+          "uasyncio")
+
+
+def install(capture=DEFAULT_CAPTURE, loop=False, fast=True, line_baud=None, burst=False):
+    """
+    Install the stand-in modules and the simulator clock.
+        capture:   path of an NMEA capture file (or bytes) fed to every UART
+        loop:      restart the capture when it has been sent completely
+        fast:      skip sleep() calls (the clock advances instead), see clock.py
+        line_baud: baudrate of the sender. None: the baudrate the UART is opened with
+        burst:     send the capture back-to-back instead of paced by the sentence time fields
+    """
+    from host_sim import clock
+    clock.fast = fast
+    clock.install()
+    for name in _STUBS:
+        sys.modules[name] = importlib.import_module("host_sim." + name)
+    from host_sim import mpgc
+    sys.modules["gc"] = mpgc
+    from host_sim import mpthread
+    sys.modules["_thread"] = mpthread
+    mpgc.reset_base()
+    if EXAMPLE_DIR not in sys.path:
+        sys.path.insert(0, EXAMPLE_DIR)
+    sys.modules.pop("secrets", None)  # Example/secrets.py, not the standard library module
+    set_capture(capture, loop=loop, line_baud=line_baud, burst=burst)
+
+
+def set_capture(capture, loop=False, line_baud=None, burst=False):
+    from host_sim import machine
+    if isinstance(capture, str):
+        with open(capture, "rb") as f:
+            capture = f.read()
+    machine.set_uart_source(capture or b'', loop=loop, line_baud=line_baud, burst=burst)
+
+
+def load_script(name=MAIN_SCRIPT, **overrides):
+    """
+    Import (or re-import) a script of Example/ with the simulated hardware.
+    Keyword arguments are set as module globals after the import, e.g. load_script(my_debug=True)
+    The simulated heap (gc.mem_alloc()) starts empty after the import: the CPython objects of the
+    script itself are several times larger than those of MicroPython.
+    """
+    sys.modules.pop(name, None)
+    module = importlib.import_module(name)
+    from host_sim import mpgc
+    mpgc.reset_base()
+    for k, v in overrides.items():
+        setattr(module, k, v)
+    return module
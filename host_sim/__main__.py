@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Run the main script on the simulated Galactic Unicorn.
+
+    Examples:
+        python3 -m host_sim                                  # the sample flight, as fast as possible
+        python3 -m host_sim --seconds 120 --show             # print the LED matrix on every update
+        python3 -m host_sim --realtime --capture my.nmea     # real time, with a recorded capture
+        python3 -m host_sim --profile                        # cProfile of the decode-and-render pipeline
+        python3 -m host_sim --line-baud 38400 --auto-baud    # GPSout at 38400 baud, found by find_baud()
+"""
+import argparse
+import contextlib
+import io
+import sys
+
+import host_sim
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="python3 -m host_sim", description=__doc__.split("\n\n")[1].strip())
+    ap.add_argument("--capture", default=host_sim.DEFAULT_CAPTURE, help="NMEA capture file fed to the UART")
+    ap.add_argument("--loop", action="store_true", help="restart the capture at its end")
+    ap.add_argument("--burst", action="store_true",
+                    help="send the capture back-to-back instead of one epoch per time field second")
+    ap.add_argument("--seconds", type=float, default=None,
+                    help="stop after this many (simulated) seconds. Default: the capture duration")
+    ap.add_argument("--realtime", action="store_true", help="really sleep in sleep() calls")
+    ap.add_argument("--line-baud", type=int, default=None,
+                    help="baudrate of the sender (GPSout). Default: the baudrate the script opens the UART with")
+    ap.add_argument("--auto-baud", action="store_true", help="set auto_baud: the script detects the baudrate")
+    ap.add_argument("--slow", action="store_true", help="call main(True): scroll the banner first")
+    ap.add_argument("--show", action="store_true", help="print the LED matrix after every gu.update()")
+    ap.add_argument("--quiet", action="store_true", help="suppress the script's print() output")
+    ap.add_argument("--profile", action="store_true", help="run under cProfile and print the top functions")
+    args = ap.parse_args()
+
+    host_sim.install(capture=args.capture, loop=args.loop, fast=not args.realtime, burst=args.burst,
+                     line_baud=args.line_baud)
+    from host_sim import clock, machine
+
+    seconds = args.seconds
+    if seconds is None:  # the capture duration at the line baudrate, plus the intro
+        seconds = machine.source_duration(args.line_baud or 4800) + 30
+    clock.set_deadline(seconds)
+
+    out = io.StringIO() if args.quiet else sys.stdout
+    with contextlib.redirect_stdout(out):
+        app = host_sim.load_script(auto_baud=args.auto_baud)
+        if args.show:
+            def show(gu):
+                print("--- update {} at {} ms".format(gu.updates, clock.ticks_us() // 1000), file=sys.stderr)
+                print(gu.to_text(), file=sys.stderr)
+            app.gu.on_update = show
+        prof = None
+        if args.profile:
+            import cProfile
+            prof = cProfile.Profile()
+            prof.enable()
+        try:
+            app.main(args.slow)
+        except (SystemExit, KeyboardInterrupt):
+            pass
+        finally:
+            if prof is not None:
+                prof.disable()
+    print("simulated {:.1f} s, {} display updates, uart overruns: {}, bytes lost: {}".format(
+        clock.seconds(), app.gu.updates, app.uart.overruns, app.uart.bytes_lost), file=sys.stderr)
+    if prof is not None:
+        import pstats
+        pstats.Stats(prof, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
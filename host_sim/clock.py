@@ -0,0 +1,156 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Clock of the simulator. Provides the MicroPython time functions that CPython lacks
+    (ticks_ms(), ticks_us(), ticks_diff(), ticks_add(), sleep_ms(), sleep_us()).
+
+    In 'fast' mode a sleep() does not wait: the requested time is added to the clock instead.
+    The clock therefore advances with the real CPU time spent plus all the (skipped) sleeps.
+    This keeps the 4800 baud uart pacing and all ticks based measurements consistent while
+    a simulated flight of many minutes runs in seconds.
+
+    A deadline can be set: once the clock passes it, sleep() and ticks_ms() raise
+    KeyboardInterrupt, as if Ctrl-C had been pressed (and held) in the REPL.
+
+    Threads (the _thread stand-in registers them with thread_started() and thread_ended()):
+    in 'fast' mode the clock only skips time when all threads wait in sleep() or idle(); it then
+    jumps to the first wake-up. A thread that is still running keeps the others waiting in real
+    time, as the two cores of the RP2040 run side by side.
+    idle() is the wait of the uasyncio scheduler: another thread can end it early with wake()
+    (e.g. ThreadSafeFlag.set()).
+"""
+import threading
+import time as _time
+
+_real_sleep = _time.sleep
+_t0 = _time.perf_counter()
+_skipped = 0.0  # seconds of sleep() that were not waited for
+
+fast = True
+deadline_ms = None
+
+_cond = threading.Condition()
+_threads = 1    # threads on the clock: the main thread and those of thread_started()
+_sleeping = {}  # thread ident -> wake-up time (s) of the threads waiting in sleep() or idle()
+_woken = False  # wake() has been called: idle() returns
+
+
+def _check_deadline(t_ms):
+    if deadline_ms is not None and t_ms >= deadline_ms:
+        raise KeyboardInterrupt
+
+
+def seconds():
+    return _time.perf_counter() - _t0 + _skipped
+
+
+def ticks_us():
+    return int(seconds() * 1000000)
+
+
+def ticks_ms():
+    t = int(seconds() * 1000)
+    _check_deadline(t)
+    return t
+
+
+def ticks_diff(t1, t0):
+    return t1 - t0
+
+
+def ticks_add(t, delta):
+    return t + delta
+
+
+def _wait(secs, idle):
+    global _skipped, _woken
+    if _threads == 1:
+        if fast:
+            _skipped += secs
+        else:
+            _real_sleep(secs)
+        return
+    me = threading.get_ident()
+    with _cond:
+        wake_up = seconds() + secs
+        _sleeping[me] = wake_up
+        try:
+            while seconds() < wake_up and not (idle and _woken):
+                if fast and not _woken and len(_sleeping) >= _threads:  # all wait: jump to the first wake-up
+                    first = min(_sleeping.values())
+                    now = seconds()
+                    if first > now:
+                        _skipped += first - now
+                        _cond.notify_all()
+                left = wake_up - seconds()
+                if left > 0:
+                    _cond.wait(left)
+        finally:
+            del _sleeping[me]
+            if idle:
+                _woken = False
+
+
+def sleep(secs):
+    if secs > 0:
+        _wait(secs, False)
+    _check_deadline(int(seconds() * 1000))
+
+
+def idle(secs):  # sleep() that ends early when another thread calls wake()
+    if secs > 0:
+        _wait(secs, True)
+    _check_deadline(int(seconds() * 1000))
+
+
+def wake():
+    global _woken
+    with _cond:
+        _woken = True
+        _cond.notify_all()
+
+
+def thread_started():
+    global _threads
+    with _cond:
+        _threads += 1
+
+
+def thread_ended():
+    global _threads
+    with _cond:
+        _threads -= 1
+        _cond.notify_all()
+
+
+def sleep_ms(ms):
+    sleep(ms / 1000)
+
+
+def sleep_us(us):
+    sleep(us / 1000000)
+
+
+def advance(secs):  # move the clock forward without sleeping (e.g. to let uart bytes arrive)
+    global _skipped
+    _skipped += secs
+
+
+def set_deadline(secs_from_now):
+    global deadline_ms
+    deadline_ms = None if secs_from_now is None else int((seconds() + secs_from_now) * 1000)
+
+
+def install():
+    """ Add the MicroPython functions to the time module. sleep() is replaced """
+    _time.ticks_ms = ticks_ms
+    _time.ticks_us = ticks_us
+    _time.ticks_diff = ticks_diff
+    _time.ticks_add = ticks_add
+    _time.sleep_ms = sleep_ms
+    _time.sleep_us = sleep_us
+    _time.sleep = sleep
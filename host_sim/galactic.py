@@ -0,0 +1,127 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for Pimoroni's 'galactic' module (GalacticUnicorn).
+
+    update(gr) copies the PicoGraphics framebuffer into self.frame (the LED matrix) and
+    counts the updates. An on_update callback (if set) is called after each update, e.g.
+    by a benchmark to measure uart-to-pixel latency.
+    press(switch) / release(switch) simulate the buttons, including the Pin IRQs.
+"""
+from host_sim import clock
+from host_sim import machine
+
+
+class _Channel:
+    def play_tone(self, *args, **kwargs):
+        pass
+
+    def frequency(self, *args):
+        pass
+
+    def volume(self, *args):
+        pass
+
+    def trigger_attack(self):
+        pass
+
+    def trigger_release(self):
+        pass
+
+
+class GalacticUnicorn:
+    WIDTH = 53
+    HEIGHT = 11
+
+    SWITCH_A = 0
+    SWITCH_B = 1
+    SWITCH_C = 3
+    SWITCH_D = 6
+    SWITCH_SLEEP = 27
+    SWITCH_VOLUME_UP = 7
+    SWITCH_VOLUME_DOWN = 8
+    SWITCH_BRIGHTNESS_UP = 21
+    SWITCH_BRIGHTNESS_DOWN = 26
+
+    last = None  # the most recently created instance
+
+    def __init__(self):
+        self.frame = bytearray(self.WIDTH * self.HEIGHT * 3)
+        self.updates = 0
+        self.t_last_update_us = 0
+        self.on_update = None
+        self._brightness = 0.5
+        self._volume = 0.5
+        self._pressed = set()
+        GalacticUnicorn.last = self
+
+    def update(self, gr):
+        self.frame[:] = gr.framebuffer
+        self.updates += 1
+        self.t_last_update_us = clock.ticks_us()
+        if self.on_update is not None:
+            self.on_update(self)
+
+    def clear(self):
+        for i in range(len(self.frame)):
+            self.frame[i] = 0
+
+    def set_brightness(self, value):
+        self._brightness = max(0.0, min(1.0, value))
+
+    def get_brightness(self):
+        return self._brightness
+
+    def adjust_brightness(self, delta):
+        self.set_brightness(self._brightness + delta)
+
+    def set_volume(self, value):
+        self._volume = max(0.0, min(1.0, value))
+
+    def get_volume(self):
+        return self._volume
+
+    def adjust_volume(self, delta):
+        self.set_volume(self._volume + delta)
+
+    def light(self):
+        return 2048
+
+    def is_pressed(self, switch):
+        return switch in self._pressed
+
+    def press(self, switch):
+        self._pressed.add(switch)
+        machine.Pin.drive(switch, 0)
+
+    def release(self, switch):
+        self._pressed.discard(switch)
+        machine.Pin.drive(switch, 1)
+
+    def synth_channel(self, channel):
+        return _Channel()
+
+    def play_synth(self):
+        pass
+
+    def stop_playing(self):
+        pass
+
+    def pixel_rgb(self, x, y):
+        i = (y * self.WIDTH + x) * 3
+        return self.frame[i], self.frame[i + 1], self.frame[i + 2]
+
+    def to_text(self):
+        """ The LED matrix as text: '#' for a lit LED, '.' for a dark one """
+        rows = []
+        for y in range(self.HEIGHT):
+            row = []
+            for x in range(self.WIDTH):
+                r, g, b = self.pixel_rgb(x, y)
+                row.append('#' if r or g or b else '.')
+            rows.append(''.join(row))
+        return '\n'.join(rows)
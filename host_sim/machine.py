@@ -0,0 +1,342 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for the MicroPython 'machine' module: Pin (with IRQs), UART, RTC, Timer, reset().
+
+    UART bytes come from a capture file (see host_sim.install() and set_uart_source()).
+    Each sentence starts at the moment given by its UTC time field (relative to the first
+    sentence), as FSUIPC7 GPSout sends an RMC/GGA pair per epoch; its bytes then arrive at
+    the line speed: at 4800 baud (8N1, 10 bits per byte) 480 bytes per second, measured with
+    the simulator clock. With burst=True the capture is sent back-to-back at the line speed.
+    Bytes that are not read in time overflow the rx buffer (rxbuf + the 32 byte hardware FIFO):
+    the oldest bytes are lost and counted in UART.overruns and UART.bytes_lost, as on the RP2040.
+"""
+import bisect
+import time as _time
+
+from host_sim import clock
+
+HW_FIFO = 32  # RP2040 UART rx FIFO depth
+
+_uart_source = b''
+_uart_loop = False
+_uart_line_baud = None  # baudrate of the sender. None: same as the UART
+_schedule = None  # (sentence start offsets, start times in s, period in s). None: burst
+
+
+def _epoch_secs(data, pos):
+    """ The hhmmss.ss field of the sentence at pos in seconds, None if there is none """
+    comma = data.find(b",", pos, pos + 8)
+    if comma < 0:
+        return None
+    end = data.find(b",", comma + 1, comma + 14)
+    try:
+        t = float(data[comma + 1:end])
+    except ValueError:
+        return None
+    return (t // 10000) * 3600 + ((t // 100) % 100) * 60 + t % 100
+
+
+def set_uart_source(data, loop=False, line_baud=None, burst=False):
+    global _uart_source, _uart_loop, _uart_line_baud, _schedule
+    _uart_source = bytes(data)
+    _uart_loop = loop
+    _uart_line_baud = line_baud
+    _schedule = None
+    if burst or not _uart_source:
+        return
+    offsets, starts = [], []
+    t_first = None
+    pos = _uart_source.find(b"$")
+    while pos >= 0:
+        t = _epoch_secs(_uart_source, pos)
+        if t is not None:
+            if t_first is None:
+                t_first = t
+            elif t < t_first:  # past midnight
+                t += 86400
+            offsets.append(pos)
+            starts.append(t - t_first)
+        pos = _uart_source.find(b"$", pos + 1)
+    if offsets:
+        offsets[0] = 0
+        period = starts[-1] + (starts[-1] / len(starts) if len(starts) > 1 else 1)
+        _schedule = (offsets, starts, period)
+
+
+def source_duration(baud):
+    """ Seconds it takes the sender to transmit the whole capture (once) """
+    line = len(_uart_source) * 10 / baud
+    if _schedule is None:
+        return line
+    return max(line, _schedule[2])
+
+
+def arrival_time(offset, baud):
+    """ Seconds after the uart was opened at which the bytes before offset have been sent """
+    bps = baud / 10
+    if _schedule is None:
+        return offset / bps
+    offsets, starts, period = _schedule
+    k = max(0, bisect.bisect_right(offsets, offset - 1) - 1)
+    j = k
+    while j > 0 and starts[j - 1] + (offsets[j] - offsets[j - 1]) / bps > starts[j]:
+        j -= 1  # continuous stream, see UART._arrived()
+    return starts[j] + (offset - offsets[j]) / bps
+
+
+def freq(hz=None):
+    return 125000000
+
+
+def unique_id():
+    return b'\xe6\x61\x41\x04\x03\x00\x00\x00'
+
+
+def reset():
+    print("machine.reset() (simulated)")
+    raise SystemExit
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    _registry = {}  # pin id -> list of Pin objects
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self._value = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self._value = value
+        self._handler = None
+        self._trigger = 0
+        Pin._registry.setdefault(id, []).append(self)
+
+    def __repr__(self):
+        return "Pin({})".format(self.id)
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def toggle(self):
+        self._value ^= 1
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    def _set_input(self, v):
+        """ Simulate an input level change, firing the IRQ handler if the edge matches """
+        old = self._value
+        self._value = 1 if v else 0
+        if self._handler is None or old == self._value:
+            return
+        if (self._value == 0 and self._trigger & Pin.IRQ_FALLING) or \
+                (self._value == 1 and self._trigger & Pin.IRQ_RISING):
+            self._handler(self)
+
+    @classmethod
+    def drive(cls, id, v):
+        for p in cls._registry.get(id, []):
+            p._set_input(v)
+
+
+class UART:
+    INV_TX = 1
+    INV_RX = 2
+
+    def __init__(self, id, baudrate=115200, bits=8, parity=None, stop=1, tx=None, rx=None,
+                 timeout=0, timeout_char=0, rxbuf=256, txbuf=256, **kwargs):
+        self.id = id
+        self.written = bytearray()
+        self.overruns = 0
+        self.bytes_lost = 0
+        self._pos = 0  # index of the next unread byte in the source stream
+        self._t_open = clock.seconds()
+        self.init(baudrate, bits, parity, stop, rxbuf=rxbuf)
+
+    def init(self, baudrate=115200, bits=8, parity=None, stop=1, rxbuf=None, **kwargs):
+        self.baudrate = baudrate
+        if rxbuf is not None:
+            self.rxbuf = rxbuf
+        # A re-init keeps the stream position: the sender goes on while we change baudrate
+        return None
+
+    def deinit(self):
+        pass
+
+    def _line_baud(self):
+        return _uart_line_baud or self.baudrate
+
+    def _arrived(self):
+        """ nr of bytes the sender has transmitted since the uart was opened """
+        t = clock.seconds() - self._t_open
+        bps = self._line_baud() / 10
+        if _schedule is None:  # burst
+            n = int(t * bps)
+            return n if _uart_loop else min(n, len(_uart_source))
+        offsets, starts, period = _schedule
+        cycles = 0
+        if _uart_loop:
+            cycles = int(t // period)
+            t -= cycles * period
+        k = bisect.bisect_right(starts, t) - 1
+        if k < 0:
+            return cycles * len(_uart_source)
+        # A sentence starts at its epoch time, or when the previous one has been sent
+        t_k = starts[k]
+        j = k
+        while j > 0 and starts[j - 1] + (offsets[j] - offsets[j - 1]) / bps > t_k:
+            j -= 1  # the sender is still busy with earlier sentences: continuous stream
+            t_k = starts[j]
+        n = offsets[j] + int((t - t_k) * bps)
+        end = offsets[k + 1] if k + 1 < len(offsets) else len(_uart_source)
+        return cycles * len(_uart_source) + min(n, end)
+
+    def _backlog(self):
+        n = self._arrived() - self._pos
+        limit = self.rxbuf + HW_FIFO
+        if n > limit:  # rx buffer overflow: the oldest bytes are lost
+            self.overruns += 1
+            self.bytes_lost += n - limit
+            self._pos += n - limit
+            n = limit
+        return n
+
+    def _byte(self, i):
+        src = _uart_source
+        c = src[i % len(src)] if _uart_loop else src[i]
+        if self.baudrate != self._line_baud():  # wrong baudrate: framing garbage
+            c = (c * 0x1D + (self.baudrate // 100)) & 0xFF
+        return c
+
+    def any(self):
+        return self._backlog() if _uart_source else 0
+
+    def _wait_secs(self):
+        """ Seconds until the next byte arrives (0: bytes are waiting), for uasyncio.StreamReader """
+        if not _uart_source:
+            return 1.0
+        if self.any():
+            return 0
+        byte_secs = 10 / self._line_baud()
+        if _schedule is None:  # burst
+            return byte_secs
+        offsets, starts, period = _schedule
+        t = clock.seconds() - self._t_open
+        cycles = 0
+        if _uart_loop:
+            cycles = int(t // period)
+            t -= cycles * period
+        k = bisect.bisect_right(starts, t) - 1
+        end = offsets[k + 1] if 0 <= k + 1 < len(offsets) else len(_uart_source)
+        if k >= 0 and self._pos - cycles * len(_uart_source) < end:
+            return byte_secs  # a sentence is being sent
+        if k + 1 < len(starts):
+            return max(starts[k + 1] - t, byte_secs)
+        return max(period - t, byte_secs) if _uart_loop else 1.0
+
+    def _copy(self, buf, n):
+        pos = self._pos
+        src = _uart_source
+        if self.baudrate == self._line_baud() and (not _uart_loop or pos % len(src) + n <= len(src)):
+            start = pos % len(src)
+            buf[:n] = src[start:start + n]
+        else:
+            for i in range(n):
+                buf[i] = self._byte(pos + i)
+        self._pos += n
+
+    def read(self, nbytes=None):
+        n = self.any()
+        if nbytes is not None:
+            n = min(n, nbytes)
+        if n == 0:
+            return None
+        data = bytearray(n)
+        self._copy(data, n)
+        return bytes(data)
+
+    def readinto(self, buf, nbytes=None):
+        n = self.any()
+        n = min(n, len(buf) if nbytes is None else nbytes)
+        if n == 0:
+            return None
+        self._copy(buf, n)
+        return n
+
+    def readline(self):
+        n = self.any()
+        if n == 0:
+            return None
+        i = 0
+        while i < n:
+            if self._byte(self._pos + i) == 0x0A:
+                i += 1
+                break
+            i += 1
+        return self.read(i)
+
+    def write(self, buf):
+        self.written += buf
+        return len(buf)
+
+    def flush(self):
+        pass
+
+
+class RTC:
+    def __init__(self):
+        self._offset = 0
+
+    def datetime(self, dt=None):
+        if dt is not None:
+            return None
+        tm = _time.localtime(_time.time() + self._offset)
+        # (year, month, day, weekday, hours, minutes, seconds, subseconds)
+        return (tm[0], tm[1], tm[2], tm[6], tm[3], tm[4], tm[5], 0)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        pass
+
+    def init(self, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
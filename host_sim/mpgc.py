@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for the MicroPython 'gc' module, installed as 'gc' by host_sim.install().
+    collect(), enable(), disable() and isenabled() are those of CPython.
+    mem_alloc() and mem_free() model a MicroPython heap of HEAP_SIZE bytes: the bytes
+    allocated by CPython since install() (tracemalloc when it is tracing, otherwise the
+    number of allocated blocks x 32) count as used heap.
+"""
+import gc as _gc
+import sys as _sys
+import tracemalloc as _tracemalloc
+
+HEAP_SIZE = 160 * 1024  # free heap of the Pico W running Pimoroni's MicroPython (approx.)
+
+collect = _gc.collect
+enable = _gc.enable
+disable = _gc.disable
+isenabled = _gc.isenabled
+
+_base = 0
+_threshold = -1
+
+
+def _used():
+    if _tracemalloc.is_tracing():
+        return _tracemalloc.get_traced_memory()[0]
+    return _sys.getallocatedblocks() * 32
+
+
+def reset_base():
+    global _base
+    _base = _used()
+
+
+def mem_alloc():
+    return max(0, _used() - _base)
+
+
+def mem_free():
+    return max(0, HEAP_SIZE - mem_alloc())
+
+
+def threshold(amount=None):
+    global _threshold
+    if amount is None:
+        return _threshold
+    _threshold = amount
+
+
+def __getattr__(name):  # anything else: CPython's gc
+    return getattr(_gc, name)
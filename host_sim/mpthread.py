@@ -0,0 +1,40 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for the MicroPython '_thread' module, installed as '_thread' by host_sim.install().
+    start_new_thread() runs the function in a CPython thread (the second core of the RP2040)
+    that takes part in the simulator clock (see clock.py), so its sleep() calls are skipped in
+    'fast' mode only while the main thread waits too. Everything else is CPython's _thread.
+    The GIL switch interval is shortened, so the threads alternate about as finely as two cores
+    interleave (CPython's default of 5 ms would add up to 5 ms to every hand-over).
+"""
+import _thread as _real
+import sys
+
+from host_sim import clock
+
+allocate_lock = _real.allocate_lock
+get_ident = _real.get_ident
+stack_size = _real.stack_size
+LockType = _real.LockType
+
+SWITCH_SECS = 0.0001  # GIL switch interval while a thread runs
+
+
+def start_new_thread(func, args, kwargs=None):
+    def run():
+        try:
+            func(*args, **(kwargs or {}))
+        finally:
+            clock.thread_ended()
+    clock.thread_started()
+    sys.setswitchinterval(SWITCH_SECS)
+    return _real.start_new_thread(run, ())
+
+
+def __getattr__(name):  # the rest of CPython's _thread (e.g. for modules imported later)
+    return getattr(_real, name)
@@ -0,0 +1,38 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for the MicroPython 'network' module. The WLAN always connects at once.
+"""
+STA_IF = 0
+AP_IF = 1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self._active = False
+        self._connected = False
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = is_active
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._connected
+
+    def status(self, param=None):
+        return STAT_GOT_IP if self._connected else 0
+
+    def ifconfig(self, *args):
+        return ("192.168.1.99", "255.255.255.0", "192.168.1.1", "192.168.1.1")
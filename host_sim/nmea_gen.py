@@ -0,0 +1,87 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Generator of GPRMC + GPGGA sentence streams as FSUIPC7 GPSout sends them for MSFS2020.
+
+    flight(...) simulates a short flight, one RMC/GGA pair per 'rate' Hz epoch:
+    parked, taxi, takeoff run, climb with turns, and cruise. The sentences have the same
+    layout and number formats as the examples in the main script, with correct checksums.
+
+    Usage:
+        python3 -m host_sim.nmea_gen [seconds] [rate_hz] > capture.nmea
+"""
+import math
+import sys
+
+
+def checksum(body):
+    cs = 0
+    for c in body.encode():
+        cs ^= c
+    return cs
+
+
+def sentence(body):
+    return "${}*{:02X}\r\n".format(body, checksum(body)).encode()
+
+
+def _ddmm(deg, digits):
+    a = abs(deg)
+    d = int(a)
+    m = (a - d) * 60
+    return "{:0{}d}{:07.4f}".format(d, digits, m)
+
+
+def rmc(t, lat, lon, gs, trk, var=0.5, date="201122"):
+    hh, mm, ss = int(t // 3600) % 24, int(t // 60) % 60, t % 60
+    return sentence("GPRMC,{:02d}{:02d}{:05.2f},A,{},{},{},{},{:.1f},{:.1f},{},{:.1f},{}".format(
+        hh, mm, ss, _ddmm(lat, 2), "N" if lat >= 0 else "S", _ddmm(lon, 3), "E" if lon >= 0 else "W",
+        gs, trk % 360, date, abs(var), "E" if var >= 0 else "W"))
+
+
+def gga(t, lat, lon, alt_m):
+    hh, mm, ss = int(t // 3600) % 24, int(t // 60) % 60, t % 60
+    return sentence("GPGGA,{:02d}{:02d}{:05.2f},{},{},{},{},1,05,0.0,{:.1f},M,0.0,M,0.0,0000".format(
+        hh, mm, ss, _ddmm(lat, 2), "N" if lat >= 0 else "S", _ddmm(lon, 3), "E" if lon >= 0 else "W", alt_m))
+
+
+def flight(seconds=420, rate=1, start=(50.5310, 0.0875), t0=15 * 3600 + 19 * 60):
+    """ Return the bytes of a simulated flight of 'seconds' with 'rate' fixes per second """
+    lat, lon = start
+    gs = 0.0
+    trk = 315.0
+    alt_ft = 30.0
+    out = bytearray()
+    dt = 1.0 / rate
+    for i in range(int(seconds * rate)):
+        t = i * dt
+        if t < 20:                   # parked
+            gs_target, turn, vs_fpm = 0.0, 0.0, 0.0
+        elif t < 80:                 # taxi
+            gs_target, turn, vs_fpm = 15.0, 1.0 if 40 <= t < 60 else 0.0, 0.0
+        elif t < 120:                # takeoff run
+            gs_target, turn, vs_fpm = 140.0, 0.0, 0.0
+        elif t < 300:                # climb with standard rate turns
+            gs_target, vs_fpm = 160.0, 1500.0
+            turn = 3.0 if 160 <= t < 190 else (-3.0 if 230 <= t < 250 else 0.0)
+        else:                        # cruise
+            gs_target, turn, vs_fpm = 180.0, 0.0, 0.0
+        gs += max(-3.0 * dt, min(3.0 * dt, gs_target - gs))
+        trk = (trk + turn * dt) % 360
+        alt_ft += vs_fpm / 60 * dt
+        dist_nm = gs * dt / 3600
+        lat += dist_nm / 60 * math.cos(math.radians(trk))
+        lon += dist_nm / 60 * math.sin(math.radians(trk)) / math.cos(math.radians(lat))
+        out += rmc(t0 + t, lat, lon, gs, trk)
+        out += gga(t0 + t, lat, lon, alt_ft / 3.2808)
+    return bytes(out)
+
+
+if __name__ == '__main__':
+    secs = int(sys.argv[1]) if len(sys.argv) > 1 else 420
+    hz = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    sys.stdout.buffer.write(flight(secs, hz))
@@ -0,0 +1,20 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for the MicroPython 'ntptime' module. The host clock is already synchronized.
+"""
+import time as _time
+
+host = "pool.ntp.org"
+
+
+def time():
+    return int(_time.time())
+
+
+def settime():
+    pass
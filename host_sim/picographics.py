@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for Pimoroni's 'picographics' module: a PicoGraphics with a 53 x 11 RGB888
+    framebuffer for DISPLAY_GALACTIC_UNICORN.
+
+    Pens are packed RGB integers (0xRRGGBB). Text is drawn with the 5 x 8 FONT of
+    GU_Workout_mod_ini.py (6 pixels per character), which approximates the firmware's
+    bitmap fonts closely enough for layout, dirty-region and timing work.
+    The drawing calls are counted in self.calls (a dict), so render paths can be profiled.
+"""
+DISPLAY_GALACTIC_UNICORN = 19
+PEN_RGB888 = 7
+
+_FONTS = {  # name: (advance per character, glyph rows drawn)
+    "bitmap6": (6, 6),
+    "bitmap8": (6, 8),
+    "bitmap14_outline": (6, 8),
+}
+
+_glyphs = {}  # (character code, rows) -> list of lit (x, y) pixels
+
+
+def _glyph(code, rows):
+    g = _glyphs.get((code, rows))
+    if g is None:
+        from GU_Workout_mod_ini import FONT
+        g = [(col, row) for col in range(5) for row in range(rows) if (FONT[code * 5 + col] >> row) & 1]
+        _glyphs[(code, rows)] = g
+    return g
+
+
+class PicoGraphics:
+
+    def __init__(self, display=DISPLAY_GALACTIC_UNICORN, pen_type=PEN_RGB888, **kwargs):
+        self.width = 53
+        self.height = 11
+        self.framebuffer = bytearray(self.width * self.height * 3)
+        self._pen = 0
+        self._font = "bitmap8"
+        self._clip = (0, 0, self.width, self.height)
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def get_bounds(self):
+        return self.width, self.height
+
+    def create_pen(self, r, g, b):
+        self._count("create_pen")
+        return ((int(r) & 0xFF) << 16) | ((int(g) & 0xFF) << 8) | (int(b) & 0xFF)
+
+    def set_pen(self, pen):
+        self._pen = pen
+
+    def set_font(self, font):
+        self._font = font
+
+    def set_clip(self, x, y, w, h):
+        self._clip = (max(0, x), max(0, y), min(self.width, x + w), min(self.height, y + h))
+
+    def remove_clip(self):
+        self._clip = (0, 0, self.width, self.height)
+
+    def _put(self, x, y):
+        x0, y0, x1, y1 = self._clip
+        if x0 <= x < x1 and y0 <= y < y1:
+            i = (y * self.width + x) * 3
+            p = self._pen
+            fb = self.framebuffer
+            fb[i] = (p >> 16) & 0xFF
+            fb[i + 1] = (p >> 8) & 0xFF
+            fb[i + 2] = p & 0xFF
+
+    def clear(self):
+        self._count("clear")
+        x0, y0, x1, y1 = self._clip
+        p = self._pen
+        rgb = bytes(((p >> 16) & 0xFF, (p >> 8) & 0xFF, p & 0xFF))
+        for y in range(y0, y1):
+            i = (y * self.width + x0) * 3
+            self.framebuffer[i:i + (x1 - x0) * 3] = rgb * (x1 - x0)
+
+    def pixel(self, x, y):
+        self._count("pixel")
+        self._put(int(x), int(y))
+
+    def pixel_span(self, x, y, length):
+        self._count("pixel_span")
+        for i in range(int(length)):
+            self._put(int(x) + i, int(y))
+
+    def rectangle(self, x, y, w, h):
+        self._count("rectangle")
+        for yy in range(int(y), int(y + h)):
+            for xx in range(int(x), int(x + w)):
+                self._put(xx, yy)
+
+    def line(self, x1, y1, x2, y2, thickness=1):
+        self._count("line")
+        dx, dy = abs(x2 - x1), abs(y2 - y1)
+        steps = max(dx, dy, 1)
+        for i in range(steps + 1):
+            self._put(int(round(x1 + (x2 - x1) * i / steps)), int(round(y1 + (y2 - y1) * i / steps)))
+
+    def measure_text(self, text, scale=1, spacing=1, fixed_width=False):
+        self._count("measure_text")
+        advance = _FONTS.get(self._font, (6, 8))[0]
+        return len(text) * advance * scale
+
+    def text(self, text, x, y, wordwrap=-1, scale=1, angle=0, spacing=1, fixed_width=False):
+        self._count("text")
+        advance, rows = _FONTS.get(self._font, (6, 8))
+        x = int(x)
+        y = int(y)
+        for ch in text:
+            if -6 * scale < x < self.width:
+                for col, row in _glyph(ord(ch) & 0xFF, rows):
+                    for sy in range(scale):
+                        for sx in range(scale):
+                            self._put(x + col * scale + sx, y + row * scale + sy)
+            x += advance * scale
+
+    def update(self):
+        pass
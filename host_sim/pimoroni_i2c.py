@@ -0,0 +1,18 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for Pimoroni's 'pimoroni_i2c' module. No devices are present on the bus.
+"""
+
+
+class PimoroniI2C:
+    def __init__(self, sda=4, scl=5, baudrate=400000):
+        self.sda = sda
+        self.scl = scl
+
+    def scan(self):
+        return []
@@ -0,0 +1,204 @@
+# SPDX-FileCopyrightText: 2022 Paulus Schulinck
+#
+# SPDX-License-Identifier: MIT
+###############################
+"""
+    FOR USE WITH CPYTHON (host side)
+
+    Stand-in for MicroPython's uasyncio, driven by the simulator clock (clock.py).
+    CPython's asyncio waits in real time; this scheduler lets the (fast) simulator clock
+    advance to the next wake-up instead, so a run with tasks is as fast as one without.
+
+    Supported: run(), create_task(), sleep(), sleep_ms(), Event, ThreadSafeFlag, Task.cancel(),
+    CancelledError, StreamReader(uart) with read() and readinto() (the task wakes when the
+    simulated uart receives its next byte). ThreadSafeFlag.set() may be called from another
+    thread (see _thread): it ends the wait of the scheduler. An exception raised in any task (e.g. the KeyboardInterrupt of the clock
+    deadline) ends run().
+"""
+import heapq
+import itertools
+
+from host_sim import clock
+
+POLL_SECS = 0.001  # wake-up interval of a task waiting for another task
+
+_queue = []  # heap of (wake-up time in s, sequence nr, task)
+_parked = set()  # the tasks waiting for an Event
+_flagged = []    # ThreadSafeFlags set (possibly by another thread) whose waiters are to be queued
+_seq = itertools.count()
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class _Sleep:
+    __slots__ = ("secs",)
+
+    def __init__(self, secs):
+        self.secs = secs
+
+    def __await__(self):
+        yield self
+
+
+class _Park:  # yielded by a task that waits for an Event: it is queued again by Event.set()
+    __slots__ = ("event",)
+
+    def __init__(self, event):
+        self.event = event
+
+
+def sleep(secs):
+    return _Sleep(secs)
+
+
+def sleep_ms(ms):
+    return _Sleep(ms / 1000)
+
+
+class Task:
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.done = False
+        self.result = None
+        self._cancel = False
+        self._parked = None  # the Event the task waits for
+
+    def cancel(self):
+        self._cancel = True
+        if self._parked is not None:  # wake it up to throw CancelledError
+            self._parked._waiting.remove(self)
+            self._parked = None
+            _parked.discard(self)
+            _push(self, clock.seconds())
+        return True
+
+    def __await__(self):
+        while not self.done:
+            yield _Sleep(POLL_SECS)
+        return self.result
+
+
+class Event:
+
+    def __init__(self):
+        self._flag = False
+        self._waiting = []
+
+    def is_set(self):
+        return self._flag
+
+    def set(self):  # the waiting tasks run next, as in MicroPython
+        self._flag = True
+        self._release()
+
+    def _release(self):
+        for task in self._waiting:
+            task._parked = None
+            _parked.discard(task)
+            _push(task, clock.seconds())
+        self._waiting.clear()
+
+    def clear(self):
+        self._flag = False
+
+    def __await__(self):
+        while not self._flag:
+            yield _Park(self)
+        return True
+
+    def wait(self):
+        return self
+
+
+class ThreadSafeFlag(Event):
+
+    def set(self):  # the scheduler queues the waiting task (it may run in another thread)
+        self._flag = True
+        _flagged.append(self)
+        clock.wake()
+
+    def __await__(self):  # wait() clears the flag
+        while not self._flag:
+            yield _Park(self)
+        self._flag = False
+
+
+class StreamReader:
+
+    def __init__(self, s):
+        self.s = s
+
+    def _wait(self):  # sleep until the stream has bytes
+        wait = getattr(self.s, "_wait_secs", None)
+        while not self.s.any():
+            yield _Sleep(wait() if wait is not None else POLL_SECS)
+
+    def __await__(self):
+        yield from self._wait()
+
+    async def read(self, n=-1):
+        await self
+        return self.s.read() if n < 0 else self.s.read(n)
+
+    async def readinto(self, buf):
+        await self
+        return self.s.readinto(buf)
+
+
+Stream = StreamReader
+
+
+def _push(task, t):
+    heapq.heappush(_queue, (t, next(_seq), task))
+
+
+def create_task(coro):
+    task = Task(coro)
+    _push(task, clock.seconds())
+    return task
+
+
+def run(coro):
+    main = create_task(coro)
+    try:
+        while not main.done:
+            while _flagged:
+                _flagged.pop()._release()
+            t, _, task = heapq.heappop(_queue)
+            dt = t - clock.seconds()
+            if dt > 0:
+                clock.idle(dt)
+                if _flagged:  # woken by a ThreadSafeFlag
+                    heapq.heappush(_queue, (t, next(_seq), task))
+                    continue
+            try:
+                if task._cancel:
+                    task._cancel = False
+                    yielded = task.coro.throw(CancelledError())
+                else:
+                    yielded = task.coro.send(None)
+            except StopIteration as e:
+                task.done = True
+                task.result = e.value
+                continue
+            except CancelledError:
+                task.done = True
+                continue
+            if isinstance(yielded, _Park):
+                task._parked = yielded.event
+                yielded.event._waiting.append(task)
+                _parked.add(task)
+                continue
+            _push(task, clock.seconds() + (yielded.secs if isinstance(yielded, _Sleep) else 0))
+    finally:
+        for _, _, task in _queue:
+            task.coro.close()
+        _queue.clear()
+        for task in _parked:
+            task.coro.close()
+        _parked.clear()
+        _flagged.clear()
+    return main.result